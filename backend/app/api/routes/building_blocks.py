@@ -2,7 +2,7 @@
 Building Blocks API routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
 import uuid
 
@@ -10,14 +10,59 @@ from app.models.schemas import BuildingBlockCreate, BuildingBlockUpdate, Buildin
 from app.models.db_models import User
 from app.storage.file_storage import building_blocks_storage
 from app.api.routes.auth import get_current_user
+from app.core.parser import parse_aql, warm_ast_cache
+from app.core.parser.ast_nodes import ASTNode
+from app.core.engine.building_blocks import (
+    BuildingBlockGraph, BuildingBlockCycleError, load_building_blocks, references
+)
+from app.core.engine.executor import evaluation_executor, ExecutorBusyError
 
 router = APIRouter()
 
 
+def _find_reference_cycle(bb_id: str, aql: str) -> Optional[List[str]]:
+    """
+    Reference loop through a Building Block if it had `aql`
+    
+    Only the Building Blocks reachable from `aql` are loaded; those that
+    are missing or do not parse are left out of the graph, and no loop
+    is reported if `aql` itself does not parse.
+    
+    Returns:
+        Building Block IDs forming the loop, or None
+    """
+    try:
+        bb_ast = parse_aql(aql)
+    except SyntaxError:
+        return None
+    
+    # The new AQL stands in for the stored version of `bb_id`
+    loaded: Dict[str, Optional[ASTNode]] = {bb_id: bb_ast}
+    load_building_blocks(references(bb_ast), loaded, {}, building_blocks_storage.load)
+    building_blocks = {key: value for key, value in loaded.items() if value is not None}
+    return BuildingBlockGraph(building_blocks).find_cycle([bb_id])
+
+
+async def _check_references(bb_id: str, aql: str) -> None:
+    """
+    Reject a Building Block whose references would loop
+    
+    Raises:
+        HTTPException: 400 naming the loop
+    """
+    cycle = await evaluation_executor.run(_find_reference_cycle, bb_id, aql)
+    if cycle is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(BuildingBlockCycleError(cycle))
+        )
+
+
 @router.post("/", response_model=BuildingBlockResponse, status_code=status.HTTP_201_CREATED)
 async def create_building_block(bb_data: BuildingBlockCreate, current_user: User = Depends(get_current_user)):
     """Create a new Building Block"""
     bb_id = f"BB_{uuid.uuid4().hex[:8]}"
+    await _check_references(bb_id, bb_data.aql)
     
     now = datetime.utcnow()
     metadata = RuleMetadata(
@@ -41,6 +86,13 @@ async def create_building_block(bb_data: BuildingBlockCreate, current_user: User
             detail="Failed to save Building Block"
         )
     
+    # Parse now so the first test of this Building Block hits the AST cache
+    try:
+        await evaluation_executor.run(warm_ast_cache, bb_dict["aql"])
+    except ExecutorBusyError:
+        # Saved already; the first test parses it instead
+        pass
+    
     return bb_dict
 
 
@@ -79,6 +131,8 @@ async def update_building_block(
     
     # Update fields
     update_data = bb_data.dict(exclude_unset=True)
+    if update_data.get("aql") is not None:
+        await _check_references(bb_id, update_data["aql"])
     for field, value in update_data.items():
         existing_bb[field] = value
     
@@ -92,6 +146,12 @@ async def update_building_block(
             detail="Failed to update Building Block"
         )
     
+    try:
+        await evaluation_executor.run(warm_ast_cache, existing_bb["aql"])
+    except ExecutorBusyError:
+        # Saved already; the first test parses it instead
+        pass
+    
     return existing_bb
 
 
@@ -10,6 +10,8 @@ from app.models.schemas import RuleCreate, RuleUpdate, RuleResponse, RuleMetadat
 from app.models.db_models import User
 from app.storage.file_storage import rules_storage
 from app.api.routes.auth import get_current_user
+from app.core.parser import warm_ast_cache
+from app.core.engine.executor import evaluation_executor, ExecutorBusyError
 
 router = APIRouter()
 
@@ -41,6 +43,13 @@ async def create_rule(rule_data: RuleCreate, current_user: User = Depends(get_cu
             detail="Failed to save rule"
         )
     
+    # Parse now so the first test of this rule hits the AST cache
+    try:
+        await evaluation_executor.run(warm_ast_cache, rule_dict["aql"])
+    except ExecutorBusyError:
+        # Saved already; the first test parses it instead
+        pass
+    
     return rule_dict
 
 
@@ -92,6 +101,12 @@ async def update_rule(
             detail="Failed to update rule"
         )
     
+    try:
+        await evaluation_executor.run(warm_ast_cache, existing_rule["aql"])
+    except ExecutorBusyError:
+        # Saved already; the first test parses it instead
+        pass
+    
     return existing_rule
 
 
@@ -1,14 +1,31 @@
 """
 Test API routes for rule testing
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from typing import Dict, List, Any, Optional, Tuple
 
-from app.models.schemas import TestRequest, TestResult, ValidateSyntaxRequest, ValidateSyntaxResponse
+from app.config import settings
+from app.models.schemas import (
+    BatchTestRequest, BatchTestResult, MatchOutput, TestRequest, TestResult,
+    ValidateSyntaxRequest, ValidateSyntaxResponse
+)
+from app.models.event_check import check_event, serialize_event
 from app.models.db_models import User
 from app.api.routes.auth import get_current_user
 from app.core.parser import parse_aql, parse_aql_to_dict
-from app.core.engine.rule_engine import evaluate_rule
+from app.core.parser.ast_nodes import ASTNode
+from app.core.engine.rule_engine import rule_engine
+from app.core.engine.parallel import parallel_evaluator
+from app.core.engine.executor import evaluation_executor, ExecutorBusyError
+from app.core.regex_cache import regex_cache
+from app.core.parser.ast_cache import ast_cache
+from app.core.engine.optimizer import rule_optimizer
+from app.core.engine.building_blocks import load_building_blocks, references
+from app.core.engine.event_stream import EventStreamDecoder
+from app.core.engine.interning import intern_events
+from app.storage.file_storage import rules_storage, building_blocks_storage
 
 router = APIRouter()
 
@@ -17,27 +34,99 @@ router = APIRouter()
 async def validate_syntax(request: ValidateSyntaxRequest, current_user: User = Depends(get_current_user)):
     """Validate AQL syntax"""
     try:
-        ast_dict = parse_aql_to_dict(request.aql)
+        ast_dict = await evaluation_executor.run(parse_aql_to_dict, request.aql)
         return ValidateSyntaxResponse(valid=True, ast=ast_dict)
     except SyntaxError as e:
         return ValidateSyntaxResponse(valid=False, error=str(e))
+    except ExecutorBusyError:
+        raise
     except Exception as e:
         return ValidateSyntaxResponse(valid=False, error=f"Unexpected error: {str(e)}")
 
 
+def _check_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate request events against the Event schema, interning repeated fields
+    
+    Raises:
+        RequestValidationError: With the same 422 body FastAPI produces
+            when the events are declared as List[Event]
+    """
+    checked = []
+    for index, event in enumerate(events):
+        try:
+            checked.append(check_event(event))
+        except ValidationError as e:
+            raise RequestValidationError([
+                {**error, "loc": ("body", "events", index, *error["loc"])}
+                for error in e.errors(include_url=False)
+            ])
+    return intern_events(checked)
+
+
+def _format_matches(
+    result: Dict[str, Any],
+    events: List[Dict[str, Any]],
+    return_matches: MatchOutput
+) -> Dict[str, Any]:
+    """Replace matched events with event IDs or indices when requested"""
+    matched = result.get("matched_events") or []
+    
+    if return_matches == MatchOutput.IDS:
+        result["matched_event_ids"] = [event.get("eventId") for event in matched]
+        result["matched_events"] = []
+    elif return_matches == MatchOutput.INDICES:
+        # Matched events are the request's own dicts, so identity finds them
+        positions = {id(event): index for index, event in enumerate(events)}
+        result["matched_indices"] = [positions[id(event)] for event in matched]
+        result["matched_events"] = []
+    else:
+        result["matched_events"] = [serialize_event(event) for event in matched]
+    
+    return result
+
+
+def _evaluate_rule(
+    rule_ast: ASTNode,
+    events: List[Dict[str, Any]],
+    building_blocks_ast: Dict[str, ASTNode],
+    return_matches: MatchOutput
+) -> Dict[str, Any]:
+    """Evaluate one rule and format its matches, run on the evaluation executor"""
+    result = parallel_evaluator.evaluate_rule(rule_ast, events, building_blocks_ast)
+    return _format_matches(result, events, return_matches)
+
+
+def _evaluate_rules(
+    rules_ast: Dict[str, ASTNode],
+    events: List[Dict[str, Any]],
+    building_blocks_ast: Dict[str, ASTNode],
+    return_matches: MatchOutput
+) -> Dict[str, Dict[str, Any]]:
+    """Evaluate rules by ID and format their matches, run on the evaluation executor"""
+    outcomes = parallel_evaluator.evaluate_rules(rules_ast, events, building_blocks_ast)
+    return {
+        rule_id: _format_matches(result, events, return_matches)
+        for rule_id, result in outcomes.items()
+    }
+
+
 @router.post("/test-rule", response_model=TestResult)
 async def test_rule(request: TestRequest, current_user: User = Depends(get_current_user)):
     """Test a rule against events"""
+    # Checked off the event loop first, so invalid events are a 422 before any syntax error
+    events = await evaluation_executor.run(_check_events, request.events)
+    
     try:
         # Parse rule AQL
-        rule_ast = parse_aql(request.rule.aql)
+        rule_ast = await evaluation_executor.run(parse_aql, request.rule.aql)
         
         # Parse Building Block AQLs
         building_blocks_ast = {}
         if request.building_blocks:
             for bb in request.building_blocks:
                 try:
-                    bb_ast = parse_aql(bb.aql)
+                    bb_ast = await evaluation_executor.run(parse_aql, bb.aql)
                     building_blocks_ast[bb.id] = bb_ast
                 except SyntaxError as e:
                     return TestResult(
@@ -53,19 +142,20 @@ async def test_rule(request: TestRequest, current_user: User = Depends(get_curre
                         error=f"Building Block {bb.id} syntax error: {str(e)}"
                     )
         
-        # Convert events to dict
-        events = [event.dict() for event in request.events]
-        
-        # Evaluate rule
-        result = evaluate_rule(rule_ast, events, building_blocks_ast)
+        # Evaluate rule on the checked dicts directly, off the event loop
+        result = await evaluation_executor.run(
+            _evaluate_rule, rule_ast, events, building_blocks_ast, request.return_matches
+        )
         
         # Add rule name
         result["rule_name"] = request.rule.name
-        if request.rule.id:
-            result["rule_id"] = request.rule.id
+        # RuleBase has no id field; stored rules sent back by the UI may carry one
+        rule_id = getattr(request.rule, "id", None)
+        if rule_id:
+            result["rule_id"] = rule_id
         
         return TestResult(**result)
-        
+    
     except SyntaxError as e:
         return TestResult(
             alert=False,
@@ -79,6 +169,8 @@ async def test_rule(request: TestRequest, current_user: User = Depends(get_curre
             },
             error=f"Rule syntax error: {str(e)}"
         )
+    except ExecutorBusyError:
+        raise
     except Exception as e:
         return TestResult(
             alert=False,
@@ -92,3 +184,213 @@ async def test_rule(request: TestRequest, current_user: User = Depends(get_curre
             },
             error=f"Evaluation error: {str(e)}"
         )
+
+
+@router.post("/test-rule/stream", response_model=TestResult)
+async def test_rule_stream(
+    rule_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Test a stored rule against a streamed event file
+    
+    The request body is NDJSON or a JSON array of events, read and
+    evaluated in batches so the full event list is never held in memory.
+    """
+    rule = rules_storage.load(rule_id)
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Rule {rule_id} not found"
+        )
+    
+    try:
+        rule_ast = await evaluation_executor.run(parse_aql, rule["aql"])
+    except SyntaxError as e:
+        return TestResult(
+            alert=False,
+            rule_id=rule_id,
+            rule_name=rule["name"],
+            matched_events=[],
+            evaluation_phases={
+                "building_block": "not_applicable",
+                "normal_logic": "failed",
+                "regex": "not_applicable",
+                "aql": "not_applicable"
+            },
+            error=f"Rule syntax error: {str(e)}"
+        )
+    
+    # Load Building Blocks from storage, with those they reference
+    loaded: Dict[str, Optional[ASTNode]] = {}
+    bb_errors: Dict[str, str] = {}
+    bb_ids = await evaluation_executor.run(
+        load_building_blocks,
+        references(rule_ast) + (rule.get("building_blocks") or []),
+        loaded,
+        bb_errors,
+        building_blocks_storage.load
+    )
+    building_blocks_ast = {bb_id: bb_ast for bb_id, bb_ast in loaded.items() if bb_ast is not None}
+    for bb_id in bb_ids:
+        if bb_id in bb_errors:
+            return TestResult(
+                alert=False,
+                rule_id=rule_id,
+                rule_name=rule["name"],
+                matched_events=[],
+                evaluation_phases={
+                    "building_block": "failed",
+                    "normal_logic": "not_applicable",
+                    "regex": "not_applicable",
+                    "aql": "not_applicable"
+                },
+                error=bb_errors[bb_id]
+            )
+    
+    stream = rule_engine.start_stream(
+        rule_ast,
+        building_blocks_ast,
+        max_matched_events=settings.MAX_STREAM_MATCHED_EVENTS,
+        max_buffered_events=settings.MAX_STREAM_BUFFERED_EVENTS
+    )
+    decoder = EventStreamDecoder(max_event_size=settings.MAX_STREAM_EVENT_SIZE)
+    
+    batch: List[Dict[str, Any]] = []
+    try:
+        async for chunk in request.stream():
+            for event in decoder.feed(chunk):
+                batch.append(check_event(event))
+            if len(batch) >= settings.STREAM_BATCH_SIZE:
+                await evaluation_executor.run(stream.feed, intern_events(batch))
+                batch = []
+        for event in decoder.close():
+            batch.append(check_event(event))
+        await evaluation_executor.run(stream.feed, intern_events(batch))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid event data after {decoder.events_decoded} events: {str(e)}"
+        )
+    
+    result = await evaluation_executor.run(stream.finish)
+    result["matched_events"] = [serialize_event(event) for event in result.get("matched_events") or []]
+    result["rule_name"] = rule["name"]
+    result["rule_id"] = rule_id
+    
+    return TestResult(**result)
+
+
+def _failed_result(rule: Dict[str, Any], failed_phase: str, error: str) -> TestResult:
+    """Result for a stored rule that could not be evaluated"""
+    evaluation_phases = {
+        "building_block": "not_applicable",
+        "normal_logic": "not_applicable",
+        "regex": "not_applicable",
+        "aql": "not_applicable"
+    }
+    evaluation_phases[failed_phase] = "failed"
+    return TestResult(
+        alert=False,
+        rule_id=rule.get("id"),
+        rule_name=rule["name"],
+        matched_events=[],
+        evaluation_phases=evaluation_phases,
+        error=error
+    )
+
+
+def _parse_stored_rules(
+    rules: List[Dict[str, Any]]
+) -> Tuple[Dict[str, ASTNode], Dict[str, ASTNode], Dict[str, TestResult]]:
+    """
+    Parse stored rules and every Building Block they use exactly once
+    
+    Returns:
+        Tuple of (rule ASTs by ID, Building Block ASTs by ID,
+        results for rules that cannot be evaluated by ID)
+    """
+    failed: Dict[str, TestResult] = {}
+    rules_ast = {}
+    loaded: Dict[str, Optional[ASTNode]] = {}
+    bb_errors: Dict[str, str] = {}
+    for rule in rules:
+        rule_id = rule["id"]
+        try:
+            rule_ast = parse_aql(rule["aql"])
+        except SyntaxError as e:
+            failed[rule_id] = _failed_result(rule, "normal_logic", f"Rule syntax error: {str(e)}")
+            continue
+        
+        bb_ids = load_building_blocks(
+            references(rule_ast) + (rule.get("building_blocks") or []), loaded, bb_errors,
+            building_blocks_storage.load
+        )
+        bb_error = next((bb_errors[bb_id] for bb_id in bb_ids if bb_id in bb_errors), None)
+        if bb_error:
+            failed[rule_id] = _failed_result(rule, "building_block", bb_error)
+            continue
+        rules_ast[rule_id] = rule_ast
+    
+    building_blocks_ast = {bb_id: bb_ast for bb_id, bb_ast in loaded.items() if bb_ast is not None}
+    return rules_ast, building_blocks_ast, failed
+
+
+@router.post("/test-rules/batch", response_model=BatchTestResult)
+async def test_rules_batch(request: BatchTestRequest, current_user: User = Depends(get_current_user)):
+    """
+    Test many stored rules against one event set
+    
+    Events are checked once and each Building Block is loaded and parsed
+    once; the engine then shares Building Block scans, timestamps and
+    string matching across all rules.
+    """
+    events = await evaluation_executor.run(_check_events, request.events)
+    
+    # Load rules from storage
+    missing_rules = []
+    if request.rule_ids is None:
+        rules = rules_storage.load_all()
+    else:
+        rules = []
+        for rule_id in dict.fromkeys(request.rule_ids):
+            rule = rules_storage.load(rule_id)
+            if rule:
+                rules.append(rule)
+            else:
+                missing_rules.append(rule_id)
+    
+    rules_ast, building_blocks_ast, failed = await evaluation_executor.run(_parse_stored_rules, rules)
+    outcomes = await evaluation_executor.run(
+        _evaluate_rules, rules_ast, events, building_blocks_ast, request.return_matches
+    )
+    
+    results = []
+    for rule in rules:
+        rule_id = rule["id"]
+        if rule_id in failed:
+            results.append(failed[rule_id])
+            continue
+        result = outcomes[rule_id]
+        result["rule_name"] = rule["name"]
+        result["rule_id"] = rule_id
+        results.append(TestResult(**result))
+    
+    return BatchTestResult(
+        results=results,
+        total_rules=len(results),
+        alerts=sum(1 for result in results if result.alert),
+        missing_rules=missing_rules
+    )
+
+
+@router.get("/engine-stats")
+async def engine_stats(current_user: User = Depends(get_current_user)):
+    """Evaluation concurrency limits, queue depth and cache counters"""
+    return {
+        "executor": evaluation_executor.stats(),
+        "ast_cache": ast_cache.stats(),
+        "regex_cache": regex_cache.stats(),
+        "optimizer": rule_optimizer.stats.stats()
+    }
@@ -36,6 +36,34 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     MAX_EVENTS_PER_TEST: int = 10000
     
+    # Streaming event uploads
+    STREAM_BATCH_SIZE: int = 1000
+    MAX_STREAM_EVENT_SIZE: int = 1024 * 1024  # 1MB per event
+    MAX_STREAM_MATCHED_EVENTS: int = 1000
+    MAX_STREAM_BUFFERED_EVENTS: int = 100000  # aggregation rules only
+    
+    # Rule Engine
+    AQL_PARSER: str = "ply"  # "ply" (LALR tables) or "pratt" (hand-written, faster)
+    REGEX_CACHE_SIZE: int = 1024
+    AST_CACHE_SIZE: int = 512
+    AST_CACHE_MAX_TEXT_LENGTH: int = 64 * 1024  # longer AQL is parsed but not cached
+    MULTI_PATTERN_AC_THRESHOLD: int = 128
+    RULE_OPTIMIZER: bool = True  # cost-based AND / OR child ordering
+    OPTIMIZER_STATS_SIZE: int = 4096  # leaf conditions with learned pass rates
+    OPTIMIZER_SAMPLE_EVENTS: int = 256  # events sampled per evaluation; 0 disables learning
+    RULE_SUBEXPRESSION_MEMO: bool = True  # evaluate conditions shared with Building Blocks once per event
+    BB_EVENT_INDEX: bool = True  # answer equality / IN Building Blocks from an inverted event index
+    BB_INDEX_AFTER_EVENTS: int = 1000  # Building Blocks unmatched in this many events use the index
+    COLUMNAR_EVALUATION: bool = True  # vectorized masks over column batches (needs NumPy)
+    COLUMNAR_MIN_EVENTS: int = 5000  # smaller event lists are evaluated row by row
+    INTERNED_FIELDS: list = ["eventName", "eventCategory", "sourceIP", "destinationIP", "username", "protocol"]
+    INTERN_MAX_STRINGS: int = 262144  # distinct interned strings before the dictionary starts over
+    INTERN_MAX_BYTES: int = 32 * 1024 * 1024  # interned string memory before the dictionary starts over
+    EVALUATION_WORKERS: int = 0  # worker processes; 0 or 1 evaluates in-process
+    EVALUATION_SHARD_MIN_EVENTS: int = 10000
+    EVALUATION_THREADS: int = 4  # concurrent parse / evaluation calls
+    EVALUATION_QUEUE_SIZE: int = 16  # waiting calls before 503
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
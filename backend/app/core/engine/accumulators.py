@@ -0,0 +1,329 @@
+"""
+Incremental aggregation accumulators for AQL functions
+"""
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Tuple
+
+
+def comparable(value: Any) -> Any:
+    """
+    Value as MIN / MAX compare it
+    
+    Numbers are kept as they are and other values float() accepts
+    (numeric strings) are converted, so values of one field never
+    compare across types.
+    
+    Returns:
+        The number, or None for values MIN / MAX skip
+    """
+    if isinstance(value, (int, float)):
+        return value
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class Accumulator(ABC):
+    """
+    Running value of one aggregation function
+    
+    Field values are passed as found in events (None, strings and other
+    values included); each accumulator skips what its function ignores,
+    so add() and remove() can be called for every event alike. remove()
+    takes values back in the order they were added, as a sliding window
+    drops its oldest events. Each update is O(1) (amortized for MIN / MAX).
+    """
+    
+    function = ''
+    
+    @abstractmethod
+    def add(self, value: Any) -> None:
+        """Take a value into the aggregate"""
+    
+    @abstractmethod
+    def remove(self, value: Any) -> None:
+        """Take back the oldest value still in the aggregate"""
+    
+    @abstractmethod
+    def value(self) -> Any:
+        """Current aggregate"""
+
+
+class CountAccumulator(Accumulator):
+    """COUNT: values that are not None"""
+    
+    function = 'COUNT'
+    
+    def __init__(self):
+        self.count = 0
+    
+    def add(self, value: Any) -> None:
+        if value is not None:
+            self.count += 1
+    
+    def remove(self, value: Any) -> None:
+        if value is not None:
+            self.count -= 1
+    
+    def value(self) -> int:
+        return self.count
+
+
+class SumAccumulator(Accumulator):
+    """
+    SUM: values float() accepts
+    
+    A Neumaier (compensated) running sum: the rounding error of each
+    step is carried in a separate term, so large values passing through
+    a window do not leave their rounding error behind. Infinities and NaN
+    are counted instead of summed, so removing them restores a finite
+    sum; a finite sum past the float range stays infinite.
+    """
+    
+    function = 'SUM'
+    
+    def __init__(self):
+        self.count = 0
+        self._total = 0.0
+        self._compensation = 0.0
+        self._nan = 0
+        self._positive_infinity = 0
+        self._negative_infinity = 0
+    
+    def add(self, value: Any) -> None:
+        number = self._number(value)
+        if number is not None:
+            self.count += 1
+            self._update(number, 1)
+    
+    def remove(self, value: Any) -> None:
+        number = self._number(value)
+        if number is not None:
+            self.count -= 1
+            self._update(number, -1)
+            if self.count == 0:
+                # Nothing left: drop the rounding residue of the removed values
+                self._total = self._compensation = 0.0
+    
+    def value(self) -> Any:
+        if self.count == 0:
+            return 0
+        if self._nan or (self._positive_infinity and self._negative_infinity):
+            return math.nan
+        if self._positive_infinity:
+            return math.inf
+        if self._negative_infinity:
+            return -math.inf
+        if not math.isfinite(self._total):
+            return self._total
+        return self._total + self._compensation
+    
+    @staticmethod
+    def _number(value: Any) -> Any:
+        """float(value), or None for values the sum skips"""
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return None
+    
+    def _update(self, number: float, sign: int) -> None:
+        if math.isfinite(number):
+            if sign < 0:
+                number = -number
+            total = self._total + number
+            # Low-order bits lost by the addition, from the smaller operand
+            if abs(self._total) >= abs(number):
+                self._compensation += (self._total - total) + number
+            else:
+                self._compensation += (number - total) + self._total
+            self._total = total
+        elif number != number:
+            self._nan += sign
+        elif number > 0:
+            self._positive_infinity += sign
+        else:
+            self._negative_infinity += sign
+
+
+class AvgAccumulator(SumAccumulator):
+    """AVG: SUM divided by the number of values it adds"""
+    
+    function = 'AVG'
+    
+    def value(self) -> Any:
+        total = super().value()
+        return total / self.count if self.count else 0
+
+
+class VarianceAccumulator(Accumulator):
+    """
+    VARIANCE: population variance of the values SUM adds
+    
+    Welford's update of the running mean and sum of squared deviations
+    (M2), applied in reverse to remove a value; values far larger than
+    those left in the window leave rounding error behind when removed.
+    Any infinity or NaN in the aggregate makes the variance NaN.
+    """
+    
+    function = 'VARIANCE'
+    
+    def __init__(self):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._non_finite = 0
+    
+    def add(self, value: Any) -> None:
+        number = SumAccumulator._number(value)
+        if number is None:
+            return
+        self.count += 1
+        if not math.isfinite(number):
+            self._non_finite += 1
+            return
+        finite = self.count - self._non_finite
+        delta = number - self._mean
+        self._mean += delta / finite
+        self._m2 += delta * (number - self._mean)
+    
+    def remove(self, value: Any) -> None:
+        number = SumAccumulator._number(value)
+        if number is None:
+            return
+        self.count -= 1
+        if not math.isfinite(number):
+            self._non_finite -= 1
+            return
+        finite = self.count - self._non_finite
+        if finite == 0:
+            self._mean = self._m2 = 0.0
+            return
+        delta = number - self._mean
+        self._mean -= delta / finite
+        if finite == 1:
+            # A single value has no spread; drop the rounding residue
+            self._m2 = 0.0
+        else:
+            # Rounding can take M2 just below zero when the values left are equal
+            self._m2 = max(0.0, self._m2 - delta * (number - self._mean))
+    
+    def value(self) -> Any:
+        if self.count == 0:
+            return 0
+        if self._non_finite:
+            return math.nan
+        return self._m2 / self.count
+
+
+class MinAccumulator(Accumulator):
+    """
+    MIN: smallest number, as comparable() converts values
+    
+    A monotonic deque holds the values that can still become the minimum
+    as older ones are removed. Ties keep the earliest value, and values
+    are compared with `<` as min() does. NaN compares false both ways, so
+    with NaN among the values the result may differ from min() over the
+    same values.
+    """
+    
+    function = 'MIN'
+    
+    def __init__(self):
+        self._candidates: Deque[Tuple[int, Any]] = deque()
+        self._added = 0
+        self._removed = 0
+    
+    @staticmethod
+    def _precedes(value: Any, other: Any) -> bool:
+        return value < other
+    
+    def add(self, value: Any) -> None:
+        value = comparable(value)
+        if value is None:
+            return
+        candidates = self._candidates
+        while candidates and self._precedes(value, candidates[-1][1]):
+            candidates.pop()
+        candidates.append((self._added, value))
+        self._added += 1
+    
+    def remove(self, value: Any) -> None:
+        # Skip what add() skipped, so positions stay in step
+        if comparable(value) is None:
+            return
+        if self._candidates and self._candidates[0][0] == self._removed:
+            self._candidates.popleft()
+        self._removed += 1
+    
+    def value(self) -> Any:
+        return self._candidates[0][1] if self._candidates else None
+
+
+class MaxAccumulator(MinAccumulator):
+    """MAX: largest number, as comparable() converts values (compared with `>` as max() does)"""
+    
+    function = 'MAX'
+    
+    @staticmethod
+    def _precedes(value: Any, other: Any) -> bool:
+        return value > other
+
+
+ACCUMULATORS = {
+    accumulator.function: accumulator
+    for accumulator in (
+        CountAccumulator, SumAccumulator, AvgAccumulator, VarianceAccumulator, MinAccumulator, MaxAccumulator
+    )
+}
+
+
+def create_accumulator(function: str) -> Accumulator:
+    """
+    New accumulator for an aggregation function
+    
+    Args:
+        function: Aggregation function name (COUNT, SUM, AVG, MIN, MAX,
+            or VARIANCE, which AQL does not have)
+    
+    Returns:
+        Empty accumulator
+    
+    Raises:
+        ValueError: If the function is unknown
+    """
+    accumulator = ACCUMULATORS.get(function.upper())
+    if accumulator is None:
+        raise ValueError(f"Unknown aggregation function: {function}")
+    return accumulator()
+
+
+class FieldAccumulators:
+    """Several aggregation functions over one field, updated in one pass"""
+    
+    def __init__(self, field: str, functions: Iterable[str]):
+        self.field = field
+        self.accumulators: Dict[str, Accumulator] = {}
+        for function in functions:
+            if function.upper() not in self.accumulators:
+                self.accumulators[function.upper()] = create_accumulator(function)
+    
+    def add(self, event: Dict[str, Any]) -> None:
+        value = event.get(self.field)
+        for accumulator in self.accumulators.values():
+            accumulator.add(value)
+    
+    def remove(self, event: Dict[str, Any]) -> None:
+        value = event.get(self.field)
+        for accumulator in self.accumulators.values():
+            accumulator.remove(value)
+    
+    def values(self) -> Dict[str, Any]:
+        """Current value of every function, keyed by upper-case function name"""
+        return {function: accumulator.value() for function, accumulator in self.accumulators.items()}
@@ -1,7 +1,10 @@
 """
 Aggregation functions for AQL
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable
+from app.core.engine.accumulators import (
+    Accumulator, AvgAccumulator, FieldAccumulators, SumAccumulator, comparable
+)
 
 
 class Aggregator:
@@ -35,17 +38,9 @@ class Aggregator:
             field: Field name to sum
             
         Returns:
-            Sum of field values
+            Sum of field values (compensated, as SumAccumulator)
         """
-        total = 0
-        for event in events:
-            value = event.get(field)
-            if value is not None:
-                try:
-                    total += float(value)
-                except (ValueError, TypeError):
-                    pass
-        return total
+        return Aggregator._accumulate(SumAccumulator(), events, field)
     
     @staticmethod
     def avg(events: List[Dict[str, Any]], field: str) -> float:
@@ -59,19 +54,7 @@ class Aggregator:
         Returns:
             Average of field values
         """
-        values = []
-        for event in events:
-            value = event.get(field)
-            if value is not None:
-                try:
-                    values.append(float(value))
-                except (ValueError, TypeError):
-                    pass
-        
-        if not values:
-            return 0
-        
-        return sum(values) / len(values)
+        return Aggregator._accumulate(AvgAccumulator(), events, field)
     
     @staticmethod
     def min(events: List[Dict[str, Any]], field: str) -> Any:
@@ -83,18 +66,15 @@ class Aggregator:
             field: Field name to find minimum
             
         Returns:
-            Minimum field value
+            Minimum numeric field value (numeric strings converted), or None
         """
-        values = []
+        result = None
         for event in events:
-            value = event.get(field)
-            if value is not None:
-                values.append(value)
-        
-        if not values:
-            return None
-        
-        return min(values)
+            value = comparable(event.get(field))
+            # Same comparison and tie-breaking as min(), as MinAccumulator
+            if value is not None and (result is None or value < result):
+                result = value
+        return result
     
     @staticmethod
     def max(events: List[Dict[str, Any]], field: str) -> Any:
@@ -106,18 +86,15 @@ class Aggregator:
             field: Field name to find maximum
             
         Returns:
-            Maximum field value
+            Maximum numeric field value (numeric strings converted), or None
         """
-        values = []
+        result = None
         for event in events:
-            value = event.get(field)
-            if value is not None:
-                values.append(value)
-        
-        if not values:
-            return None
-        
-        return max(values)
+            value = comparable(event.get(field))
+            # Same comparison and tie-breaking as max(), as MaxAccumulator
+            if value is not None and (result is None or value > result):
+                result = value
+        return result
     
     @staticmethod
     def aggregate(
@@ -150,3 +127,32 @@ class Aggregator:
             return Aggregator.max(events, field)
         else:
             raise ValueError(f"Unknown aggregation function: {function}")
+    
+    @staticmethod
+    def aggregate_many(
+        functions: Iterable[str],
+        events: List[Dict[str, Any]],
+        field: str
+    ) -> Dict[str, Any]:
+        """
+        Execute several aggregation functions over one field in a single pass
+        
+        Args:
+            functions: Aggregation function names
+            events: List of event dictionaries
+            field: Field name
+            
+        Returns:
+            Aggregation results keyed by upper-case function name
+        """
+        accumulators = FieldAccumulators(field, functions)
+        for event in events:
+            accumulators.add(event)
+        return accumulators.values()
+    
+    @staticmethod
+    def _accumulate(accumulator: Accumulator, events: List[Dict[str, Any]], field: str) -> Any:
+        """Feed every event's field value to an accumulator and return its value"""
+        for event in events:
+            accumulator.add(event.get(field))
+        return accumulator.value()
@@ -0,0 +1,174 @@
+"""
+Building Block dependency graph
+Building Blocks may reference other Building Blocks; references must not loop
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from app.core.parser import parse_aql
+from app.core.parser.ast_nodes import ASTNode, BuildingBlockRefNode, LogicalNode
+
+
+class BuildingBlockCycleError(ValueError):
+    """Building Blocks referencing each other in a loop"""
+    
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Building Block cycle: {' -> '.join(cycle)}")
+
+
+def references(node: ASTNode) -> List[str]:
+    """
+    Building Block IDs referenced by an AST, in order of first use
+    
+    Args:
+        node: AST root node
+    
+    Returns:
+        List of Building Block IDs without duplicates
+    """
+    found: Dict[str, None] = {}
+    
+    def traverse(n):
+        if isinstance(n, BuildingBlockRefNode):
+            found[n.bb_id] = None
+        elif isinstance(n, LogicalNode):
+            for child in n.children:
+                traverse(child)
+    
+    traverse(node)
+    return list(found)
+
+
+def load_building_blocks(
+    bb_ids: List[str],
+    loaded: Dict[str, Optional[ASTNode]],
+    errors: Dict[str, str],
+    load: Callable[[str], Optional[Dict[str, Any]]]
+) -> List[str]:
+    """
+    Load and parse stored Building Blocks and all those they reference
+    
+    Args:
+        bb_ids: Building Block IDs used by a rule
+        loaded: Building Block ASTs by ID, None if missing or broken;
+            filled in, and already loaded IDs are not read again
+        errors: Syntax error messages by Building Block ID, filled in
+        load: Stored Building Block by ID, None if missing
+            (e.g. building_blocks_storage.load)
+    
+    Returns:
+        IDs reached from `bb_ids`, in the order they were found
+    """
+    reached = list(dict.fromkeys(bb_ids))
+    seen = set(reached)
+    index = 0
+    while index < len(reached):
+        bb_id = reached[index]
+        index += 1
+        if bb_id not in loaded:
+            loaded[bb_id] = None
+            bb = load(bb_id)
+            if bb:
+                try:
+                    loaded[bb_id] = parse_aql(bb["aql"])
+                except SyntaxError as e:
+                    errors[bb_id] = f"Building Block {bb_id} syntax error: {str(e)}"
+        if loaded[bb_id] is not None:
+            for dependency in references(loaded[bb_id]):
+                if dependency not in seen:
+                    seen.add(dependency)
+                    reached.append(dependency)
+    return reached
+
+
+class BuildingBlockGraph:
+    """
+    References between Building Blocks
+    
+    Edges point from a Building Block to the known Building Blocks it
+    references; unknown IDs are not part of the graph. Dependencies are
+    collected on first use, so checking one Building Block only visits
+    what it can reach.
+    """
+    
+    def __init__(self, building_blocks: Dict[str, ASTNode]):
+        self.building_blocks = building_blocks
+        self._dependencies: Dict[str, List[str]] = {}
+    
+    def dependencies(self, bb_id: str) -> List[str]:
+        """Known Building Blocks referenced directly by `bb_id`"""
+        dependencies = self._dependencies.get(bb_id)
+        if dependencies is None:
+            ast = self.building_blocks.get(bb_id)
+            dependencies = [] if ast is None else [
+                dependency for dependency in references(ast) if dependency in self.building_blocks
+            ]
+            self._dependencies[bb_id] = dependencies
+        return dependencies
+    
+    def find_cycle(self, start: Optional[Iterable[str]] = None) -> Optional[List[str]]:
+        """
+        Find a reference loop
+        
+        Args:
+            start: Building Block IDs to search from (default: all)
+        
+        Returns:
+            The loop as a path whose first and last IDs are equal, or None
+        """
+        # Iterative depth-first search: on_path holds the current path
+        done = set()
+        for root in (self.building_blocks if start is None else start):
+            if root in done or root not in self.building_blocks:
+                continue
+            path = [root]
+            on_path = {root: 0}
+            pending = [iter(self.dependencies(root))]
+            while pending:
+                dependency = next(pending[-1], None)
+                if dependency is None:
+                    pending.pop()
+                    finished = path.pop()
+                    del on_path[finished]
+                    done.add(finished)
+                    continue
+                if dependency in on_path:
+                    return path[on_path[dependency]:] + [dependency]
+                if dependency in done:
+                    continue
+                on_path[dependency] = len(path)
+                path.append(dependency)
+                pending.append(iter(self.dependencies(dependency)))
+        return None
+    
+    def order(self, bb_ids: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Building Blocks in resolution order: every one after those it references
+        
+        Args:
+            bb_ids: Building Blocks to order, with everything they
+                reference (default: all)
+        
+        Returns:
+            List of Building Block IDs
+        
+        Raises:
+            BuildingBlockCycleError: If references loop
+        """
+        bb_ids = list(self.building_blocks if bb_ids is None else bb_ids)
+        cycle = self.find_cycle(bb_ids)
+        if cycle is not None:
+            raise BuildingBlockCycleError(cycle)
+        
+        ordered: Dict[str, None] = {}
+        
+        def visit(bb_id):
+            if bb_id in ordered:
+                return
+            for dependency in self.dependencies(bb_id):
+                visit(dependency)
+            ordered[bb_id] = None
+        
+        for bb_id in bb_ids:
+            if bb_id in self.building_blocks:
+                visit(bb_id)
+        return list(ordered)
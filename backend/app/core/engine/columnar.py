@@ -0,0 +1,381 @@
+"""
+Columnar event batches and vectorized predicate evaluation
+Optional: needs NumPy; without it rules are evaluated row by row
+"""
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from app.core.parser.ast_nodes import (
+    ASTNode, ComparisonNode, LogicalNode, AggregationNode, BuildingBlockRefNode, InOpNode
+)
+from app.core.engine.compiler import RuleCompiler, Predicate, COMPARISON_OPERATORS
+from app.core.engine.event_scan import PhaseTracker
+from app.core.engine.normalizer import leaf_key
+from app.core.engine.building_blocks import BuildingBlockCycleError
+from app.core.engine.interning import StringDictionary
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+HAS_NUMPY = np is not None
+
+# Every integer up to this magnitude is exactly representable as float64
+_EXACT_INTEGER = 2 ** 53
+
+# Fields are sampled before encoding; above this share of distinct values
+# a per-value evaluation saves nothing over walking the rows
+_SAMPLE_SIZE = 1024
+_MAX_DISTINCT_RATIO = 0.5
+
+# Outcome of a condition over a batch: (matches, raises) boolean arrays,
+# matches being False wherever evaluation raises
+Masks = Tuple[Any, Any]
+
+
+def _value_key(value: Any) -> Hashable:
+    """
+    Dictionary key of a field value
+    
+    Values that compare equal but print differently (1, 1.0, True, 0.0,
+    -0.0) get different keys, since string conditions see str(value).
+    """
+    if type(value) is float:
+        return (float, value.hex())
+    return (type(value), value)
+
+
+def _exact_number(value: Any) -> bool:
+    """Number float64 holds exactly (bools are not numbers here)"""
+    return type(value) is float or (type(value) is int and -_EXACT_INTEGER <= value <= _EXACT_INTEGER)
+
+
+class EventBatch:
+    """
+    Events stored column by column
+    
+    Each field is dictionary-encoded on first use: an int32 code per event
+    into the list of the field's distinct values (None when missing). A
+    leaf condition only reads its field, so it is evaluated once per
+    distinct value with the row-wise compiled predicate and the results
+    are gathered by code, which keeps every operator's semantics,
+    errors included. Fields holding only numbers are kept as a float64
+    column instead, which comparisons with numbers and IN / NOT IN
+    lists run on directly. Fields of `strings` (a StringDictionary)
+    holding only strings are encoded with its codes, looked up in the
+    generation current when the batch was created (values it does not
+    hold get negative codes of this batch; the dictionary is never
+    added to): rule literals are resolved to codes once and = / != /
+    IN / NOT IN against strings compare integers, however many distinct
+    values the field has.
+    
+    AND / OR / NOT combine (matches, raises) masks the way the row-wise
+    predicates short-circuit in source order, so a batch reproduces their
+    outcome for every event. Leaf masks are cached per condition and
+    shared by every predicate and rule evaluated over the batch.
+    
+    Requires NumPy (see HAS_NUMPY). Not thread-safe.
+    """
+    
+    def __init__(self, events: List[Dict[str, Any]], strings: Optional[StringDictionary] = None):
+        if np is None:
+            raise RuntimeError("Columnar evaluation requires NumPy")
+        self.events = events
+        self.size = len(events)
+        self.strings = strings
+        self._lookup = strings.snapshot() if strings is not None else None
+        # Leaf conditions are compiled without string index or optimizer:
+        # one value at a time, in source order
+        self._compiler = RuleCompiler()
+        self._columns: Dict[str, Tuple[Any, List[Any]]] = {}
+        self._numbers: Dict[str, Optional[Tuple[Any, Any]]] = {}
+        self._string_codes: Dict[str, Optional[Any]] = {}
+        # String -> code for every string column of this batch
+        self._codes_of: Dict[str, int] = {}
+        self._leaves: Dict[Hashable, Masks] = {}
+    
+    def supports(self, node: ASTNode, building_blocks: Optional[Dict[str, ASTNode]] = None) -> bool:
+        """
+        Whether evaluating `node` by column is likely to beat walking the rows
+        
+        False when a leaf reads a field whose sampled values are mostly
+        distinct, unless the leaf runs on the field's float64 or string
+        code column.
+        """
+        building_blocks = building_blocks or {}
+        return all(
+            (self._numeric_leaf(leaf) and self._numeric_column(leaf.field) is not None)
+            or (self._string_leaf(leaf) and self._string_column(leaf.field) is not None)
+            or self._low_cardinality(leaf.field)
+            for leaf in self._leaves_of(node, building_blocks, ())
+        )
+    
+    def evaluate(self, node: ASTNode, building_blocks: Optional[Dict[str, ASTNode]] = None) -> Masks:
+        """
+        Evaluate a condition for every event of the batch
+        
+        Args:
+            node: AST root node
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+        
+        Returns:
+            (matches, raises) boolean arrays, as RuleCompiler's predicate
+            would return or raise for each event
+        
+        Raises:
+            BuildingBlockCycleError: If a reference loop is reached
+        """
+        return self._evaluate(node, building_blocks or {}, ())
+    
+    def _evaluate(self, node: ASTNode, building_blocks: Dict[str, ASTNode], resolving: Tuple[str, ...]) -> Masks:
+        if isinstance(node, LogicalNode):
+            if node.operator == 'NOT':
+                matches, raises = self._evaluate(node.children[0], building_blocks, resolving)
+                return ~matches & ~raises, raises
+            if node.operator not in ('AND', 'OR'):
+                return self._constant(False)
+            
+            conjunction = node.operator == 'AND'
+            matches = np.full(self.size, conjunction)
+            raises = np.zeros(self.size, dtype=bool)
+            for child in node.children:
+                # Events whose outcome later children can still change
+                undecided = matches if conjunction else ~matches & ~raises
+                if not undecided.any():
+                    break
+                child_matches, child_raises = self._evaluate(child, building_blocks, resolving)
+                raises = raises | (undecided & child_raises)
+                if conjunction:
+                    matches = matches & child_matches
+                else:
+                    matches = matches | (undecided & child_matches)
+            return matches, raises
+        
+        if isinstance(node, BuildingBlockRefNode):
+            if node.bb_id not in building_blocks:
+                return self._constant(False)
+            if node.bb_id in resolving:
+                raise BuildingBlockCycleError(list(resolving[resolving.index(node.bb_id):]) + [node.bb_id])
+            return self._evaluate(building_blocks[node.bb_id], building_blocks, resolving + (node.bb_id,))
+        
+        if isinstance(node, AggregationNode):
+            # Aggregations are handled at rule level, not event level
+            return self._constant(True)
+        
+        key = leaf_key(node)
+        if key is None:
+            return self._constant(False)
+        masks = self._leaves.get(key)
+        if masks is None:
+            masks = self._leaves[key] = self._evaluate_leaf(node)
+        return masks
+    
+    def _evaluate_leaf(self, node: ASTNode) -> Masks:
+        """Masks of one leaf condition"""
+        numbers = self._numeric_column(node.field) if self._numeric_leaf(node) else None
+        if numbers is not None:
+            values, present = numbers
+            if isinstance(node, InOpNode):
+                # Strings never equal numbers
+                found = np.isin(values, [member for member in node.members if type(member) is not str])
+                matches = present & (~found if node.negated else found)
+            else:
+                matches = present & COMPARISON_OPERATORS[node.operator](values, node.value)
+            # Numbers always compare, so nothing raises
+            return matches, np.zeros(self.size, dtype=bool)
+        
+        codes = self._string_column(node.field) if self._string_leaf(node) else None
+        if codes is not None:
+            # Every value of the field has a code, so literals without one match nothing
+            literals = [node.value] if isinstance(node, ComparisonNode) else node.members
+            known = [code for code in map(self._codes_of.get, literals) if code is not None]
+            found = np.isin(codes, known)
+            negated = node.operator == '!=' if isinstance(node, ComparisonNode) else node.negated
+            matches = (codes != -1) & ~found if negated else found
+            return matches, np.zeros(self.size, dtype=bool)
+        
+        codes, distinct = self._column(node.field)
+        predicate = self._compiler.compile(node)
+        field = node.field
+        results = np.zeros(len(distinct), dtype=bool)
+        raised = np.zeros(len(distinct), dtype=bool)
+        for code, value in enumerate(distinct):
+            try:
+                results[code] = bool(predicate({field: value}))
+            except Exception:
+                raised[code] = True
+        return results[codes], raised[codes]
+    
+    def _constant(self, value: bool) -> Masks:
+        return np.full(self.size, value), np.zeros(self.size, dtype=bool)
+    
+    def _column(self, field: str) -> Tuple[Any, List[Any]]:
+        """Dictionary-encode a field on first use: (codes, distinct values)"""
+        column = self._columns.get(field)
+        if column is not None:
+            return column
+        
+        index: Dict[Hashable, int] = {}
+        distinct: List[Any] = []
+        codes = []
+        for event in self.events:
+            value = event.get(field)
+            # Strings never equal the tuple keys of other values
+            key = value if type(value) is str else _value_key(value)
+            try:
+                code = index[key]
+            except KeyError:
+                code = index[key] = len(distinct)
+                distinct.append(value)
+            except TypeError:
+                # Unhashable values (lists, objects) get a code of their own
+                code = len(distinct)
+                distinct.append(value)
+            codes.append(code)
+        
+        column = self._columns[field] = (np.array(codes, dtype=np.int32), distinct)
+        return column
+    
+    def _numeric_column(self, field: str) -> Optional[Tuple[Any, Any]]:
+        """(float64 values, present) if every present value is an exact number, else None"""
+        if field in self._numbers:
+            return self._numbers[field]
+        
+        numbers = None
+        sample = [event.get(field) for event in self.events[:_SAMPLE_SIZE]]
+        if all(value is None or _exact_number(value) for value in sample):
+            column = [event.get(field) for event in self.events]
+            kinds = set(map(type, column))
+            if kinds <= {int, float, type(None)}:
+                if type(None) in kinds:
+                    present = np.fromiter((value is not None for value in column), dtype=bool, count=self.size)
+                    column = [0 if value is None else value for value in column]
+                else:
+                    present = np.ones(self.size, dtype=bool)
+                integers = [value for value in column if type(value) is int] if int in kinds else []
+                if not integers or -_EXACT_INTEGER <= min(integers) and max(integers) <= _EXACT_INTEGER:
+                    numbers = (np.array(column, dtype=np.float64), present)
+        
+        self._numbers[field] = numbers
+        return numbers
+    
+    def _string_column(self, field: str) -> Optional[Any]:
+        """
+        String codes of a field (-1 when missing) if the field is interned
+        and every present value is a string
+        
+        Codes are the StringDictionary's where it has one and negative
+        codes of this batch otherwise. A string keeps the code it was
+        first given even if the dictionary adds it meanwhile.
+        """
+        if field in self._string_codes:
+            return self._string_codes[field]
+        
+        codes = None
+        if self.strings is not None and field in self.strings.fields:
+            column = [event.get(field) for event in self.events]
+            if set(map(type, column)) <= {str, type(None)}:
+                codes_of = self._codes_of
+                lookup = self._lookup
+                encoded = []
+                for value in column:
+                    if value is None:
+                        encoded.append(-1)
+                        continue
+                    code = codes_of.get(value)
+                    if code is None:
+                        code = lookup(value)
+                        if code is None:
+                            code = -2 - len(codes_of)
+                        codes_of[value] = code
+                    encoded.append(code)
+                codes = np.array(encoded, dtype=np.int64)
+        
+        self._string_codes[field] = codes
+        return codes
+    
+    @staticmethod
+    def _string_leaf(node: ASTNode) -> bool:
+        """
+        Leaf string codes answer: = / != against a string, or IN / NOT IN
+        of strings only (members are normalized, so none looks numeric)
+        """
+        if isinstance(node, ComparisonNode):
+            return node.operator in ('=', '!=') and type(node.value) is str
+        if isinstance(node, InOpNode):
+            return node.members is not None and all(type(member) is str for member in node.members)
+        return False
+    
+    @staticmethod
+    def _numeric_leaf(node: ASTNode) -> bool:
+        """
+        Leaf a float64 column answers: comparison with an exact number, or
+        IN / NOT IN whose members are exact numbers or strings
+        """
+        if isinstance(node, ComparisonNode):
+            return node.operator in COMPARISON_OPERATORS and _exact_number(node.value)
+        if isinstance(node, InOpNode):
+            return node.members is not None and all(
+                type(member) is str or _exact_number(member) for member in node.members
+            )
+        return False
+    
+    def _low_cardinality(self, field: str) -> bool:
+        """Whether sampled values of a field repeat enough for per-value evaluation"""
+        if field in self._columns:
+            return len(self._columns[field][1]) <= self.size * _MAX_DISTINCT_RATIO
+        sample = self.events[:_SAMPLE_SIZE]
+        seen = set()
+        for event in sample:
+            try:
+                seen.add(_value_key(event.get(field)))
+            except TypeError:
+                return False
+        return len(seen) <= len(sample) * _MAX_DISTINCT_RATIO
+    
+    def _leaves_of(self, node: ASTNode, building_blocks: Dict[str, ASTNode], resolving: Tuple[str, ...]) -> List[ASTNode]:
+        """Leaf conditions of a tree, through Building Block references"""
+        if isinstance(node, LogicalNode):
+            return [
+                leaf for child in node.children
+                for leaf in self._leaves_of(child, building_blocks, resolving)
+            ]
+        if isinstance(node, BuildingBlockRefNode):
+            if node.bb_id not in building_blocks or node.bb_id in resolving:
+                return []
+            return self._leaves_of(building_blocks[node.bb_id], building_blocks, resolving + (node.bb_id,))
+        return [node] if leaf_key(node) is not None else []
+
+
+def tracker_from_masks(
+    predicate: Predicate,
+    events: List[Dict[str, Any]],
+    masks: Masks,
+    collect: bool = False,
+    limit: Optional[int] = None
+) -> PhaseTracker:
+    """
+    Finished PhaseTracker holding what a row-by-row walk would record
+    
+    The walk stops at the first raising event (and, without `collect`,
+    at the first match). The exception itself is obtained by calling
+    `predicate` on the event that raises.
+    """
+    matches, raises = masks
+    tracker = PhaseTracker(predicate, collect, limit)
+    raised = np.flatnonzero(raises)
+    stop = int(raised[0]) if len(raised) else len(events)
+    hits = np.flatnonzero(matches[:stop])
+    
+    tracker.matched = len(hits) > 0
+    if collect:
+        tracker.match_count = len(hits)
+        kept = hits if limit is None else hits[:limit]
+        tracker.events = [events[i] for i in kept]
+    if stop < len(events) and (collect or not tracker.matched):
+        try:
+            predicate(events[stop])
+        except Exception as e:
+            tracker.error = e
+    tracker.done = True
+    return tracker
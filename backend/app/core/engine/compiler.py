@@ -0,0 +1,366 @@
+"""
+Rule compiler - turns AST trees into specialized predicate closures
+"""
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.parser.ast_nodes import (
+    ASTNode, ComparisonNode, LogicalNode, AggregationNode,
+    BuildingBlockRefNode, RegexNode, StringOpNode, InOpNode, normalize_value
+)
+from app.core.regex_cache import regex_cache
+from app.core.engine.multi_pattern import StringMatchIndex
+from app.core.engine.optimizer import RuleOptimizer
+from app.core.engine.normalizer import (
+    SubexpressionMemo, EventResultTable, memoize_last_event, normalize
+)
+from app.core.engine.building_blocks import BuildingBlockGraph, BuildingBlockCycleError
+
+
+# Compiled predicate: event dict -> bool
+Predicate = Callable[[Dict[str, Any]], bool]
+
+COMPARISON_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _always_true(event: Dict[str, Any]) -> bool:
+    return True
+
+
+def _always_false(event: Dict[str, Any]) -> bool:
+    return False
+
+
+def _guarded(child: Predicate, jumped: List[Predicate], decisive: bool) -> Predicate:
+    """
+    Child moved ahead of pure siblings that preceded it in source order
+    
+    If the child raises, a sibling it jumped that returns `decisive`
+    (False under AND, True under OR) would have short-circuited before the
+    child ran, so that outcome wins over the error.
+    """
+    def predicate(event):
+        try:
+            return child(event)
+        except Exception:
+            for sibling in jumped:
+                if bool(sibling(event)) is decisive:
+                    return decisive
+            raise
+    
+    return predicate
+
+
+class RuleCompiler:
+    """
+    Compile AST nodes into predicate callables
+    
+    All operator dispatch happens once at compile time, so evaluating a
+    compiled predicate against an event is a chain of plain closure calls.
+    Semantics match Evaluator and the former RuleEngine._evaluate_node.
+    
+    An optional StringMatchIndex turns string operations on shared fields
+    into bit tests against one scan per field value, and an optional
+    RuleOptimizer picks the order AND / OR children are tried in. With a
+    SubexpressionMemo, trees are normalized first and conditions shared
+    between the compiled predicates are evaluated once per event.
+    
+    Building Blocks are compiled once per Building Block map, with the
+    Building Blocks they reference, and remember their result for the
+    latest event; with an EventResultTable, for every event of the list.
+    """
+    
+    def __init__(
+        self,
+        string_index: Optional[StringMatchIndex] = None,
+        optimizer: Optional[RuleOptimizer] = None,
+        memo: Optional[SubexpressionMemo] = None,
+        results: Optional[EventResultTable] = None
+    ):
+        self.string_index = string_index
+        self.optimizer = optimizer
+        self.memo = memo
+        self.results = results
+        # bb_id -> (Building Block map it was resolved with, predicate)
+        self._building_blocks: Dict[str, Tuple[Dict[str, ASTNode], Predicate]] = {}
+    
+    def compile(
+        self,
+        node: ASTNode,
+        building_blocks: Optional[Dict[str, ASTNode]] = None
+    ) -> Predicate:
+        """
+        Compile an AST into a single predicate
+        
+        Args:
+            node: AST root node
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+        
+        Returns:
+            Callable taking an event dict and returning bool
+        """
+        if self.memo is not None:
+            node = normalize(node)
+        return self._compile_node(node, building_blocks or {})
+    
+    def _compile_node(self, node: ASTNode, building_blocks: Dict[str, ASTNode]) -> Predicate:
+        """Compile a node, once per shared condition when memoizing"""
+        memo = self.memo
+        if memo is not None and not isinstance(node, BuildingBlockRefNode):
+            key = memo.key_for(node, building_blocks)
+            if key is not None:
+                predicate = memo.predicates.get(key)
+                if predicate is None:
+                    predicate = memoize_last_event(self._dispatch(node, building_blocks))
+                    memo.predicates[key] = predicate
+                return predicate
+        return self._dispatch(node, building_blocks)
+    
+    def compile_building_block(self, bb_id: str, building_blocks: Dict[str, ASTNode]) -> Predicate:
+        """
+        Compile a Building Block, resolving the Building Blocks it references
+        
+        Phase 1 and every reference to `bb_id` get the same memoized
+        predicate, so each Building Block runs once per event however many
+        rules and Building Blocks use it.
+        
+        Args:
+            bb_id: Building Block ID
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+        
+        Returns:
+            Callable taking an event dict and returning bool (always False
+            for unknown IDs)
+        
+        Raises:
+            BuildingBlockCycleError: If `bb_id` reaches a reference loop
+        """
+        cached = self._building_blocks.get(bb_id)
+        if cached is not None and cached[0] is building_blocks:
+            return cached[1]
+        if bb_id not in building_blocks:
+            return _always_false
+        
+        # Loops are rejected when Building Blocks are saved, but requests
+        # can still carry them
+        cycle = BuildingBlockGraph(building_blocks).find_cycle([bb_id])
+        if cycle is not None:
+            raise BuildingBlockCycleError(cycle)
+        
+        bb_ast = building_blocks[bb_id]
+        if self.memo is not None:
+            bb_ast = normalize(bb_ast)
+        predicate = self._compile_node(bb_ast, building_blocks)
+        if self.results is not None:
+            predicate = self.results.wrap(predicate)
+        else:
+            predicate = memoize_last_event(predicate)
+        self._building_blocks[bb_id] = (building_blocks, predicate)
+        return predicate
+    
+    def _dispatch(self, node: ASTNode, building_blocks: Dict[str, ASTNode]) -> Predicate:
+        """Dispatch on node class once and return the specialized closure"""
+        if isinstance(node, ComparisonNode):
+            return self._compile_comparison(node)
+        elif isinstance(node, StringOpNode):
+            return self._compile_string_op(node)
+        elif isinstance(node, RegexNode):
+            return self._compile_regex(node)
+        elif isinstance(node, InOpNode):
+            return self._compile_in_op(node)
+        elif isinstance(node, LogicalNode):
+            return self._compile_logical(node, building_blocks)
+        elif isinstance(node, BuildingBlockRefNode):
+            return self.compile_building_block(node.bb_id, building_blocks)
+        elif isinstance(node, AggregationNode):
+            # Aggregations are handled at rule level, not event level
+            return _always_true
+        
+        return _always_false
+    
+    @staticmethod
+    def _compile_comparison(node: ComparisonNode) -> Predicate:
+        """Compile field <op> value"""
+        field = node.field
+        value = node.value
+        compare = COMPARISON_OPERATORS.get(node.operator)
+        
+        if compare is None:
+            return _always_false
+        
+        if isinstance(value, (int, float)):
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                if isinstance(field_value, str):
+                    try:
+                        field_value = float(field_value)
+                    except (ValueError, TypeError):
+                        pass
+                return compare(field_value, value)
+        else:
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                return compare(field_value, value)
+        
+        return predicate
+    
+    def _compile_string_op(self, node: StringOpNode) -> Predicate:
+        """Compile CONTAINS / STARTSWITH / ENDSWITH"""
+        field = node.field
+        search_value = str(node.value)
+        
+        bit = self.string_index.bit_for(node) if self.string_index is not None else None
+        if bit is not None:
+            mask = self.string_index.mask
+            
+            def predicate(event):
+                return (mask(event, field) & bit) != 0
+        elif node.operator == 'CONTAINS':
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                return search_value in str(field_value)
+        elif node.operator == 'STARTSWITH':
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                return str(field_value).startswith(search_value)
+        elif node.operator == 'ENDSWITH':
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                return str(field_value).endswith(search_value)
+        else:
+            return _always_false
+        
+        return predicate
+    
+    @staticmethod
+    def _compile_regex(node: RegexNode) -> Predicate:
+        """Compile field MATCHES pattern"""
+        field = node.field
+        
+        try:
+            search = regex_cache.get(node.pattern).search
+        except re.error:
+            return _always_false
+        
+        def predicate(event):
+            field_value = event.get(field)
+            if field_value is None:
+                return False
+            return search(str(field_value)) is not None
+        
+        return predicate
+    
+    @staticmethod
+    def _compile_in_op(node: InOpNode) -> Predicate:
+        """Compile field IN (...) / field NOT IN (...)"""
+        field = node.field
+        values = node.values
+        members = node.members
+        negated = node.negated
+        
+        if members is None:
+            # Unhashable literals: plain scan
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                found = field_value in values
+                return not found if negated else found
+        else:
+            def predicate(event):
+                field_value = event.get(field)
+                if field_value is None:
+                    return False
+                try:
+                    found = normalize_value(field_value) in members
+                except TypeError:
+                    # Unhashable field value: fall back to a scan
+                    found = field_value in values
+                return not found if negated else found
+        
+        return predicate
+    
+    def _compile_logical(self, node: LogicalNode, building_blocks: Dict[str, ASTNode]) -> Predicate:
+        """Compile AND / OR / NOT with short-circuit evaluation"""
+        children = tuple(self._compile_node(child, building_blocks) for child in node.children)
+        
+        if self.optimizer is not None and node.operator in ('AND', 'OR') and len(children) > 1:
+            order, guards = self.optimizer.plan(node, building_blocks)
+            decisive = node.operator == 'OR'
+            children = tuple(
+                _guarded(children[index], [children[other] for other in guards[index]], decisive)
+                if index in guards else children[index]
+                for index in order
+            )
+        
+        if node.operator == 'NOT':
+            child = children[0]
+            
+            def predicate(event):
+                return not child(event)
+        elif node.operator == 'AND':
+            if len(children) == 2:
+                left, right = children
+                
+                def predicate(event):
+                    return left(event) and right(event)
+            else:
+                def predicate(event):
+                    for child in children:
+                        if not child(event):
+                            return False
+                    return True
+        elif node.operator == 'OR':
+            if len(children) == 2:
+                left, right = children
+                
+                def predicate(event):
+                    return left(event) or right(event)
+            else:
+                def predicate(event):
+                    for child in children:
+                        if child(event):
+                            return True
+                    return False
+        else:
+            return _always_false
+        
+        return predicate
+
+
+# Create global compiler instance
+rule_compiler = RuleCompiler()
+
+
+def compile_rule(
+    rule_ast: ASTNode,
+    building_blocks: Optional[Dict[str, ASTNode]] = None
+) -> Predicate:
+    """
+    Convenience function to compile a rule AST into a predicate
+    
+    Args:
+        rule_ast: Rule AST root node
+        building_blocks: Dict of Building Block ASTs
+    
+    Returns:
+        Callable taking an event dict and returning bool
+    """
+    return rule_compiler.compile(rule_ast, building_blocks)
@@ -1,9 +1,11 @@
 """
 Time-based event correlation engine
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
+from app.core.engine.timestamps import EventTimestamps
+from app.core.engine.grouping import GroupPartitions, MISSING_KEY, first_window
 
 
 class Correlator:
@@ -61,29 +63,30 @@ class Correlator:
             raise ValueError(f"Unknown time unit: {unit}")
     
     @staticmethod
-    def sort_events_by_timestamp(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def sort_events_by_timestamp(
+        events: List[Dict[str, Any]],
+        timestamps: Optional[EventTimestamps] = None
+    ) -> List[Dict[str, Any]]:
         """
         Sort events by timestamp
         
         Args:
             events: List of event dictionaries
+            timestamps: Pre-parsed timestamps for `events` (parsed if omitted)
             
         Returns:
             Sorted list of events
         """
-        def get_timestamp(event):
-            try:
-                return Correlator.parse_timestamp(event.get('timestamp', ''))
-            except:
-                return datetime.min
-        
-        return sorted(events, key=get_timestamp)
+        if timestamps is None:
+            timestamps = EventTimestamps(events)
+        return [events[i] for i in timestamps.sorted_indices()]
     
     @staticmethod
     def group_events_by_time_window(
         events: List[Dict[str, Any]],
         time_window: Dict[str, Any],
-        group_by: str = None
+        group_by: str = None,
+        timestamps: Optional[EventTimestamps] = None
     ) -> List[List[Dict[str, Any]]]:
         """
         Group events within time windows
@@ -92,6 +95,7 @@ class Correlator:
             events: List of event dictionaries
             time_window: Time window specification
             group_by: Optional field to group by (e.g., sourceIP)
+            timestamps: Pre-parsed timestamps for `events` (parsed if omitted)
             
         Returns:
             List of event groups
@@ -99,29 +103,19 @@ class Correlator:
         if not events:
             return []
         
-        # Sort events by timestamp
-        sorted_events = Correlator.sort_events_by_timestamp(events)
+        if timestamps is None:
+            timestamps = EventTimestamps(events)
+        window_seconds = Correlator.parse_time_window(time_window).total_seconds()
         
-        # Parse time window
-        window_delta = Correlator.parse_time_window(time_window)
+        result = []
+        for partition in Correlator._partitions(events, timestamps, group_by):
+            valid, times = Correlator._valid_times(partition, timestamps)
+            end = 0
+            for start in range(len(valid)):
+                end = Correlator._window_end(times, start, end, window_seconds)
+                result.append([events[i] for i in valid[start:end]])
         
-        # Group events
-        if group_by:
-            # Group by field value (e.g., sourceIP)
-            grouped = defaultdict(list)
-            for event in sorted_events:
-                key = event.get(group_by, '__none__')
-                grouped[key].append(event)
-            
-            # Apply time window to each group
-            result = []
-            for key, group_events in grouped.items():
-                result.extend(Correlator._apply_time_window(group_events, window_delta))
-            
-            return result
-        else:
-            # Apply time window to all events
-            return Correlator._apply_time_window(sorted_events, window_delta)
+        return result
     
     @staticmethod
     def _apply_time_window(
@@ -138,58 +132,215 @@ class Correlator:
         Returns:
             List of event groups within time windows
         """
-        if not events:
-            return []
+        timestamps = EventTimestamps(events)
+        valid, times = Correlator._valid_times(range(len(events)), timestamps)
+        window_seconds = window_delta.total_seconds()
         
         groups = []
-        
-        for i, event in enumerate(events):
-            try:
-                event_time = Correlator.parse_timestamp(event.get('timestamp', ''))
-            except:
-                continue
-            
-            # Collect events within window starting from this event
-            window_events = [event]
-            window_end = event_time + window_delta
-            
-            for j in range(i + 1, len(events)):
-                try:
-                    next_time = Correlator.parse_timestamp(events[j].get('timestamp', ''))
-                    if next_time <= window_end:
-                        window_events.append(events[j])
-                    else:
-                        break
-                except:
-                    continue
-            
-            groups.append(window_events)
+        end = 0
+        for start in range(len(valid)):
+            end = Correlator._window_end(times, start, end, window_seconds)
+            groups.append([events[i] for i in valid[start:end]])
         
         return groups
     
+    @staticmethod
+    def _partitions(
+        events: List[Dict[str, Any]],
+        timestamps: EventTimestamps,
+        group_by: Optional[str]
+    ) -> Iterable[List[int]]:
+        """
+        Split sorted event indices by GROUP BY key
+        
+        Partitions come out in order of first appearance in the sorted list.
+        """
+        order = timestamps.sorted_indices()
+        if not group_by:
+            return [order]
+        
+        grouped = defaultdict(list)
+        for i in order:
+            grouped[events[i].get(group_by, MISSING_KEY)].append(i)
+        return grouped.values()
+    
+    @staticmethod
+    def _valid_times(
+        indices: Iterable[int],
+        timestamps: EventTimestamps
+    ) -> Tuple[List[int], List[float]]:
+        """
+        Keep indices with a parseable timestamp
+        
+        Events whose timestamp cannot be parsed never start or join a
+        window, so they are dropped here.
+        
+        Returns:
+            Tuple of (event indices, epoch seconds)
+        """
+        epochs = timestamps.epochs
+        valid = [i for i in indices if epochs[i] == epochs[i]]
+        return valid, [epochs[i] for i in valid]
+    
+    @staticmethod
+    def _window_end(times: List[float], start: int, end: int, window_seconds: float) -> int:
+        """
+        Advance the right edge of the window starting at `start`
+        
+        Both edges only move forward, so a full sweep is linear.
+        
+        Returns:
+            Exclusive end index of the window
+        """
+        end = max(end, start + 1)
+        limit = times[start] + window_seconds
+        while end < len(times) and times[end] <= limit:
+            end += 1
+        return end
+    
     @staticmethod
     def find_matching_window(
         events: List[Dict[str, Any]],
         time_window: Dict[str, Any],
         min_count: int,
-        group_by: str = None
+        group_by: str = None,
+        timestamps: Optional[EventTimestamps] = None
     ) -> tuple[bool, List[Dict[str, Any]]]:
         """
         Find if there's a time window with minimum event count
         
+        Windows are scanned with two pointers and the search stops at the
+        first qualifying window, so no window list is materialized.
+        
         Args:
             events: List of event dictionaries
             time_window: Time window specification
             min_count: Minimum number of events required
             group_by: Optional field to group by
+            timestamps: Pre-parsed timestamps for `events` (parsed if omitted)
             
         Returns:
             Tuple of (found, matching_events)
         """
-        groups = Correlator.group_events_by_time_window(events, time_window, group_by)
+        if not events:
+            return False, []
+        
+        if timestamps is None:
+            timestamps = EventTimestamps(events)
+        window_seconds = Correlator.parse_time_window(time_window).total_seconds()
         
-        for group in groups:
-            if len(group) >= min_count:
-                return True, group
+        for partition in Correlator._partitions(events, timestamps, group_by):
+            valid, times = Correlator._valid_times(partition, timestamps)
+            end = 0
+            for start in range(len(valid)):
+                end = Correlator._window_end(times, start, end, window_seconds)
+                if end - start >= min_count:
+                    return True, [events[i] for i in valid[start:end]]
         
         return False, []
+    
+    @staticmethod
+    def find_aggregate_window(
+        events: List[Dict[str, Any]],
+        time_window: Dict[str, Any],
+        function: str,
+        field: str,
+        condition: Callable[[Any], bool],
+        group_by: str = None,
+        timestamps: Optional[EventTimestamps] = None
+    ) -> Tuple[bool, List[Dict[str, Any]], Any]:
+        """
+        Find a time window whose aggregate satisfies a condition
+        
+        Every window position is checked: the window starting at each event
+        and reaching `time_window` past it, as in find_matching_window().
+        Each partition is swept by first_window(), whose accumulator adds
+        events entering on the right and removes events leaving on the
+        left, so the sweep is linear whatever the function (monotonic
+        deques for MIN / MAX, running sums for SUM / AVG).
+        
+        Args:
+            events: List of event dictionaries
+            time_window: Time window specification
+            function: Aggregation function name (COUNT, SUM, AVG, MIN, MAX)
+            field: Field name to aggregate
+            condition: Test applied to each window's aggregate value
+            group_by: Optional field to group by
+            timestamps: Pre-parsed timestamps for `events` (parsed if omitted)
+            
+        Returns:
+            Tuple of (found, matching_events, aggregate value of the match)
+        """
+        if not events:
+            return False, [], None
+        
+        if timestamps is None:
+            timestamps = EventTimestamps(events)
+        window_seconds = Correlator.parse_time_window(time_window).total_seconds()
+        
+        partitions = GroupPartitions(events, timestamps, group_by)
+        for key in partitions.keys():
+            match = first_window(
+                events, partitions.indices(key), timestamps.epochs,
+                window_seconds, function, field, condition
+            )
+            if match is not None:
+                window, value = match
+                return True, [events[i] for i in window], value
+        
+        return False, [], None
+    
+    @staticmethod
+    def find_group_windows(
+        events: List[Dict[str, Any]],
+        time_window: Dict[str, Any],
+        function: str,
+        field: str,
+        condition: Callable[[Any], bool],
+        group_by: str,
+        timestamps: Optional[EventTimestamps] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find every GROUP BY key with a window whose aggregate satisfies a condition
+        
+        Events are hash-partitioned by key in one pass (see GroupPartitions)
+        and each partition is swept on its own, stopping at its first
+        matching window, so no window list is built and later windows of
+        a key that already matched are skipped.
+        
+        Args:
+            events: List of event dictionaries
+            time_window: Time window specification
+            function: Aggregation function name (COUNT, SUM, AVG, MIN, MAX)
+            field: Field name to aggregate
+            condition: Test applied to each window's aggregate value
+            group_by: Field to group by
+            timestamps: Pre-parsed timestamps for `events` (parsed if omitted)
+            
+        Returns:
+            One dict per matching key, in order of first appearance, with
+            'key', 'matched_events' (its first matching window) and 'value'
+        """
+        if not events:
+            return []
+        
+        if timestamps is None:
+            timestamps = EventTimestamps(events)
+        window_seconds = Correlator.parse_time_window(time_window).total_seconds()
+        
+        groups = []
+        partitions = GroupPartitions(events, timestamps, group_by)
+        for key in partitions.keys():
+            match = first_window(
+                events, partitions.indices(key), timestamps.epochs,
+                window_seconds, function, field, condition
+            )
+            if match is not None:
+                window, value = match
+                groups.append({
+                    "key": key,
+                    "matched_events": [events[i] for i in window],
+                    "value": value
+                })
+        
+        return groups
@@ -4,8 +4,9 @@ Expression evaluator for individual conditions
 import re
 from typing import Any, Dict
 from app.core.parser.ast_nodes import (
-    ComparisonNode, StringOpNode, RegexNode, InOpNode
+    ComparisonNode, StringOpNode, RegexNode, InOpNode, normalize_value
 )
+from app.core.regex_cache import regex_cache
 
 
 class Evaluator:
@@ -116,7 +117,7 @@ class Evaluator:
         field_value = str(field_value)
         
         try:
-            pattern = re.compile(node.pattern)
+            pattern = regex_cache.get(node.pattern)
             return pattern.search(field_value) is not None
         except re.error:
             return False
@@ -138,7 +139,11 @@ class Evaluator:
         if field_value is None:
             return False
         
-        result = field_value in node.values
+        try:
+            result = normalize_value(field_value) in node.members
+        except TypeError:
+            # Unhashable field value (or list literal): fall back to a scan
+            result = field_value in node.values
         
         # Apply negation if needed
         if node.negated:
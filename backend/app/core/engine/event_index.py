@@ -0,0 +1,161 @@
+"""
+Inverted index of an event list for Building Block lookups
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.parser.ast_nodes import (
+    ASTNode, ComparisonNode, LogicalNode, BuildingBlockRefNode, InOpNode, normalize_value
+)
+
+
+# Forms field values are indexed in, as the compiled predicates compare them
+RAW_VIEW = 'raw'          # = / != against a string: the value as is
+NUMERIC_VIEW = 'numeric'  # = / != against a number: numeric strings via float()
+MEMBER_VIEW = 'member'    # IN / NOT IN: normalize_value()
+
+
+def _mask(positions: Iterable[int], size: int) -> int:
+    """Bitmask with the given event positions set"""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class EventIndex:
+    """
+    Event positions by field value, built once per event list
+    
+    Building Blocks made only of =, !=, IN and NOT IN conditions joined
+    by AND / OR / NOT (references to such Building Blocks included) are
+    answered by combining bitmasks of matching event positions instead of
+    evaluating them event by event. None of these conditions can raise,
+    so the bitmask is the whole outcome. Each field is indexed on first
+    use, per view (see RAW_VIEW, NUMERIC_VIEW, MEMBER_VIEW).
+    
+    The index belongs to one evaluation and is not thread-safe.
+    """
+    
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.events = events
+        self.size = len(events)
+        self.all = (1 << self.size) - 1
+        # field -> events where the field is present (not None)
+        self._present: Dict[str, int] = {}
+        # (field, view) -> indexed value -> event positions
+        self._views: Dict[Tuple[str, str], Dict[Any, List[int]]] = {}
+    
+    def matches(self, node: ASTNode, building_blocks: Optional[Dict[str, ASTNode]] = None) -> Optional[int]:
+        """
+        Bitmask of the events matching a condition
+        
+        Args:
+            node: AST root node
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+        
+        Returns:
+            Bit i set when events[i] matches, or None when the condition
+            cannot be answered from the index
+        """
+        building_blocks = building_blocks or {}
+        if not self.supports(node, building_blocks):
+            return None
+        return self._matches(node, building_blocks)
+    
+    def supports(self, node: ASTNode, building_blocks: Dict[str, ASTNode], resolving: Tuple[str, ...] = ()) -> bool:
+        """Whether the index can answer `node` (reference loops cannot be)"""
+        if isinstance(node, ComparisonNode):
+            return node.operator in ('=', '!=') and isinstance(node.value, (str, int, float))
+        if isinstance(node, InOpNode):
+            return node.members is not None
+        if isinstance(node, LogicalNode):
+            return node.operator in ('AND', 'OR', 'NOT') and all(
+                self.supports(child, building_blocks, resolving) for child in node.children
+            )
+        if isinstance(node, BuildingBlockRefNode):
+            if node.bb_id not in building_blocks:
+                return True
+            if node.bb_id in resolving:
+                return False
+            return self.supports(building_blocks[node.bb_id], building_blocks, resolving + (node.bb_id,))
+        return False
+    
+    def _matches(self, node: ASTNode, building_blocks: Dict[str, ASTNode]) -> int:
+        if isinstance(node, ComparisonNode):
+            view = NUMERIC_VIEW if isinstance(node.value, (int, float)) else RAW_VIEW
+            equal = self._lookup(node.field, view, [node.value])
+            if node.operator == '=':
+                return equal
+            return self._present_mask(node.field) & ~equal
+        
+        if isinstance(node, InOpNode):
+            found = self._lookup(node.field, MEMBER_VIEW, node.members)
+            if node.negated:
+                return self._present_mask(node.field) & ~found
+            return found
+        
+        if isinstance(node, LogicalNode):
+            masks = [self._matches(child, building_blocks) for child in node.children]
+            if node.operator == 'NOT':
+                return self.all & ~masks[0]
+            result = masks[0]
+            for mask in masks[1:]:
+                result = result & mask if node.operator == 'AND' else result | mask
+            return result
+        
+        # Building Block reference; unknown IDs never match
+        if node.bb_id not in building_blocks:
+            return 0
+        return self._matches(building_blocks[node.bb_id], building_blocks)
+    
+    def _lookup(self, field: str, view: str, values: Iterable[Any]) -> int:
+        """Events whose field value, in `view` form, equals one of `values`"""
+        index = self._view(field, view)
+        positions: List[int] = []
+        for value in values:
+            bucket = index.get(value)
+            if bucket:
+                positions.extend(bucket)
+        return _mask(positions, self.size)
+    
+    def _present_mask(self, field: str) -> int:
+        present = self._present.get(field)
+        if present is None:
+            present = _mask(
+                (position for position, event in enumerate(self.events) if event.get(field) is not None),
+                self.size
+            )
+            self._present[field] = present
+        return present
+    
+    def _view(self, field: str, view: str) -> Dict[Any, List[int]]:
+        """Index one field in one view on first use"""
+        index = self._views.get((field, view))
+        if index is not None:
+            return index
+        
+        index = {}
+        for position, event in enumerate(self.events):
+            value = event.get(field)
+            if value is None:
+                continue
+            if view == MEMBER_VIEW:
+                key = normalize_value(value)
+            elif view == NUMERIC_VIEW and isinstance(value, str):
+                try:
+                    key = float(value)
+                except (ValueError, TypeError):
+                    key = value
+            else:
+                key = value
+            try:
+                bucket = index.get(key)
+            except TypeError:
+                # Unhashable values (lists, objects) equal no literal
+                continue
+            if bucket is None:
+                index[key] = [position]
+            else:
+                bucket.append(position)
+        
+        self._views[(field, view)] = index
+        return index
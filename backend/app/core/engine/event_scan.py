@@ -0,0 +1,162 @@
+"""
+Single-pass event scan shared by all rule evaluation phases
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.engine.compiler import Predicate
+
+
+class PhaseTracker:
+    """
+    Track one predicate across a stream of events
+    
+    Mirrors the semantics of ``any(predicate(e) for e in events)`` and, when
+    ``collect`` is set, of ``[e for e in events if predicate(e)]``: the first
+    exception stops the tracker and is re-raised when the outcome is read.
+    With ``limit`` only the first matches are kept while all are counted.
+    """
+    
+    __slots__ = ('predicate', 'collect', 'limit', 'matched', 'match_count', 'events', 'error', 'done')
+    
+    def __init__(self, predicate: Predicate, collect: bool = False, limit: Optional[int] = None):
+        self.predicate = predicate
+        self.collect = collect
+        self.limit = limit
+        self.matched = False
+        self.match_count = 0
+        self.events: List[Dict[str, Any]] = []
+        self.error: Optional[Exception] = None
+        self.done = False
+    
+    @classmethod
+    def answered(cls, matched: bool) -> "PhaseTracker":
+        """Finished tracker for an any() outcome known without scanning"""
+        tracker = cls(None)
+        tracker.matched = matched
+        tracker.done = True
+        return tracker
+    
+    def observe(self, event: Dict[str, Any]) -> None:
+        """Evaluate the predicate against one event"""
+        try:
+            if self.predicate(event):
+                self.matched = True
+                if self.collect:
+                    self.match_count += 1
+                    if self.limit is None or len(self.events) < self.limit:
+                        self.events.append(event)
+                else:
+                    self.done = True
+        except Exception as e:
+            self.error = e
+            self.done = True
+    
+    def any_matched(self) -> bool:
+        """Outcome with any() semantics"""
+        if self.matched:
+            return True
+        if self.error is not None:
+            raise self.error
+        return False
+    
+    def matched_events(self) -> List[Dict[str, Any]]:
+        """Outcome with list-comprehension semantics"""
+        if self.error is not None:
+            raise self.error
+        return self.events
+
+
+class EventScan:
+    """
+    Walk the event list once and record every phase outcome
+    
+    Building Block, normal-logic/regex and final-match predicates are all
+    evaluated in the same loop; trackers that reached their answer drop out
+    so the walk stops as soon as nothing is left to learn.
+    """
+    
+    def __init__(
+        self,
+        bb_predicates: Dict[str, Predicate],
+        logic_predicate: Optional[Predicate] = None,
+        rule_predicate: Optional[Predicate] = None,
+        max_matches: Optional[int] = None,
+        shared_bb_trackers: Optional[Dict[str, PhaseTracker]] = None
+    ):
+        """
+        Args:
+            bb_predicates: Compiled Building Block predicates {bb_id: predicate}
+            logic_predicate: BB-free rule predicate (phases 2 and 3)
+            rule_predicate: Full rule predicate whose matches are collected
+            max_matches: Keep at most this many matched events (all are counted)
+            shared_bb_trackers: Building Block outcomes from a scan of the same
+                events done for several rules; these are not scanned again
+        """
+        self.shared_bb_trackers = shared_bb_trackers or {}
+        self.bb_trackers = {bb_id: PhaseTracker(p) for bb_id, p in bb_predicates.items()}
+        self.rule_tracker = None
+        if rule_predicate is not None:
+            self.rule_tracker = PhaseTracker(rule_predicate, collect=True, limit=max_matches)
+        
+        if logic_predicate is not None and logic_predicate is rule_predicate:
+            # Same predicate: the collecting tracker answers the any() question too
+            self.logic_tracker = self.rule_tracker
+        elif logic_predicate is not None:
+            self.logic_tracker = PhaseTracker(logic_predicate)
+        else:
+            self.logic_tracker = None
+        
+        self.events_scanned = 0
+        self._active = list(self.bb_trackers.values())
+        for tracker in (self.logic_tracker, self.rule_tracker):
+            if tracker is not None and tracker not in self._active:
+                self._active.append(tracker)
+    
+    @classmethod
+    def from_trackers(
+        cls,
+        bb_trackers: Dict[str, PhaseTracker],
+        logic_tracker: Optional[PhaseTracker] = None,
+        rule_tracker: Optional[PhaseTracker] = None,
+        shared_bb_trackers: Optional[Dict[str, PhaseTracker]] = None
+    ) -> "EventScan":
+        """Finished scan whose trackers were answered without walking the events"""
+        scan = cls({}, shared_bb_trackers=shared_bb_trackers)
+        scan.bb_trackers = bb_trackers
+        scan.logic_tracker = logic_tracker
+        scan.rule_tracker = rule_tracker
+        return scan
+    
+    def feed(self, events: Iterable[Dict[str, Any]]) -> "EventScan":
+        """Scan a batch of events; may be called repeatedly"""
+        active = self._active
+        for event in events:
+            if not active:
+                break
+            self.events_scanned += 1
+            finished = False
+            for tracker in active:
+                tracker.observe(event)
+                finished = finished or tracker.done
+            if finished:
+                active = self._active = [t for t in active if not t.done]
+        return self
+    
+    def bb_matched(self, bb_id: str) -> bool:
+        """Whether at least one event matched the Building Block"""
+        tracker = self.bb_trackers.get(bb_id)
+        if tracker is None:
+            tracker = self.shared_bb_trackers[bb_id]
+        return tracker.any_matched()
+    
+    def logic_matched(self) -> bool:
+        """Whether at least one event matched the BB-free rule predicate"""
+        return self.logic_tracker.any_matched()
+    
+    def matched_events(self) -> List[Dict[str, Any]]:
+        """Events matching the full rule predicate"""
+        return self.rule_tracker.matched_events()
+    
+    def match_count(self) -> int:
+        """Number of events matching the full rule predicate"""
+        self.rule_tracker.matched_events()
+        return self.rule_tracker.match_count
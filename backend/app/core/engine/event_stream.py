@@ -0,0 +1,133 @@
+"""
+Incremental decoder for NDJSON / JSON-array event uploads
+"""
+import codecs
+import json
+from typing import Any, Dict, List
+
+
+class EventStreamDecoder:
+    """
+    Push-based decoder for event files arriving in chunks
+    
+    The format is detected from the first non-whitespace character: '['
+    starts a JSON array of event objects, anything else is read as NDJSON
+    (one event object per line). Only the current partial line or array
+    element is buffered.
+    """
+    
+    def __init__(self, max_event_size: int = 1024 * 1024):
+        self.max_event_size = max_event_size
+        self.format = None  # 'ndjson' or 'array'
+        self.events_decoded = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._line = 0
+        self._array_closed = False
+    
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """
+        Decode a chunk of the upload
+        
+        Args:
+            chunk: Raw bytes
+        
+        Returns:
+            Events completed by this chunk
+        
+        Raises:
+            ValueError: If the data is not valid NDJSON / JSON-array events
+        """
+        return self._decode(self._decoder.decode(chunk), final=False)
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Flush the decoder at end of input
+        
+        Returns:
+            Remaining events
+        
+        Raises:
+            ValueError: If the input ends inside an event or array
+        """
+        events = self._decode(self._decoder.decode(b"", final=True), final=True)
+        if self.format == 'array' and not self._array_closed:
+            raise ValueError("Unexpected end of input: JSON array not closed")
+        return events
+    
+    def _decode(self, text: str, final: bool) -> List[Dict[str, Any]]:
+        self._buffer += text
+        
+        if self.format is None:
+            stripped = self._buffer.lstrip()
+            if not stripped:
+                self._buffer = ""
+                return []
+            if stripped[0] == '[':
+                self.format = 'array'
+                self._buffer = stripped[1:]
+            else:
+                self.format = 'ndjson'
+        
+        if self.format == 'array':
+            events = self._decode_array(final)
+        else:
+            events = self._decode_lines(final)
+        
+        if len(self._buffer) > self.max_event_size:
+            raise ValueError(f"Event {self.events_decoded + 1} exceeds {self.max_event_size} bytes")
+        return events
+    
+    def _decode_lines(self, final: bool) -> List[Dict[str, Any]]:
+        lines = self._buffer.split("\n")
+        self._buffer = "" if final else lines.pop()
+        
+        events = []
+        for line in lines:
+            self._line += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {self._line}: invalid JSON ({e.msg})")
+            events.append(self._check_event(event))
+        return events
+    
+    def _decode_array(self, final: bool) -> List[Dict[str, Any]]:
+        buffer = self._buffer
+        position = 0
+        events = []
+        
+        while True:
+            # Skip whitespace and separators between elements
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if self._array_closed:
+                raise ValueError("Unexpected data after end of JSON array")
+            if buffer[position] == ']':
+                self._array_closed = True
+                position += 1
+                continue
+            try:
+                event, end = self._json.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if final:
+                    raise ValueError(f"Event {self.events_decoded + 1}: invalid JSON ({e.msg})")
+                # Element is incomplete, wait for more data
+                break
+            events.append(self._check_event(event))
+            position = end
+        
+        self._buffer = buffer[position:]
+        return events
+    
+    def _check_event(self, event: Any) -> Dict[str, Any]:
+        self.events_decoded += 1
+        if not isinstance(event, dict):
+            raise ValueError(f"Event {self.events_decoded}: expected a JSON object")
+        return event
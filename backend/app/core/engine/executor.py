@@ -0,0 +1,101 @@
+"""
+Bounded executor for CPU-bound work started from async routes
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from app.config import settings
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the executor queue is full"""
+    pass
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded backlog
+    
+    At most `max_workers` calls run at once and at most `max_queue` more
+    wait for a thread. Submissions beyond that are rejected immediately
+    with ExecutorBusyError instead of piling up, so a burst of heavy rule
+    tests cannot hold the API hostage.
+    """
+    
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation")
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self.completed = 0
+        # Calls the executor could not start (e.g. submitted after
+        # shutdown); exceptions raised by func belong to the caller
+        self.failed = 0
+        self.rejected = 0
+    
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) on a worker thread and await its result
+        
+        Raises:
+            ExecutorBusyError: If max_workers calls are running and
+                max_queue more are waiting
+        """
+        with self._lock:
+            if self._running + self._queued >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusyError(
+                    f"Evaluation queue is full ({self.max_queue} waiting, {self.max_workers} running)"
+                )
+            self._queued += 1
+        
+        try:
+            future = self._pool.submit(self._call, func, args)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+    
+    def _on_done(self, future) -> None:
+        if future.cancelled():
+            # Cancelled while waiting (e.g. client went away): never ran
+            with self._lock:
+                self._queued -= 1
+    
+    def _call(self, func: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Concurrency limits and current queue depth"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+    
+    def shutdown(self) -> None:
+        """Wait for running calls and stop the threads"""
+        self._pool.shutdown()
+
+
+# Create global executor instance
+evaluation_executor = BoundedExecutor(settings.EVALUATION_THREADS, settings.EVALUATION_QUEUE_SIZE)
@@ -0,0 +1,99 @@
+"""
+Hash-partitioned GROUP BY for time-window correlation
+"""
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.core.engine.accumulators import create_accumulator
+from app.core.engine.timestamps import EventTimestamps
+
+
+# Key of events without the GROUP BY field, as Correlator._partitions uses
+MISSING_KEY = '__none__'
+
+
+class GroupPartitions:
+    """
+    Event indices split by GROUP BY key in one pass
+    
+    Indices are taken in timestamp order and kept per key in compact
+    ``array('q')`` buffers, 8 bytes per event. Events with unparseable
+    timestamps are left out but still count for key order, so keys come
+    out in order of first appearance as in Correlator._partitions (a key
+    may have no indices). Partitions are not capped: they only index
+    events already held in memory, so they grow with the event list, and
+    dropping keys or events would silently change which windows match.
+    """
+    
+    def __init__(
+        self,
+        events: List[Dict[str, Any]],
+        timestamps: EventTimestamps,
+        group_by: Optional[str]
+    ):
+        self.group_by = group_by
+        self._buffers: Dict[Any, array] = {}
+        
+        epochs = timestamps.epochs
+        buffers = self._buffers
+        for i in timestamps.sorted_indices():
+            key = events[i].get(group_by, MISSING_KEY) if group_by else None
+            buffer = buffers.get(key)
+            if buffer is None:
+                buffer = buffers[key] = array('q')
+            # Keyed before skipping, so key order matches Correlator._partitions
+            if epochs[i] == epochs[i]:
+                buffer.append(i)
+    
+    def __len__(self) -> int:
+        return len(self._buffers)
+    
+    def keys(self) -> Iterator[Any]:
+        """GROUP BY keys in order of first appearance"""
+        return iter(self._buffers)
+    
+    def indices(self, key: Any) -> Iterator[int]:
+        """Event indices of one partition in timestamp order"""
+        return iter(self._buffers[key])
+
+
+def first_window(
+    events: List[Dict[str, Any]],
+    indices: Iterator[int],
+    epochs: array,
+    window_seconds: float,
+    function: str,
+    field: str,
+    condition: Callable[[Any], bool]
+) -> Optional[Tuple[List[int], Any]]:
+    """
+    First window of a partition whose aggregate satisfies `condition`
+    
+    One window per starting event, reaching `window_seconds` past it,
+    checked in order of start; this is the sweep behind
+    Correlator.find_aggregate_window() and find_group_windows(). Indices
+    are streamed: only the current window is held, and the sweep stops
+    at the first match.
+    
+    Returns:
+        Tuple of (window event indices, aggregate value), or None
+    """
+    accumulator = create_accumulator(function)
+    window = deque()
+    for index in indices:
+        epoch = epochs[index]
+        # Windows ending before this event are complete
+        while window and epoch > epochs[window[0]] + window_seconds:
+            value = accumulator.value()
+            if condition(value):
+                return list(window), value
+            accumulator.remove(events[window.popleft()].get(field))
+        window.append(index)
+        accumulator.add(events[index].get(field))
+    
+    while window:
+        value = accumulator.value()
+        if condition(value):
+            return list(window), value
+        accumulator.remove(events[window.popleft()].get(field))
+    return None
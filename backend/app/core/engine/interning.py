@@ -0,0 +1,137 @@
+"""
+String interning for repeated event field values
+"""
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+
+
+class _Generation:
+    """Strings and codes added since the dictionary last started over"""
+    
+    __slots__ = ('number', 'codes', 'strings', 'size_bytes')
+    
+    def __init__(self, number: int):
+        self.number = number
+        self.codes: Dict[str, int] = {}
+        self.strings: List[str] = []
+        self.size_bytes = 0
+
+
+class StringDictionary:
+    """
+    Process-wide dictionary of strings seen in event fields
+    
+    Every distinct string gets one canonical object and an integer code.
+    Interning `fields` of ingested events makes events share those
+    objects, so a replay holds each repeated IP address, user name or
+    event name once, and equal values are the same object (string
+    equality then returns at the identity check). Columnar batches look
+    fields' values up here and give values not found codes of their own.
+    
+    Memory is bounded by generations: once `max_strings` strings or
+    `max_bytes` bytes of them are held, the dictionary starts over empty
+    with a new generation number. Codes are only stable within a
+    generation; events interned earlier keep the objects they were given.
+    """
+    
+    def __init__(self, fields: Iterable[str] = (), max_strings: int = 262144, max_bytes: int = 32 * 1024 * 1024):
+        self.fields = tuple(fields)
+        self.max_strings = max_strings
+        self.max_bytes = max_bytes
+        self._current = _Generation(0)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._current.strings)
+    
+    @property
+    def generation(self) -> int:
+        """Number of times the dictionary started over"""
+        return self._current.number
+    
+    @property
+    def size_bytes(self) -> int:
+        """Memory held by the strings of the current generation"""
+        return self._current.size_bytes
+    
+    def code(self, value: str) -> int:
+        """Code of a string in the current generation, added if new"""
+        return self._add(value)[0]
+    
+    def lookup(self, value: str) -> Optional[int]:
+        """Code of a string in the current generation, None if it is not there"""
+        return self._current.codes.get(value)
+    
+    def snapshot(self) -> Callable[[str], Optional[int]]:
+        """lookup() of the current generation, unaffected by later resets"""
+        return self._current.codes.get
+    
+    def intern(self, value: str) -> str:
+        """Canonical object equal to `value`"""
+        return self._add(value)[1]
+    
+    def intern_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replace the string values of interned fields by their canonical objects
+        
+        Args:
+            event: Event dictionary, modified in place
+        
+        Returns:
+            The same event dictionary
+        """
+        for field in self.fields:
+            value = event.get(field)
+            if type(value) is str:
+                event[field] = self.intern(value)
+        return event
+    
+    def reset(self) -> None:
+        """Start over with an empty generation"""
+        with self._lock:
+            self._current = _Generation(self._current.number + 1)
+    
+    def _add(self, value: str) -> Tuple[int, str]:
+        """(code, canonical object), both from one generation"""
+        # One read of the generation, so a concurrent reset cannot mix tables
+        generation = self._current
+        code = generation.codes.get(value)
+        if code is None:
+            with self._lock:
+                generation = self._current
+                code = generation.codes.get(value)
+                if code is None:
+                    size = sys.getsizeof(value)
+                    if len(generation.strings) >= self.max_strings or generation.size_bytes + size > self.max_bytes:
+                        generation = self._current = _Generation(generation.number + 1)
+                    code = len(generation.strings)
+                    # Code is published last, so readers never see it before its string
+                    generation.strings.append(value)
+                    generation.size_bytes += size
+                    generation.codes[value] = code
+        return code, generation.strings[code]
+
+
+# Create global string dictionary
+string_dictionary = StringDictionary(
+    settings.INTERNED_FIELDS,
+    max_strings=settings.INTERN_MAX_STRINGS,
+    max_bytes=settings.INTERN_MAX_BYTES
+)
+
+
+def intern_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Convenience function to intern ingested events' repeated fields
+    
+    Args:
+        events: Event dictionaries, modified in place
+    
+    Returns:
+        The same list
+    """
+    for event in events:
+        string_dictionary.intern_event(event)
+    return events
@@ -0,0 +1,225 @@
+"""
+Multi-pattern string matching for CONTAINS / STARTSWITH / ENDSWITH
+"""
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.core.parser.ast_nodes import ASTNode, LogicalNode, StringOpNode
+
+
+STRING_OPERATORS = ('CONTAINS', 'STARTSWITH', 'ENDSWITH')
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a fixed set of non-empty patterns
+    
+    One scan of a text reports, as bitmasks over pattern ids, which patterns
+    occur anywhere, which are prefixes and which are suffixes of the text.
+    """
+    
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self.max_length = max((len(p) for p in self.patterns), default=0)
+        
+        goto: List[Dict[str, int]] = [{}]
+        fail = [0]
+        out = [0]
+        # length_masks[n]: patterns of length n (prefix detection)
+        self.length_masks = [0] * (self.max_length + 1)
+        
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    out.append(0)
+                    goto[state][ch] = next_state
+                state = next_state
+            out[state] |= 1 << pattern_id
+            self.length_masks[len(pattern)] |= 1 << pattern_id
+        
+        # Breadth-first construction of failure links
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                out[next_state] |= out[fail[next_state]]
+        
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+    
+    def scan(self, text: str) -> Tuple[int, int, int]:
+        """
+        Scan text once
+        
+        Args:
+            text: Text to scan
+        
+        Returns:
+            Tuple of (contains_mask, prefix_mask, suffix_mask)
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        length_masks = self.length_masks
+        max_length = self.max_length
+        
+        state = 0
+        found = 0
+        prefixes = 0
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            matched = out[state]
+            if matched:
+                found |= matched
+                if position < max_length:
+                    prefixes |= matched & length_masks[position + 1]
+        
+        return found, prefixes, out[state]
+
+
+class MultiPatternMatcher:
+    """
+    Evaluate every string operation registered for one field in one pass
+    
+    Each (operator, pattern) pair owns a bit; ``match`` returns the bitmask
+    of pairs that hold for a value. Bits are laid out as three blocks of
+    pattern ids (CONTAINS, STARTSWITH, ENDSWITH) so an automaton scan maps
+    onto the mask with two shifts. Large pattern sets use Aho-Corasick;
+    small ones are cheaper with per-pattern str methods, which run in C, so
+    the automaton is only built from ``ac_threshold`` patterns on.
+    """
+    
+    def __init__(self, entries: Iterable[Tuple[str, str]], ac_threshold: int = 128):
+        entries = list(dict.fromkeys(entries))
+        patterns = list(dict.fromkeys(pattern for _, pattern in entries if pattern != ''))
+        pattern_ids = {pattern: i for i, pattern in enumerate(patterns)}
+        self.width = width = len(patterns)
+        
+        self.bits: Dict[Tuple[str, str], int] = {}
+        # Empty patterns hold for every string; their bits follow the blocks
+        self.always = 0
+        for operator, pattern in entries:
+            block = STRING_OPERATORS.index(operator)
+            if pattern == '':
+                bit = 1 << (3 * width + block)
+                self.always |= bit
+            else:
+                bit = 1 << (block * width + pattern_ids[pattern])
+            self.bits[(operator, pattern)] = bit
+        self.registered = sum(self.bits.values())
+        
+        self.automaton: Optional[AhoCorasick] = None
+        self._checks: List[Tuple[str, str, int]] = []
+        if width >= ac_threshold:
+            self.automaton = AhoCorasick(patterns)
+        else:
+            self._checks = [
+                (operator, pattern, bit)
+                for (operator, pattern), bit in self.bits.items()
+                if pattern != ''
+            ]
+    
+    def match(self, text: str) -> int:
+        """
+        Evaluate all registered operations against a value
+        
+        Args:
+            text: Field value converted to string
+        
+        Returns:
+            Bitmask of matching (operator, pattern) entries
+        """
+        if self.automaton is not None:
+            found, prefixes, suffixes = self.automaton.scan(text)
+            width = self.width
+            mask = found | (prefixes << width) | (suffixes << (2 * width))
+            # Drop bits of (operator, pattern) pairs nobody registered
+            return self.always | (mask & self.registered)
+        
+        mask = self.always
+        for operator, pattern, bit in self._checks:
+            if operator == 'CONTAINS':
+                if pattern in text:
+                    mask |= bit
+            elif operator == 'STARTSWITH':
+                if text.startswith(pattern):
+                    mask |= bit
+            elif text.endswith(pattern):
+                mask |= bit
+        return mask
+
+
+class StringMatchIndex:
+    """
+    Shared per-field matchers for all StringOpNodes in an evaluation
+    
+    Each field value is converted with ``str()`` and scanned once per event;
+    every StringOpNode on that field then reduces to a bit test. The index
+    caches the masks of the most recent event only, so one index must not
+    be shared between concurrent evaluations.
+    """
+    
+    def __init__(self, min_patterns: int = 2, ac_threshold: Optional[int] = None):
+        self.min_patterns = min_patterns
+        self.ac_threshold = settings.MULTI_PATTERN_AC_THRESHOLD if ac_threshold is None else ac_threshold
+        self.matchers: Dict[str, MultiPatternMatcher] = {}
+        self._event: Optional[Dict[str, Any]] = None
+        self._masks: Dict[str, int] = {}
+    
+    @classmethod
+    def from_asts(cls, asts: Iterable[ASTNode], **kwargs) -> "StringMatchIndex":
+        """
+        Build an index over every StringOpNode in the given ASTs
+        
+        Fields with fewer than ``min_patterns`` distinct operations keep
+        their direct compiled checks.
+        """
+        index = cls(**kwargs)
+        entries: Dict[str, Dict[Tuple[str, str], None]] = {}
+        
+        def traverse(node):
+            if isinstance(node, StringOpNode) and node.operator in STRING_OPERATORS:
+                entries.setdefault(node.field, {})[(node.operator, str(node.value))] = None
+            elif isinstance(node, LogicalNode):
+                for child in node.children:
+                    traverse(child)
+        
+        for ast in asts:
+            traverse(ast)
+        
+        for field, field_entries in entries.items():
+            if len(field_entries) >= index.min_patterns:
+                index.matchers[field] = MultiPatternMatcher(field_entries, index.ac_threshold)
+        return index
+    
+    def bit_for(self, node: StringOpNode) -> Optional[int]:
+        """Bit value for a node, or None if its field is not indexed"""
+        matcher = self.matchers.get(node.field)
+        if matcher is None:
+            return None
+        return matcher.bits.get((node.operator, str(node.value)))
+    
+    def mask(self, event: Dict[str, Any], field: str) -> int:
+        """Bitmask of matching operations on `field` for this event"""
+        if event is not self._event:
+            self._event = event
+            self._masks = {}
+        mask = self._masks.get(field)
+        if mask is None:
+            value = event.get(field)
+            mask = 0 if value is None else self.matchers[field].match(str(value))
+            self._masks[field] = mask
+        return mask
@@ -0,0 +1,282 @@
+"""
+Rule normalization and per-event memoization of shared conditions
+"""
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from app.core.parser.ast_nodes import (
+    ASTNode, ComparisonNode, LogicalNode, AggregationNode,
+    BuildingBlockRefNode, RegexNode, StringOpNode, InOpNode
+)
+
+
+# Key of conditions the compiler turns into constants
+ALWAYS_TRUE_KEY = ('true',)
+ALWAYS_FALSE_KEY = ('false',)
+
+
+def leaf_key(node: ASTNode) -> Optional[Hashable]:
+    """Identity of a leaf condition, None for other nodes"""
+    if isinstance(node, ComparisonNode):
+        return ('comparison', node.field, node.operator, repr(node.value))
+    if isinstance(node, StringOpNode):
+        return ('string_op', node.field, node.operator, repr(node.value))
+    if isinstance(node, RegexNode):
+        return ('regex', node.field, node.pattern)
+    if isinstance(node, InOpNode):
+        return ('in_op', node.field, node.negated, repr(node.values))
+    return None
+
+
+def node_key(
+    node: ASTNode,
+    building_blocks: Optional[Dict[str, ASTNode]] = None,
+    resolving: Tuple[str, ...] = ()
+) -> Hashable:
+    """
+    Structural identity of a condition
+    
+    Conditions with equal keys return the same result, or raise, on every
+    event. Without `building_blocks` references are keyed by Building
+    Block ID; with them, by the referenced condition as the compiler
+    resolves it, nested references included (unknown IDs are always
+    False). `resolving` holds the Building Blocks being resolved, so a
+    reference loop gets a key instead of recursing forever.
+    """
+    key = leaf_key(node)
+    if key is not None:
+        return key
+    if isinstance(node, LogicalNode):
+        return (node.operator, tuple(node_key(child, building_blocks, resolving) for child in node.children))
+    if isinstance(node, BuildingBlockRefNode):
+        if building_blocks is None:
+            return ('building_block', node.bb_id)
+        if node.bb_id in resolving:
+            return ('cycle', node.bb_id)
+        if node.bb_id in building_blocks:
+            bb_ast = normalize(building_blocks[node.bb_id])
+            return node_key(bb_ast, building_blocks, resolving + (node.bb_id,))
+        return ALWAYS_FALSE_KEY
+    if isinstance(node, AggregationNode):
+        return ALWAYS_TRUE_KEY
+    return ALWAYS_FALSE_KEY
+
+
+def normalize(node: ASTNode) -> ASTNode:
+    """
+    Canonical form of a condition tree
+    
+    Nested AND / OR nodes of the same operator are flattened, repeated
+    children dropped (the first is kept), single-child AND / OR replaced
+    by the child and double negations removed. All of these keep results
+    and errors identical. NOT is not pushed into comparisons or IN: a
+    missing field fails both `a = 1` and `a != 1`, so `NOT a = 1` is not
+    `a != 1`.
+    
+    Returns a new tree (unchanged subtrees are shared); `node` itself is
+    never modified, so cached ASTs stay intact.
+    """
+    if not isinstance(node, LogicalNode):
+        return node
+    
+    if node.operator == 'NOT':
+        child = normalize(node.children[0])
+        if isinstance(child, LogicalNode) and child.operator == 'NOT':
+            return child.children[0]
+        return node if child is node.children[0] else LogicalNode('NOT', [child])
+    
+    if node.operator not in ('AND', 'OR'):
+        return node
+    
+    children = []
+    seen = set()
+    for child in node.children:
+        child = normalize(child)
+        if isinstance(child, LogicalNode) and child.operator == node.operator:
+            parts = child.children
+        else:
+            parts = [child]
+        for part in parts:
+            key = node_key(part)
+            if key not in seen:
+                seen.add(key)
+                children.append(part)
+    
+    if len(children) == 1:
+        return children[0]
+    if len(children) == len(node.children) and all(a is b for a, b in zip(children, node.children)):
+        return node
+    return LogicalNode(node.operator, children)
+
+
+class _Raised:
+    """Exception raised by a memoized condition for the current event"""
+    
+    __slots__ = ('error',)
+    
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def memoize_last_event(predicate):
+    """
+    Remember a predicate's result, or error, for the most recent event
+    
+    The (event, result) pair is replaced in one assignment, so threads
+    sharing the predicate never read one event's result for another.
+    """
+    last = [(None, None)]
+    
+    def memoized(event):
+        cached_event, result = last[0]
+        if event is cached_event:
+            if type(result) is _Raised:
+                raise result.error
+            return result
+        try:
+            result = predicate(event)
+        except Exception as e:
+            last[0] = (event, _Raised(e))
+            raise
+        last[0] = (event, result)
+        return result
+    
+    return memoized
+
+
+_UNSET = object()
+
+
+class EventResultTable:
+    """
+    Per-event results of predicates over one fixed list of events
+    
+    Unlike memoize_last_event, results survive moving on to the next
+    event, so predicates shared by rules evaluated one after another
+    (each walking the whole list) run once per event in total. Events
+    are identified by position through their id(), which stays unique
+    while the list holds them; other events are evaluated directly.
+    """
+    
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.size = len(events)
+        self.positions = {id(event): index for index, event in enumerate(events)}
+    
+    def wrap(self, predicate):
+        """Memoize a predicate for every event of the list"""
+        positions = self.positions
+        results = [_UNSET] * self.size
+        
+        def memoized(event):
+            index = positions.get(id(event))
+            if index is None:
+                return predicate(event)
+            result = results[index]
+            if result is _UNSET:
+                try:
+                    result = predicate(event)
+                except Exception as e:
+                    results[index] = _Raised(e)
+                    raise
+                results[index] = result
+            elif type(result) is _Raised:
+                raise result.error
+            return result
+        
+        return memoized
+
+
+class SubexpressionMemo:
+    """
+    Results of shared conditions for the current event
+    
+    A compound condition is shared when an event would evaluate it more
+    than once among everything an evaluation compiles: the rule with and
+    without Building Blocks resolved, and each referenced Building Block.
+    Shared conditions get one memoized predicate, so an event evaluates
+    them once whichever rule, phase or Building Block asks first. Like
+    StringMatchIndex the memo keeps the most recent event only and must
+    not be shared between concurrent evaluations.
+    """
+    
+    def __init__(self, shared: Set[Hashable]):
+        self.shared = shared
+        self.predicates: Dict[Hashable, Any] = {}
+    
+    @classmethod
+    def from_asts(
+        cls,
+        rules: Iterable[ASTNode],
+        building_blocks: Optional[Dict[str, ASTNode]] = None
+    ) -> "SubexpressionMemo":
+        """
+        Find the conditions shared within and between rules and Building Blocks
+        
+        Args:
+            rules: Rule ASTs evaluated together
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+        """
+        building_blocks = building_blocks or {}
+        trees = []
+        for rule in rules:
+            rule = normalize(rule)
+            # Phases 2-3 predicate, then the full predicate if it differs
+            trees.append((rule, {}))
+            if _has_reference(rule):
+                trees.append((rule, building_blocks))
+        
+        # First pass counts every occurrence. The second counts evaluations
+        # per event: a memoized condition's subtree runs once however often
+        # the condition occurs, and so does each Building Block (phase 1
+        # and references share one compiled Building Block)
+        shared: Set[Hashable] = set()
+        for _ in range(2):
+            counts: Counter = Counter()
+            expanded: Set[Hashable] = set()
+            
+            def count(node: ASTNode, bbs: Dict[str, ASTNode]) -> None:
+                if isinstance(node, BuildingBlockRefNode):
+                    if node.bb_id in bbs and ('building_block', node.bb_id) not in expanded:
+                        expanded.add(('building_block', node.bb_id))
+                        count(normalize(bbs[node.bb_id]), bbs)
+                    return
+                key = node_key(node, bbs)
+                if _worth_memoizing(node, key):
+                    counts[key] += 1
+                    if key in shared:
+                        if key in expanded:
+                            return
+                        expanded.add(key)
+                if isinstance(node, LogicalNode):
+                    for child in node.children:
+                        count(child, bbs)
+            
+            for tree, bbs in trees:
+                count(tree, bbs)
+            shared = {key for key, occurrences in counts.items() if occurrences > 1}
+        
+        return cls(shared)
+    
+    def key_for(self, node: ASTNode, building_blocks: Dict[str, ASTNode]) -> Optional[Hashable]:
+        """Key of `node` if it is shared, None otherwise"""
+        if not self.shared:
+            return None
+        key = node_key(node, building_blocks)
+        return key if key in self.shared else None
+    
+
+
+def _worth_memoizing(node: ASTNode, key: Hashable) -> bool:
+    """
+    Only compound conditions are memoized: a leaf costs about as much as
+    a memo lookup, and repeated string operations already share one scan
+    through StringMatchIndex
+    """
+    return isinstance(node, LogicalNode) and key not in (ALWAYS_TRUE_KEY, ALWAYS_FALSE_KEY)
+
+
+def _has_reference(node: ASTNode) -> bool:
+    if isinstance(node, BuildingBlockRefNode):
+        return True
+    if isinstance(node, LogicalNode):
+        return any(_has_reference(child) for child in node.children)
+    return False
@@ -0,0 +1,284 @@
+"""
+Cost-based ordering of AND / OR children
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from app.config import settings
+from app.core.parser.ast_nodes import (
+    ASTNode, ComparisonNode, LogicalNode, AggregationNode,
+    BuildingBlockRefNode, RegexNode, StringOpNode, InOpNode
+)
+from app.core.engine.normalizer import leaf_key
+
+
+# Relative cost of evaluating one leaf against one event
+LEAF_COSTS = {
+    'comparison': 1.0,
+    'in_op': 1.2,
+    'STARTSWITH': 2.0,
+    'ENDSWITH': 2.0,
+    'CONTAINS': 3.0,
+    'regex': 10.0,
+}
+
+# Assumed fraction of events passing a leaf, until statistics say otherwise
+DEFAULT_PASS_RATES = {
+    '=': 0.1,
+    '!=': 0.9,
+    'ordered': 0.5,
+    'IN': 0.2,
+    'NOT IN': 0.8,
+    'string_op': 0.3,
+    'regex': 0.3,
+}
+
+# Ordered comparisons raise TypeError on incomparable values (e.g. 'abc' > 5)
+ORDERED_OPERATORS = frozenset(['<', '<=', '>', '>='])
+
+# Evaluation plan of one AND / OR node: child indices in evaluation order,
+# and for each child that may raise, the earlier (in source order) pure
+# children it now runs ahead of
+Plan = Tuple[List[int], Dict[int, List[int]]]
+
+
+class Estimate:
+    """Estimated cost, pass rate and failure mode of a subtree"""
+    
+    __slots__ = ("cost", "pass_rate", "may_raise")
+    
+    def __init__(self, cost: float, pass_rate: float, may_raise: bool):
+        self.cost = cost
+        self.pass_rate = pass_rate
+        self.may_raise = may_raise
+
+
+class SelectivityStats:
+    """
+    Observed pass rates of leaf conditions, keyed by the condition itself
+    
+    Rules share conditions (the same IP watchlist, the same event name
+    check), so rates learned on one rule improve the ordering of others.
+    Counts are halved once they reach `max_samples` so the rates follow
+    the event mix over time.
+    """
+    
+    def __init__(self, maxsize: int = 4096, min_samples: int = 32, max_samples: int = 100000):
+        self.maxsize = maxsize
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        # key -> [evaluated, passed]
+        self._counts: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    # Identity of a leaf condition, None for other nodes
+    key = staticmethod(leaf_key)
+    
+    def record(self, node: ASTNode, evaluated: int, passed: int) -> None:
+        """Add `passed` of `evaluated` events to a leaf's counts"""
+        key = self.key(node)
+        if key is None or evaluated == 0:
+            return
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0, 0]
+                while len(self._counts) > self.maxsize:
+                    self._counts.popitem(last=False)
+            else:
+                self._counts.move_to_end(key)
+            counts[0] += evaluated
+            counts[1] += passed
+            if counts[0] >= self.max_samples:
+                counts[0] //= 2
+                counts[1] //= 2
+    
+    def pass_rate(self, node: ASTNode) -> Optional[float]:
+        """Observed pass rate, or None with too few samples"""
+        key = self.key(node)
+        if key is None:
+            return None
+        with self._lock:
+            counts = self._counts.get(key)
+        if counts is None or counts[0] < self.min_samples:
+            return None
+        return counts[1] / counts[0]
+    
+    def observe(self, node: ASTNode, events: List[Dict[str, Any]], compile: Callable[[ASTNode], Callable]) -> None:
+        """
+        Record the pass rate of every leaf of `node` over `events`
+        
+        Args:
+            node: AST root node
+            events: Sample of event dictionaries
+            compile: Function compiling a leaf into a predicate
+        """
+        if not events:
+            return
+        for leaf in _leaves(node):
+            predicate = compile(leaf)
+            evaluated = passed = 0
+            for event in events:
+                try:
+                    passed += bool(predicate(event))
+                except Exception:
+                    continue
+                evaluated += 1
+            self.record(leaf, evaluated, passed)
+    
+    def clear(self) -> None:
+        """Forget all observations"""
+        with self._lock:
+            self._counts.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Number of leaf conditions with statistics"""
+        with self._lock:
+            return {
+                "conditions": len(self._counts),
+                "maxsize": self.maxsize,
+                "min_samples": self.min_samples
+            }
+
+
+def _leaves(node: ASTNode) -> List[ASTNode]:
+    """Leaf conditions of a tree (Building Block references not followed)"""
+    if isinstance(node, LogicalNode):
+        return [leaf for child in node.children for leaf in _leaves(child)]
+    if SelectivityStats.key(node) is not None:
+        return [node]
+    return []
+
+
+class RuleOptimizer:
+    """
+    Order the children of AND / OR nodes by estimated cost and selectivity
+    
+    AND children run in ascending cost / (1 - pass rate), OR children in
+    ascending cost / pass rate, so cheap checks that usually decide the
+    outcome (equality, IN) short-circuit the expensive ones (CONTAINS,
+    MATCHES). Pass rates come from SelectivityStats when a condition has
+    been observed often enough, from DEFAULT_PASS_RATES otherwise.
+    
+    ASTs are never modified: the compiler asks for a plan per node. Plans
+    keep results and errors identical to source order. A child that may
+    raise (an ordered comparison on mixed types) never has later children
+    moved ahead of it; when it runs ahead of earlier pure children and
+    raises, those are checked before the error propagates, since in
+    source order they would have decided the outcome first.
+    """
+    
+    def __init__(self, stats: Optional[SelectivityStats] = None):
+        self.stats = stats
+    
+    def plan(self, node: LogicalNode, building_blocks: Optional[Dict[str, ASTNode]] = None) -> Plan:
+        """
+        Evaluation plan for the children of an AND / OR node
+        
+        Args:
+            node: AND or OR node
+            building_blocks: Building Blocks the compiler resolves references with
+        
+        Returns:
+            (child indices in evaluation order, {raising child: pure children it jumped})
+        """
+        building_blocks = building_blocks or {}
+        estimates = [self.estimate(child, building_blocks) for child in node.children]
+        return self._order(node.operator == 'AND', estimates)
+    
+    @staticmethod
+    def _order(conjunction: bool, estimates: List[Estimate]) -> Plan:
+        """Greedy ordering by rank, never moving a child past an earlier one that may raise"""
+        def rank(index):
+            estimate = estimates[index]
+            decisive = 1.0 - estimate.pass_rate if conjunction else estimate.pass_rate
+            return estimate.cost / decisive if decisive > 0 else float('inf')
+        
+        raising = [index for index, estimate in enumerate(estimates) if estimate.may_raise]
+        pending = list(range(len(estimates)))
+        order = []
+        while pending:
+            # Nothing may pass the first pending child (in source order) that can raise
+            barrier = next((index for index in raising if index in pending), len(estimates))
+            best = min((index for index in pending if index <= barrier), key=lambda index: (rank(index), index))
+            pending.remove(best)
+            order.append(best)
+        
+        guards = {}
+        for index in raising:
+            position = order.index(index)
+            jumped = [other for other in order[position + 1:] if other < index]
+            if jumped:
+                guards[index] = sorted(jumped)
+        return order, guards
+    
+    def estimate(
+        self,
+        node: ASTNode,
+        building_blocks: Optional[Dict[str, ASTNode]] = None,
+        resolving: Tuple[str, ...] = ()
+    ) -> Estimate:
+        """
+        Estimated per-event cost, pass rate and whether evaluation may raise
+        
+        `resolving` holds the Building Blocks being resolved; a reference
+        loop (which the compiler rejects) is estimated as free.
+        """
+        building_blocks = building_blocks or {}
+        
+        if isinstance(node, LogicalNode):
+            children = [self.estimate(child, building_blocks, resolving) for child in node.children]
+            may_raise = any(child.may_raise for child in children)
+            if node.operator == 'NOT':
+                child = children[0]
+                return Estimate(child.cost, 1.0 - child.pass_rate, may_raise)
+            
+            conjunction = node.operator == 'AND'
+            order, _ = self._order(conjunction, children)
+            children = [children[index] for index in order]
+            # Each child only runs while the outcome is still open
+            cost = 0.0
+            reached = 1.0
+            for child in children:
+                cost += reached * child.cost
+                reached *= child.pass_rate if conjunction else 1.0 - child.pass_rate
+            pass_rate = reached if conjunction else 1.0 - reached
+            return Estimate(cost, pass_rate, may_raise)
+        
+        if isinstance(node, BuildingBlockRefNode):
+            if node.bb_id in building_blocks and node.bb_id not in resolving:
+                return self.estimate(building_blocks[node.bb_id], building_blocks, resolving + (node.bb_id,))
+            return Estimate(0.0, 0.0, False)
+        
+        if isinstance(node, AggregationNode):
+            # Aggregations are handled at rule level, not event level
+            return Estimate(0.0, 1.0, False)
+        
+        observed = self.stats.pass_rate(node) if self.stats is not None else None
+        if isinstance(node, ComparisonNode):
+            ordered = node.operator in ORDERED_OPERATORS
+            default = DEFAULT_PASS_RATES['ordered' if ordered else node.operator]
+            return Estimate(LEAF_COSTS['comparison'], _rate(observed, default), ordered)
+        if isinstance(node, InOpNode):
+            default = DEFAULT_PASS_RATES['NOT IN' if node.negated else 'IN']
+            return Estimate(LEAF_COSTS['in_op'], _rate(observed, default), False)
+        if isinstance(node, StringOpNode):
+            cost = LEAF_COSTS.get(node.operator, LEAF_COSTS['CONTAINS'])
+            return Estimate(cost, _rate(observed, DEFAULT_PASS_RATES['string_op']), False)
+        if isinstance(node, RegexNode):
+            return Estimate(LEAF_COSTS['regex'], _rate(observed, DEFAULT_PASS_RATES['regex']), False)
+        
+        return Estimate(0.0, 0.0, False)
+    
+    def observe(self, node: ASTNode, events: List[Dict[str, Any]], compile: Callable[[ASTNode], Callable]) -> None:
+        """Record leaf pass rates over a sample of `events` (no-op without stats)"""
+        if self.stats is not None and settings.OPTIMIZER_SAMPLE_EVENTS > 0:
+            self.stats.observe(node, events[:settings.OPTIMIZER_SAMPLE_EVENTS], compile)
+
+
+def _rate(observed: Optional[float], default: float) -> float:
+    return default if observed is None else observed
+
+
+# Create global optimizer instance
+rule_optimizer = RuleOptimizer(SelectivityStats(settings.OPTIMIZER_STATS_SIZE))
@@ -0,0 +1,339 @@
+"""
+Process-pool rule evaluation
+Spreads rules (or event shards of stateless rules) across worker processes
+"""
+import itertools
+import multiprocessing
+import pickle
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from app.config import settings
+from app.core.parser.ast_nodes import ASTNode, NodeType
+from app.core.engine.event_scan import EventScan, PhaseTracker
+from app.core.engine.rule_engine import RuleEngine, rule_engine
+from app.core.engine.timestamps import EventTimestamps
+from app.core.engine.building_blocks import references
+
+
+# Work item: ("rule", rule_id) or ("shard", rule_id, start, end)
+WorkItem = Tuple[Any, ...]
+
+# Tracker outcome shipped from a worker: (matched, error, event indices, match count)
+TrackerSummary = Tuple[bool, Optional[Exception], List[int], int]
+
+
+def _portable_error(error: Optional[Exception]) -> Optional[Exception]:
+    """Exceptions cross process boundaries by message only"""
+    if error is None:
+        return None
+    return Exception(str(error))
+
+
+class _WorkerBatch:
+    """
+    Worker-side state of one batch
+    
+    Events, rules and Building Blocks are unpickled once per worker;
+    compiled predicates are kept so several shards of one rule share them.
+    """
+    
+    def __init__(self, payload: bytes):
+        self.rules, self.events, self.building_blocks = pickle.loads(payload)
+        self.engine = RuleEngine(
+            optimizer=rule_engine.optimizer,
+            memoize=rule_engine.memoize,
+            index_after_events=rule_engine.index_after_events,
+            columnar_min_events=rule_engine.columnar_min_events,
+            strings=rule_engine.strings
+        )
+        self.compiler = self.engine._compiler_for(
+            list(self.rules.values()), self.building_blocks, self.events
+        )
+        self.positions = {id(event): index for index, event in enumerate(self.events)}
+        self._timestamps: Optional[EventTimestamps] = None
+        self._index = self.engine._event_index(self.events)
+        self._batch = self.engine._event_batch(self.events) if len(self.rules) > 1 else None
+        self._predicates: Dict[Hashable, Dict[str, Any]] = {}
+    
+    def run(self, item: WorkItem) -> Dict[str, Any]:
+        """Execute one work item"""
+        if item[0] == "rule":
+            return self._evaluate(item[1])
+        return self._scan_shard(*item[1:])
+    
+    def _evaluate(self, rule_id: Hashable) -> Dict[str, Any]:
+        """Evaluate a whole rule; matched events are returned as indices"""
+        rule_ast = self.rules[rule_id]
+        phases = self.engine._initial_phases()
+        try:
+            _, agg_nodes = self.engine._find_nodes_by_type(rule_ast, NodeType.AGGREGATION)
+            timestamps = None
+            if any(agg_node.time_window for agg_node in agg_nodes):
+                if self._timestamps is None:
+                    self._timestamps = EventTimestamps(self.events)
+                timestamps = self._timestamps
+            bb_trackers = self.engine._indexed_building_blocks(
+                references(rule_ast), self.building_blocks, self.events, self.compiler, self._index
+            )
+            result = self.engine._evaluate_compiled(
+                rule_ast, self.events, self.building_blocks, self.compiler, timestamps, phases, bb_trackers,
+                self._batch
+            )
+        except Exception as e:
+            result = self.engine._error_result(phases, e)
+        
+        result["matched_events"] = [self.positions[id(event)] for event in result["matched_events"]]
+        return result
+    
+    def _scan_shard(self, rule_id: Hashable, start: int, end: int) -> Dict[str, Any]:
+        """Run a rule's EventScan over events[start:end]"""
+        try:
+            predicates = self._predicates.get(rule_id)
+            if predicates is None:
+                rule_ast = self.rules[rule_id]
+                predicates = self.engine._scan_predicates(
+                    rule_ast, self.building_blocks, self.compiler.compile(rule_ast), self.compiler
+                )
+                self._predicates[rule_id] = predicates
+            
+            scan = EventScan(**predicates).feed(itertools.islice(self.events, start, end))
+        except Exception as e:
+            return {"error": _portable_error(e)}
+        
+        return {
+            "bb": {bb_id: self._summary(tracker) for bb_id, tracker in scan.bb_trackers.items()},
+            "logic": self._summary(scan.logic_tracker),
+            "rule": self._summary(scan.rule_tracker),
+        }
+    
+    def _summary(self, tracker: Optional[PhaseTracker]) -> Optional[TrackerSummary]:
+        if tracker is None:
+            return None
+        indices = [self.positions[id(event)] for event in tracker.events]
+        return tracker.matched, _portable_error(tracker.error), indices, tracker.match_count
+
+
+# Most recent batch in this worker process: (batch_id, state)
+_worker_batch: Optional[Tuple[str, _WorkerBatch]] = None
+
+
+def _run_items(batch_id: str, payload: bytes, items: List[WorkItem]) -> List[Dict[str, Any]]:
+    """Worker entry point"""
+    global _worker_batch
+    if _worker_batch is None or _worker_batch[0] != batch_id:
+        _worker_batch = (batch_id, _WorkerBatch(payload))
+    batch = _worker_batch[1]
+    return [batch.run(item) for item in items]
+
+
+class MergedTracker:
+    """
+    PhaseTracker outcome rebuilt from consecutive event shards
+    
+    Each shard tracker stopped at its own first decisive event, so walking
+    the shards in order reproduces the sequential outcome: the first shard
+    that matched or failed decides any(), and any failure fails the
+    collected match list.
+    """
+    
+    def __init__(self, summaries: List[TrackerSummary], events: List[Dict[str, Any]]):
+        self.summaries = summaries
+        self.events = events
+    
+    def any_matched(self) -> bool:
+        for matched, error, _, _ in self.summaries:
+            if matched:
+                return True
+            if error is not None:
+                raise error
+        return False
+    
+    def matched_events(self) -> List[Dict[str, Any]]:
+        for _, error, _, _ in self.summaries:
+            if error is not None:
+                raise error
+        events = self.events
+        return [events[index] for _, _, indices, _ in self.summaries for index in indices]
+    
+    @property
+    def match_count(self) -> int:
+        return sum(count for _, _, _, count in self.summaries)
+
+
+class MergedScan:
+    """EventScan answers for a rule scanned shard by shard in worker processes"""
+    
+    def __init__(self, shards: List[Dict[str, Any]], events: List[Dict[str, Any]]):
+        self.bb_trackers = {
+            bb_id: MergedTracker([shard["bb"][bb_id] for shard in shards], events)
+            for bb_id in shards[0]["bb"]
+        }
+        self.logic_tracker = None
+        if shards[0]["logic"] is not None:
+            self.logic_tracker = MergedTracker([shard["logic"] for shard in shards], events)
+        self.rule_tracker = None
+        if shards[0]["rule"] is not None:
+            self.rule_tracker = MergedTracker([shard["rule"] for shard in shards], events)
+    
+    def bb_matched(self, bb_id: str) -> bool:
+        return self.bb_trackers[bb_id].any_matched()
+    
+    def logic_matched(self) -> bool:
+        return self.logic_tracker.any_matched()
+    
+    def matched_events(self) -> List[Dict[str, Any]]:
+        return self.rule_tracker.matched_events()
+    
+    def match_count(self) -> int:
+        self.rule_tracker.matched_events()
+        return self.rule_tracker.match_count
+
+
+class ParallelRuleEvaluator:
+    """
+    Evaluate rules on a pool of worker processes
+    
+    Each batch (rules, Building Blocks, events) is pickled once and
+    unpickled once per worker, which then compiles what it needs and
+    reuses it for all its work items. Rules are dealt round-robin to the
+    workers; when there are fewer rules than workers, stateless rules (no
+    aggregation) are additionally split into contiguous event shards.
+    Results are assembled in rule order and shard order, so they are
+    identical to RuleEngine.evaluate_rules regardless of scheduling.
+    
+    With fewer than two workers, or a single work item, evaluation runs
+    in-process.
+    """
+    
+    def __init__(self, workers: int = 0, shard_min_events: int = 10000):
+        """
+        Args:
+            workers: Worker process count
+            shard_min_events: Smallest event set worth splitting into shards
+        """
+        self.workers = workers
+        self.shard_min_events = shard_min_events
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def evaluate_rule(
+        self,
+        rule_ast: ASTNode,
+        events: List[Dict[str, Any]],
+        building_blocks: Optional[Dict[str, ASTNode]] = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluate one rule, sharding its events when worthwhile
+        
+        Returns:
+            Test result dictionary, as RuleEngine.evaluate_rule
+        """
+        return self.evaluate_rules({"rule": rule_ast}, events, building_blocks)["rule"]
+    
+    def evaluate_rules(
+        self,
+        rules: Dict[Hashable, ASTNode],
+        events: List[Dict[str, Any]],
+        building_blocks: Optional[Dict[str, ASTNode]] = None
+    ) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Evaluate many rules against one event set
+        
+        Args:
+            rules: Dict of rule ASTs {rule_id: ast}
+            events: List of event dictionaries
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+        
+        Returns:
+            Test result dictionaries keyed by rule ID, in `rules` order
+        """
+        building_blocks = building_blocks or {}
+        plan = self._plan(rules, events)
+        if self.workers < 2 or len(plan) < 2:
+            return rule_engine.evaluate_rules(rules, events, building_blocks)
+        
+        payload = pickle.dumps((rules, events, building_blocks), protocol=pickle.HIGHEST_PROTOCOL)
+        batch_id = uuid.uuid4().hex
+        tasks = [plan[i::self.workers] for i in range(min(self.workers, len(plan)))]
+        
+        pool = self._executor()
+        futures = [pool.submit(_run_items, batch_id, payload, items) for items in tasks]
+        outputs = {}
+        for items, future in zip(tasks, futures):
+            outputs.update(zip(items, future.result()))
+        
+        shards: Dict[Hashable, List[Dict[str, Any]]] = {}
+        for item in plan:
+            if item[0] == "shard":
+                shards.setdefault(item[1], []).append(outputs[item])
+        
+        results = {}
+        for rule_id, rule_ast in rules.items():
+            if rule_id in shards:
+                result = self._merge(rule_ast, shards[rule_id], events, building_blocks)
+            else:
+                result = outputs[("rule", rule_id)]
+                result["matched_events"] = [events[index] for index in result["matched_events"]]
+            results[rule_id] = result
+        return results
+    
+    def shutdown(self) -> None:
+        """Stop the worker processes; a later call starts a new pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+    
+    def _plan(self, rules: Dict[Hashable, ASTNode], events: List[Dict[str, Any]]) -> List[WorkItem]:
+        """Split the batch into work items, in rule order then event order"""
+        shard = self.workers >= 2 and len(rules) < self.workers and len(events) >= self.shard_min_events
+        shard_size = -(-len(events) // self.workers) if shard else 0
+        
+        plan = []
+        for rule_id, rule_ast in rules.items():
+            stateful, _ = rule_engine._find_nodes_by_type(rule_ast, NodeType.AGGREGATION)
+            if shard and not stateful:
+                plan.extend(
+                    ("shard", rule_id, start, min(start + shard_size, len(events)))
+                    for start in range(0, len(events), shard_size)
+                )
+            else:
+                plan.append(("rule", rule_id))
+        return plan
+    
+    @staticmethod
+    def _merge(
+        rule_ast: ASTNode,
+        shards: List[Dict[str, Any]],
+        events: List[Dict[str, Any]],
+        building_blocks: Dict[str, ASTNode]
+    ) -> Dict[str, Any]:
+        """Report a sharded rule from its per-shard scans"""
+        phases = rule_engine._initial_phases()
+        for shard in shards:
+            if "error" in shard:
+                return rule_engine._error_result(phases, shard["error"])
+        
+        try:
+            return rule_engine._report(
+                rule_ast, events, building_blocks, None, MergedScan(shards, events), None, phases
+            )
+        except Exception as e:
+            return rule_engine._error_result(phases, e)
+    
+    def _executor(self) -> ProcessPoolExecutor:
+        """Start the pool on first use"""
+        with self._lock:
+            if self._pool is None:
+                # Forking a threaded server process can copy held locks into
+                # the children; start workers from a clean process instead
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+
+# Create global parallel evaluator instance
+parallel_evaluator = ParallelRuleEvaluator(settings.EVALUATION_WORKERS, settings.EVALUATION_SHARD_MIN_EVENTS)
@@ -2,14 +2,27 @@
 Main Rule Engine with Priority-based Validation
 Priority Order: Building Blocks → Normal Logic → Regex → AQL
 """
-from typing import List, Dict, Any, Optional, Tuple
-from app.core.parser.ast_nodes import (
-    ASTNode, ComparisonNode, LogicalNode, AggregationNode,
-    BuildingBlockRefNode, RegexNode, StringOpNode, InOpNode, NodeType
-)
+import itertools
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from app.config import settings
+from app.core.parser.ast_nodes import ASTNode, LogicalNode, AggregationNode, NodeType
 from app.core.engine.evaluator import Evaluator
 from app.core.engine.correlator import Correlator
 from app.core.engine.aggregator import Aggregator
+from app.core.engine.compiler import RuleCompiler, Predicate
+from app.core.engine.event_scan import EventScan, PhaseTracker
+from app.core.engine.multi_pattern import StringMatchIndex
+from app.core.engine.optimizer import RuleOptimizer, rule_optimizer
+from app.core.engine.normalizer import SubexpressionMemo, EventResultTable
+from app.core.engine.building_blocks import BuildingBlockGraph, BuildingBlockCycleError, references
+from app.core.engine.event_index import EventIndex
+from app.core.engine.columnar import EventBatch, HAS_NUMPY, tracker_from_masks
+from app.core.engine.interning import StringDictionary, string_dictionary
+from app.core.engine.timestamps import EventTimestamps
+
+
+# GROUP BY keys listed in trigger details (all are returned in group_keys)
+MAX_REPORTED_GROUPS = 10
 
 
 class RuleEngine:
@@ -21,18 +34,47 @@ class RuleEngine:
     2. Normal Logic (comparisons, AND/OR)
     3. Regex Patterns
     4. Advanced AQL (aggregations, time windows)
+    
+    In single-pass mode (default) phases 1-3 and the final match are
+    answered from one walk over the events; the report is unchanged.
+    With an optimizer, compiled predicates try cheap and decisive
+    conditions first; with `memoize`, conditions shared by the rule and
+    its Building Blocks are evaluated once per event. Building Blocks of
+    equality and IN conditions not matched by the first
+    `index_after_events` events are answered from an EventIndex of the
+    rest. Several rules over at least `columnar_min_events` events are
+    evaluated as vectorized masks over one EventBatch when NumPy is
+    available, interned fields encoded with the codes of `strings`.
+    Results are the same. Windowed GROUP BY aggregations report every
+    matching key.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        single_pass: bool = True,
+        optimizer: Optional[RuleOptimizer] = None,
+        memoize: bool = False,
+        index_after_events: Optional[int] = None,
+        columnar_min_events: Optional[int] = None,
+        strings: Optional[StringDictionary] = None
+    ):
+        self.single_pass = single_pass
+        self.optimizer = optimizer
+        self.memoize = memoize
+        self.index_after_events = index_after_events
+        self.columnar_min_events = columnar_min_events
+        self.strings = strings
         self.evaluator = Evaluator()
         self.correlator = Correlator()
         self.aggregator = Aggregator()
+        self.compiler = RuleCompiler(optimizer=optimizer)
     
     def evaluate_rule(
         self,
         rule_ast: ASTNode,
         events: List[Dict[str, Any]],
-        building_blocks: Optional[Dict[str, ASTNode]] = None
+        building_blocks: Optional[Dict[str, ASTNode]] = None,
+        timestamps: Optional[EventTimestamps] = None
     ) -> Dict[str, Any]:
         """
         Evaluate rule with strict priority order
@@ -41,107 +83,290 @@ class RuleEngine:
             rule_ast: Rule AST root node
             events: List of event dictionaries
             building_blocks: Dict of Building Block ASTs {bb_id: ast}
-            
+            timestamps: Timestamps parsed at ingest (parsed on demand if omitted)
+        
         Returns:
             Test result dictionary
         """
         building_blocks = building_blocks or {}
+        phases = self._initial_phases()
+        
+        try:
+            compiler = self._compiler_for([rule_ast], building_blocks)
+            bb_trackers = None
+            if self.single_pass:
+                bb_trackers = self._indexed_building_blocks(
+                    references(rule_ast), building_blocks, events, compiler, self._event_index(events)
+                )
+            return self._evaluate_compiled(
+                rule_ast, events, building_blocks, compiler, timestamps, phases, bb_trackers
+            )
+        
+        except Exception as e:
+            return self._error_result(phases, e)
+    
+    def evaluate_rules(
+        self,
+        rules: Dict[str, ASTNode],
+        events: List[Dict[str, Any]],
+        building_blocks: Optional[Dict[str, ASTNode]] = None,
+        timestamps: Optional[EventTimestamps] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Evaluate many rules against one event set
+        
+        Work that does not depend on the rule is done once: a single
+        compiler and string index cover every rule and Building Block,
+        each referenced Building Block is scanned once for all rules and
+        evaluated at most once per event, and timestamps are parsed once
+        for all time-window aggregations.
+        
+        Args:
+            rules: Dict of rule ASTs {rule_id: ast}
+            events: List of event dictionaries
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+            timestamps: Timestamps parsed at ingest (parsed on demand if omitted)
+        
+        Returns:
+            Test result dictionaries keyed by rule ID, as evaluate_rule
+        """
+        building_blocks = building_blocks or {}
+        # Several rules walk the same events: keep Building Block results for all of them
+        compiler = self._compiler_for(
+            list(rules.values()), building_blocks, events if len(rules) > 1 else None
+        )
+        
+        referenced = {}
+        windowed = False
+        for rule_ast in rules.values():
+            _, bb_nodes = self._find_nodes_by_type(rule_ast, NodeType.BUILDING_BLOCK_REF)
+            for bb_node in bb_nodes:
+                if bb_node.bb_id in building_blocks:
+                    referenced[bb_node.bb_id] = building_blocks[bb_node.bb_id]
+            _, agg_nodes = self._find_nodes_by_type(rule_ast, NodeType.AGGREGATION)
+            windowed = windowed or any(agg_node.time_window for agg_node in agg_nodes)
         
-        # Initialize evaluation phases
-        phases = {
+        if timestamps is None and windowed:
+            timestamps = EventTimestamps(events)
+        
+        # Columns and leaf masks pay off once several rules share them
+        batch = self._event_batch(events) if len(rules) > 1 else None
+        bb_trackers = None
+        if self.single_pass and referenced:
+            bb_trackers = self._indexed_building_blocks(
+                referenced, building_blocks, events, compiler, self._event_index(events)
+            )
+            bb_predicates = {}
+            for bb_id in referenced:
+                if bb_id in bb_trackers:
+                    continue
+                try:
+                    predicate = compiler.compile_building_block(bb_id, building_blocks)
+                except BuildingBlockCycleError:
+                    # Reported by each rule using it
+                    continue
+                if batch is not None and batch.supports(building_blocks[bb_id], building_blocks):
+                    bb_trackers[bb_id] = tracker_from_masks(
+                        predicate, events, batch.evaluate(building_blocks[bb_id], building_blocks)
+                    )
+                else:
+                    bb_predicates[bb_id] = predicate
+            bb_trackers.update(EventScan(bb_predicates).feed(events).bb_trackers)
+        
+        results = {}
+        for rule_id, rule_ast in rules.items():
+            phases = self._initial_phases()
+            try:
+                results[rule_id] = self._evaluate_compiled(
+                    rule_ast, events, building_blocks, compiler, timestamps, phases, bb_trackers, batch
+                )
+            except Exception as e:
+                results[rule_id] = self._error_result(phases, e)
+        
+        return results
+    
+    def _evaluate_compiled(
+        self,
+        rule_ast: ASTNode,
+        events: List[Dict[str, Any]],
+        building_blocks: Dict[str, ASTNode],
+        compiler: RuleCompiler,
+        timestamps: Optional[EventTimestamps],
+        phases: Dict[str, str],
+        bb_trackers: Optional[Dict[str, PhaseTracker]] = None,
+        batch: Optional[EventBatch] = None
+    ) -> Dict[str, Any]:
+        """
+        Compile a rule with `compiler` and report its phases
+        
+        `bb_trackers` holds phase 1 outcomes already known for these
+        events (see _build_scan); `batch`, the same events by column.
+        """
+        self._check_references(rule_ast, building_blocks)
+        if self.optimizer is not None:
+            # Pass rates seen on these events steer this and later orderings
+            self.optimizer.observe(rule_ast, events, compiler.compile)
+        
+        # BB-free predicate drives phases 2 and 3
+        logic_predicate = compiler.compile(rule_ast)
+        scan = None
+        if self.single_pass:
+            if batch is not None:
+                scan = self._columnar_scan(
+                    rule_ast, events, building_blocks, logic_predicate, compiler, batch, bb_trackers
+                )
+            if scan is None:
+                scan = self._build_scan(
+                    rule_ast, building_blocks, logic_predicate, compiler, bb_trackers=bb_trackers
+                ).feed(events)
+        
+        return self._report(rule_ast, events, building_blocks, logic_predicate, scan, timestamps, phases)
+    
+    def start_stream(
+        self,
+        rule_ast: ASTNode,
+        building_blocks: Optional[Dict[str, ASTNode]] = None,
+        max_matched_events: Optional[int] = None,
+        max_buffered_events: Optional[int] = None
+    ) -> "RuleStream":
+        """
+        Start evaluating a rule over events that arrive in chunks
+        
+        Args:
+            rule_ast: Rule AST root node
+            building_blocks: Dict of Building Block ASTs {bb_id: ast}
+            max_matched_events: Keep at most this many matched events
+            max_buffered_events: Cap on events held for aggregation rules
+        
+        Returns:
+            RuleStream to feed events into
+        """
+        return RuleStream(self, rule_ast, building_blocks or {}, max_matched_events, max_buffered_events)
+    
+    @staticmethod
+    def _initial_phases() -> Dict[str, str]:
+        """Initialize evaluation phases"""
+        return {
             "building_block": "not_applicable",
             "normal_logic": "not_applicable",
             "regex": "not_applicable",
             "aql": "not_applicable"
         }
+    
+    @staticmethod
+    def _error_result(phases: Dict[str, str], error: Exception) -> Dict[str, Any]:
+        """Result for an exception raised during evaluation"""
+        return {
+            "alert": False,
+            "matched_events": [],
+            "trigger_details": None,
+            "evaluation_phases": phases,
+            "error": f"Evaluation error: {str(error)}"
+        }
+    
+    def _report(
+        self,
+        rule_ast: ASTNode,
+        events: List[Dict[str, Any]],
+        building_blocks: Dict[str, ASTNode],
+        logic_predicate: Predicate,
+        scan: Optional[EventScan],
+        timestamps: Optional[EventTimestamps],
+        phases: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """
+        Run the phases in priority order and build the result
         
-        try:
-            # Phase 1: Building Blocks (MUST pass first)
-            bb_result = self._evaluate_building_blocks(rule_ast, events, building_blocks)
-            if bb_result['has_bb']:
-                phases['building_block'] = "passed" if bb_result['passed'] else "failed"
-                if not bb_result['passed']:
-                    return {
-                        "alert": False,
-                        "matched_events": [],
-                        "trigger_details": None,
-                        "evaluation_phases": phases,
-                        "error": f"Building Block failed: {bb_result['error']}"
-                    }
-            
-            # Phase 2: Normal Logic
-            logic_result = self._evaluate_normal_logic(rule_ast, events)
-            if logic_result['has_logic']:
-                phases['normal_logic'] = "passed" if logic_result['passed'] else "failed"
-                if not logic_result['passed']:
-                    return {
-                        "alert": False,
-                        "matched_events": [],
-                        "trigger_details": None,
-                        "evaluation_phases": phases,
-                        "error": "Normal logic condition failed"
-                    }
-            
-            # Phase 3: Regex Patterns
-            regex_result = self._evaluate_regex(rule_ast, events)
-            if regex_result['has_regex']:
-                phases['regex'] = "passed" if regex_result['passed'] else "failed"
-                if not regex_result['passed']:
-                    return {
-                        "alert": False,
-                        "matched_events": [],
-                        "trigger_details": None,
-                        "evaluation_phases": phases,
-                        "error": "Regex pattern failed"
-                    }
-            
-            # Phase 4: Advanced AQL (aggregations, time windows)
-            aql_result = self._evaluate_aql(rule_ast, events)
-            if aql_result['has_aql']:
-                phases['aql'] = "passed" if aql_result['passed'] else "failed"
-                if not aql_result['passed']:
-                    return {
-                        "alert": False,
-                        "matched_events": [],
-                        "trigger_details": None,
-                        "evaluation_phases": phases,
-                        "error": f"AQL function failed: {aql_result['error']}"
-                    }
-                
-                # Return AQL result with matched events
+        `phases` is updated in place so the caller can report how far
+        evaluation got if an exception escapes.
+        """
+        # Phase 1: Building Blocks (MUST pass first)
+        bb_result = self._evaluate_building_blocks(rule_ast, events, building_blocks, scan)
+        if bb_result['has_bb']:
+            phases['building_block'] = "passed" if bb_result['passed'] else "failed"
+            if not bb_result['passed']:
                 return {
-                    "alert": True,
-                    "matched_events": aql_result['matched_events'],
-                    "trigger_details": aql_result['trigger_details'],
+                    "alert": False,
+                    "matched_events": [],
+                    "trigger_details": None,
                     "evaluation_phases": phases,
-                    "error": None
+                    "error": f"Building Block failed: {bb_result['error']}"
+                }
+        
+        # Phase 2: Normal Logic
+        logic_result = self._evaluate_normal_logic(rule_ast, events, logic_predicate, scan)
+        if logic_result['has_logic']:
+            phases['normal_logic'] = "passed" if logic_result['passed'] else "failed"
+            if not logic_result['passed']:
+                return {
+                    "alert": False,
+                    "matched_events": [],
+                    "trigger_details": None,
+                    "evaluation_phases": phases,
+                    "error": "Normal logic condition failed"
+                }
+        
+        # Phase 3: Regex Patterns
+        regex_result = self._evaluate_regex(rule_ast, events, logic_predicate, scan)
+        if regex_result['has_regex']:
+            phases['regex'] = "passed" if regex_result['passed'] else "failed"
+            if not regex_result['passed']:
+                return {
+                    "alert": False,
+                    "matched_events": [],
+                    "trigger_details": None,
+                    "evaluation_phases": phases,
+                    "error": "Regex pattern failed"
+                }
+        
+        # Phase 4: Advanced AQL (aggregations, time windows)
+        aql_result = self._evaluate_aql(rule_ast, events, timestamps)
+        if aql_result['has_aql']:
+            phases['aql'] = "passed" if aql_result['passed'] else "failed"
+            if not aql_result['passed']:
+                return {
+                    "alert": False,
+                    "matched_events": [],
+                    "trigger_details": None,
+                    "evaluation_phases": phases,
+                    "error": f"AQL function failed: {aql_result['error']}",
+                    "timestamp_errors": aql_result.get('timestamp_errors')
                 }
             
-            # All phases passed (no AQL, just logic)
-            matched_events = [e for e in events if self._evaluate_node(rule_ast, e, building_blocks)]
-            
-            return {
-                "alert": len(matched_events) > 0,
-                "matched_events": matched_events,
-                "trigger_details": f"{len(matched_events)} events matched" if matched_events else None,
-                "evaluation_phases": phases,
-                "error": None
-            }
-            
-        except Exception as e:
+            # Return AQL result with matched events
             return {
-                "alert": False,
-                "matched_events": [],
-                "trigger_details": None,
+                "alert": True,
+                "matched_events": aql_result['matched_events'],
+                "trigger_details": aql_result['trigger_details'],
+                "group_keys": aql_result.get('group_keys'),
                 "evaluation_phases": phases,
-                "error": f"Evaluation error: {str(e)}"
+                "error": None,
+                "timestamp_errors": aql_result.get('timestamp_errors')
             }
+        
+        # All phases passed (no AQL, just logic)
+        if scan is not None:
+            matched_events = scan.matched_events()
+            match_count = scan.match_count()
+        else:
+            rule_predicate = self.compiler.compile(rule_ast, building_blocks)
+            matched_events = [e for e in events if rule_predicate(e)]
+            match_count = len(matched_events)
+        
+        return {
+            "alert": match_count > 0,
+            "matched_events": matched_events,
+            "trigger_details": f"{match_count} events matched" if match_count else None,
+            "evaluation_phases": phases,
+            "error": None
+        }
     
     def _evaluate_building_blocks(
         self,
         node: ASTNode,
         events: List[Dict[str, Any]],
-        building_blocks: Dict[str, ASTNode]
+        building_blocks: Dict[str, ASTNode],
+        scan: Optional[EventScan] = None
     ) -> Dict[str, Any]:
         """Phase 1: Evaluate Building Block references"""
         has_bb, bb_nodes = self._find_nodes_by_type(node, NodeType.BUILDING_BLOCK_REF)
@@ -159,9 +384,12 @@ class RuleEngine:
                     "error": f"Building Block '{bb_id}' not found"
                 }
             
-            bb_ast = building_blocks[bb_id]
             # Check if at least one event matches the Building Block
-            matched = any(self._evaluate_node(bb_ast, event, {}) for event in events)
+            if scan is not None:
+                matched = scan.bb_matched(bb_id)
+            else:
+                bb_predicate = self.compiler.compile_building_block(bb_id, building_blocks)
+                matched = any(bb_predicate(event) for event in events)
             
             if not matched:
                 return {
@@ -172,10 +400,200 @@ class RuleEngine:
         
         return {"has_bb": True, "passed": True}
     
+    def _compiler_for(
+        self,
+        rules: List[ASTNode],
+        building_blocks: Dict[str, ASTNode],
+        events: Optional[List[Dict[str, Any]]] = None
+    ) -> RuleCompiler:
+        """
+        Compiler for one evaluation of the given rules
+        
+        One multi-pattern string index covers the rules and Building
+        Blocks; when memoizing, one memo covers the conditions they share.
+        With `events`, the rules are evaluated one after another over that
+        list and Building Block results are kept for all of its events.
+        """
+        string_index = StringMatchIndex.from_asts([*rules, *building_blocks.values()])
+        memo = SubexpressionMemo.from_asts(rules, building_blocks) if self.memoize else None
+        results = EventResultTable(events) if events is not None and building_blocks else None
+        return RuleCompiler(string_index, self.optimizer, memo, results)
+    
+    @staticmethod
+    def _check_references(rule_ast: ASTNode, building_blocks: Dict[str, ASTNode]) -> None:
+        """
+        Fail rules reaching a Building Block reference loop, whatever the phase outcome
+        
+        Raises:
+            BuildingBlockCycleError: If a referenced Building Block reaches a loop
+        """
+        cycle = BuildingBlockGraph(building_blocks).find_cycle(references(rule_ast))
+        if cycle is not None:
+            raise BuildingBlockCycleError(cycle)
+    
+    def _event_index(self, events: List[Dict[str, Any]]) -> Optional[EventIndex]:
+        """Index of the events after the first `index_after_events`, if any (built on use)"""
+        if self.index_after_events is None or len(events) <= self.index_after_events:
+            return None
+        return EventIndex(events[self.index_after_events:])
+    
+    def _event_batch(self, events: List[Dict[str, Any]]) -> Optional[EventBatch]:
+        """Column view of the events if they are many enough (columns built on use)"""
+        if not HAS_NUMPY or self.columnar_min_events is None or len(events) < self.columnar_min_events:
+            return None
+        return EventBatch(events, self.strings)
+    
+    def _indexed_building_blocks(
+        self,
+        bb_ids: Iterable[str],
+        building_blocks: Dict[str, ASTNode],
+        events: List[Dict[str, Any]],
+        compiler: RuleCompiler,
+        index: Optional[EventIndex]
+    ) -> Dict[str, PhaseTracker]:
+        """
+        Phase 1 outcomes of the Building Blocks `index` can answer
+        
+        Common Building Blocks match early, so they are scanned over the
+        first `index_after_events` events; only those still unmatched are
+        looked up in the index of the remaining events.
+        """
+        if index is None:
+            return {}
+        
+        predicates = {}
+        for bb_id in bb_ids:
+            if bb_id in building_blocks and bb_id not in predicates:
+                if index.supports(building_blocks[bb_id], building_blocks):
+                    predicates[bb_id] = compiler.compile_building_block(bb_id, building_blocks)
+        
+        probe = EventScan(predicates).feed(itertools.islice(events, self.index_after_events))
+        trackers = {}
+        for bb_id, tracker in probe.bb_trackers.items():
+            if not tracker.matched:
+                tracker = PhaseTracker.answered(index.matches(building_blocks[bb_id], building_blocks) != 0)
+            trackers[bb_id] = tracker
+        return trackers
+    
+    def _build_scan(
+        self,
+        node: ASTNode,
+        building_blocks: Dict[str, ASTNode],
+        logic_predicate: Predicate,
+        compiler: RuleCompiler,
+        max_matches: Optional[int] = None,
+        bb_trackers: Optional[Dict[str, PhaseTracker]] = None
+    ) -> EventScan:
+        """
+        Set up one walk over events evaluating every per-event phase predicate together
+        
+        Building Blocks already answered by `bb_trackers` (from the event
+        index, or a scan of the same events shared by several rules) are
+        not evaluated again.
+        """
+        shared = bb_trackers or {}
+        predicates = self._scan_predicates(node, building_blocks, logic_predicate, compiler, shared)
+        return EventScan(**predicates, max_matches=max_matches, shared_bb_trackers=shared)
+    
+    def _columnar_scan(
+        self,
+        node: ASTNode,
+        events: List[Dict[str, Any]],
+        building_blocks: Dict[str, ASTNode],
+        logic_predicate: Predicate,
+        compiler: RuleCompiler,
+        batch: EventBatch,
+        bb_trackers: Optional[Dict[str, PhaseTracker]] = None
+    ) -> Optional[EventScan]:
+        """
+        Answer what _build_scan's walk would, from masks over `batch`
+        
+        Returns:
+            Finished EventScan, or None when the rule reads fields whose
+            values rarely repeat (walking the rows is cheaper)
+        """
+        if not batch.supports(node, building_blocks):
+            return None
+        
+        shared = bb_trackers or {}
+        predicates = self._scan_predicates(node, building_blocks, logic_predicate, compiler, shared)
+        trackers = {
+            bb_id: tracker_from_masks(predicate, events, batch.evaluate(building_blocks[bb_id], building_blocks))
+            for bb_id, predicate in predicates["bb_predicates"].items()
+        }
+        
+        rule_predicate = predicates.get("rule_predicate")
+        rule_tracker = None
+        if rule_predicate is not None:
+            rule_tracker = tracker_from_masks(
+                rule_predicate, events, batch.evaluate(node, building_blocks), collect=True
+            )
+        
+        logic = predicates.get("logic_predicate")
+        if logic is not None and logic is rule_predicate:
+            logic_tracker = rule_tracker
+        elif logic is not None:
+            logic_tracker = tracker_from_masks(logic, events, batch.evaluate(node))
+        else:
+            logic_tracker = None
+        
+        return EventScan.from_trackers(trackers, logic_tracker, rule_tracker, shared)
+    
+    def _scan_predicates(
+        self,
+        node: ASTNode,
+        building_blocks: Dict[str, ASTNode],
+        logic_predicate: Predicate,
+        compiler: RuleCompiler,
+        skip_bbs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compile the predicates an EventScan of this rule evaluates
+        
+        Returns:
+            EventScan keyword arguments: bb_predicates, logic_predicate
+            and rule_predicate
+        """
+        _, bb_nodes = self._find_nodes_by_type(node, NodeType.BUILDING_BLOCK_REF)
+        skip_bbs = skip_bbs or {}
+        
+        bb_predicates = {}
+        for bb_node in bb_nodes:
+            if bb_node.bb_id not in building_blocks:
+                # Phase 1 fails at this BB, later phases are never reported
+                return {"bb_predicates": bb_predicates}
+            known = skip_bbs.get(bb_node.bb_id)
+            if known is not None and not known.matched:
+                # Phase 1 fails (or raises) here at the latest
+                return {"bb_predicates": bb_predicates}
+            if bb_node.bb_id not in bb_predicates and bb_node.bb_id not in skip_bbs:
+                bb_predicates[bb_node.bb_id] = compiler.compile_building_block(bb_node.bb_id, building_blocks)
+        
+        has_logic, _ = self._find_nodes_by_type(node, [
+            NodeType.COMPARISON,
+            NodeType.STRING_OP,
+            NodeType.IN_OP,
+            NodeType.REGEX
+        ])
+        has_aql, _ = self._find_nodes_by_type(node, NodeType.AGGREGATION)
+        
+        rule_predicate = None
+        if not has_aql:
+            # Without BB references both compilations are the same predicate
+            rule_predicate = compiler.compile(node, building_blocks) if bb_nodes else logic_predicate
+        
+        return {
+            "bb_predicates": bb_predicates,
+            "logic_predicate": logic_predicate if has_logic else None,
+            "rule_predicate": rule_predicate
+        }
+    
     def _evaluate_normal_logic(
         self,
         node: ASTNode,
-        events: List[Dict[str, Any]]
+        events: List[Dict[str, Any]],
+        predicate: Predicate,
+        scan: Optional[EventScan] = None
     ) -> Dict[str, Any]:
         """Phase 2: Evaluate normal logic (comparisons, AND/OR)"""
         has_logic, _ = self._find_nodes_by_type(node, [
@@ -188,14 +606,19 @@ class RuleEngine:
             return {"has_logic": False, "passed": True}
         
         # Check if at least one event matches
-        matched = any(self._evaluate_node(node, event, {}) for event in events)
+        if scan is not None:
+            matched = scan.logic_matched()
+        else:
+            matched = any(predicate(event) for event in events)
         
         return {"has_logic": True, "passed": matched}
     
     def _evaluate_regex(
         self,
         node: ASTNode,
-        events: List[Dict[str, Any]]
+        events: List[Dict[str, Any]],
+        predicate: Predicate,
+        scan: Optional[EventScan] = None
     ) -> Dict[str, Any]:
         """Phase 3: Evaluate regex patterns"""
         has_regex, _ = self._find_nodes_by_type(node, NodeType.REGEX)
@@ -204,14 +627,18 @@ class RuleEngine:
             return {"has_regex": False, "passed": True}
         
         # Check if at least one event matches
-        matched = any(self._evaluate_node(node, event, {}) for event in events)
+        if scan is not None:
+            matched = scan.logic_matched()
+        else:
+            matched = any(predicate(event) for event in events)
         
         return {"has_regex": True, "passed": matched}
     
     def _evaluate_aql(
         self,
         node: ASTNode,
-        events: List[Dict[str, Any]]
+        events: List[Dict[str, Any]],
+        timestamps: Optional[EventTimestamps] = None
     ) -> Dict[str, Any]:
         """Phase 4: Evaluate advanced AQL (aggregations)"""
         has_aql, agg_nodes = self._find_nodes_by_type(node, NodeType.AGGREGATION)
@@ -221,19 +648,22 @@ class RuleEngine:
         
         # Evaluate aggregation
         for agg_node in agg_nodes:
-            result = self._evaluate_aggregation(agg_node, events)
+            result = self._evaluate_aggregation(agg_node, events, timestamps)
             if not result['passed']:
                 return {
                     "has_aql": True,
                     "passed": False,
-                    "error": result['error']
+                    "error": result['error'],
+                    "timestamp_errors": result.get('timestamp_errors')
                 }
             
             return {
                 "has_aql": True,
                 "passed": True,
                 "matched_events": result['matched_events'],
-                "trigger_details": result['trigger_details']
+                "trigger_details": result['trigger_details'],
+                "group_keys": result.get('group_keys'),
+                "timestamp_errors": result.get('timestamp_errors')
             }
         
         return {"has_aql": False, "passed": True}
@@ -241,26 +671,37 @@ class RuleEngine:
     def _evaluate_aggregation(
         self,
         node: AggregationNode,
-        events: List[Dict[str, Any]]
+        events: List[Dict[str, Any]],
+        timestamps: Optional[EventTimestamps] = None
     ) -> Dict[str, Any]:
         """Evaluate aggregation node"""
+        timestamp_errors = None
+        
         # Handle time window if present
         if node.time_window:
-            found, matched_events = self.correlator.find_matching_window(
+            if timestamps is None:
+                timestamps = EventTimestamps(events)
+            timestamp_errors = timestamps.invalid_count
+            
+            if node.group_by:
+                return self._evaluate_group_windows(node, events, timestamps)
+            
+            found, matched_events, agg_value = self.correlator.find_aggregate_window(
                 events,
                 node.time_window,
-                int(node.value) if node.function == 'COUNT' else 1,
-                node.group_by
+                node.function,
+                node.field,
+                lambda value: self._compare_values(value, node.operator, node.value),
+                node.group_by,
+                timestamps
             )
             
             if not found:
                 return {
                     "passed": False,
-                    "error": f"No time window found with {node.function}({node.field}) {node.operator} {node.value}"
+                    "error": f"No time window found with {node.function}({node.field}) {node.operator} {node.value}",
+                    "timestamp_errors": timestamp_errors
                 }
-            
-            # Calculate aggregation on matched events
-            agg_value = self.aggregator.aggregate(node.function, matched_events, node.field)
         else:
             # No time window, aggregate all events
             matched_events = events
@@ -277,51 +718,53 @@ class RuleEngine:
             return {
                 "passed": True,
                 "matched_events": matched_events,
-                "trigger_details": trigger_details
+                "trigger_details": trigger_details,
+                "timestamp_errors": timestamp_errors
             }
         else:
             return {
                 "passed": False,
-                "error": f"{node.function}({node.field}) = {agg_value}, expected {node.operator} {node.value}"
+                "error": f"{node.function}({node.field}) = {agg_value}, expected {node.operator} {node.value}",
+                "timestamp_errors": timestamp_errors
             }
     
-    def _evaluate_node(
+    def _evaluate_group_windows(
         self,
-        node: ASTNode,
-        event: Dict[str, Any],
-        building_blocks: Dict[str, ASTNode]
-    ) -> bool:
-        """Evaluate a single node against an event"""
-        if isinstance(node, ComparisonNode):
-            return self.evaluator.evaluate_comparison(node, event)
-        
-        elif isinstance(node, StringOpNode):
-            return self.evaluator.evaluate_string_op(node, event)
-        
-        elif isinstance(node, RegexNode):
-            return self.evaluator.evaluate_regex(node, event)
-        
-        elif isinstance(node, InOpNode):
-            return self.evaluator.evaluate_in_op(node, event)
-        
-        elif isinstance(node, LogicalNode):
-            if node.operator == 'AND':
-                return all(self._evaluate_node(child, event, building_blocks) for child in node.children)
-            elif node.operator == 'OR':
-                return any(self._evaluate_node(child, event, building_blocks) for child in node.children)
-            elif node.operator == 'NOT':
-                return not self._evaluate_node(node.children[0], event, building_blocks)
-        
-        elif isinstance(node, BuildingBlockRefNode):
-            if node.bb_id in building_blocks:
-                return self._evaluate_node(building_blocks[node.bb_id], event, {})
-            return False
+        node: AggregationNode,
+        events: List[Dict[str, Any]],
+        timestamps: EventTimestamps
+    ) -> Dict[str, Any]:
+        """Evaluate a windowed GROUP BY aggregation, reporting every matching key"""
+        groups = self.correlator.find_group_windows(
+            events,
+            node.time_window,
+            node.function,
+            node.field,
+            lambda value: self._compare_values(value, node.operator, node.value),
+            node.group_by,
+            timestamps
+        )
+        within = f"within {node.time_window['value']} {node.time_window['unit']}"
         
-        elif isinstance(node, AggregationNode):
-            # Aggregations are handled at rule level, not event level
-            return True
+        if not groups:
+            return {
+                "passed": False,
+                "error": f"No time window found with {node.function}({node.field}) {node.operator} {node.value} "
+                         f"for any {node.group_by}",
+                "timestamp_errors": timestamps.invalid_count
+            }
         
-        return False
+        shown = ", ".join(f"{group['key']} = {group['value']}" for group in groups[:MAX_REPORTED_GROUPS])
+        if len(groups) > MAX_REPORTED_GROUPS:
+            shown += f", ... ({len(groups) - MAX_REPORTED_GROUPS} more)"
+        return {
+            "passed": True,
+            "matched_events": [event for group in groups for event in group['matched_events']],
+            "trigger_details": f"{node.function}({node.field}) {node.operator} {node.value} {within} "
+                               f"for {len(groups)} {node.group_by} group(s): {shown}",
+            "group_keys": [group['key'] for group in groups],
+            "timestamp_errors": timestamps.invalid_count
+        }
     
     def _find_nodes_by_type(
         self,
@@ -366,14 +809,102 @@ class RuleEngine:
         return False
 
 
+class RuleStream:
+    """
+    Incremental evaluation of one rule over events arriving in chunks
+    
+    Per-event phases are answered by an EventScan fed chunk by chunk, so
+    memory is bounded by the matched events kept. Aggregation rules still
+    need the whole event set for phase 4; their events are buffered up to
+    `max_buffered_events`.
+    """
+    
+    def __init__(
+        self,
+        engine: RuleEngine,
+        rule_ast: ASTNode,
+        building_blocks: Dict[str, ASTNode],
+        max_matched_events: Optional[int] = None,
+        max_buffered_events: Optional[int] = None
+    ):
+        self.engine = engine
+        self.rule_ast = rule_ast
+        self.building_blocks = building_blocks
+        self.max_buffered_events = max_buffered_events
+        self.events_processed = 0
+        self.phases = engine._initial_phases()
+        self.error: Optional[Exception] = None
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffering = False
+        
+        try:
+            engine._check_references(rule_ast, building_blocks)
+            compiler = engine._compiler_for([rule_ast], building_blocks)
+            self.logic_predicate = compiler.compile(rule_ast)
+            self.scan = engine._build_scan(rule_ast, building_blocks, self.logic_predicate, compiler, max_matched_events)
+            self._buffering, _ = engine._find_nodes_by_type(rule_ast, NodeType.AGGREGATION)
+        except Exception as e:
+            self.error = e
+    
+    def feed(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Evaluate a chunk of events
+        
+        Args:
+            events: List of event dictionaries
+        """
+        if self.error is not None:
+            return
+        
+        self.events_processed += len(events)
+        self.scan.feed(events)
+        
+        if self._buffering:
+            if self.max_buffered_events is not None and \
+                    len(self._buffer) + len(events) > self.max_buffered_events:
+                self.error = ValueError(
+                    f"Aggregation rules can buffer at most {self.max_buffered_events} events"
+                )
+                return
+            self._buffer.extend(events)
+    
+    def finish(self) -> Dict[str, Any]:
+        """
+        Complete evaluation
+        
+        Returns:
+            Test result dictionary, as evaluate_rule, plus events_processed
+        """
+        if self.error is not None:
+            result = self.engine._error_result(self.phases, self.error)
+        else:
+            try:
+                result = self.engine._report(
+                    self.rule_ast, self._buffer, self.building_blocks,
+                    self.logic_predicate, self.scan, None, self.phases
+                )
+            except Exception as e:
+                result = self.engine._error_result(self.phases, e)
+        
+        result["events_processed"] = self.events_processed
+        return result
+
+
 # Create global rule engine instance
-rule_engine = RuleEngine()
+rule_engine = RuleEngine(
+    optimizer=rule_optimizer if settings.RULE_OPTIMIZER else None,
+    memoize=settings.RULE_SUBEXPRESSION_MEMO,
+    index_after_events=settings.BB_INDEX_AFTER_EVENTS if settings.BB_EVENT_INDEX else None,
+    columnar_min_events=settings.COLUMNAR_MIN_EVENTS if settings.COLUMNAR_EVALUATION else None,
+    strings=string_dictionary
+)
 
 
 def evaluate_rule(
     rule_ast: ASTNode,
     events: List[Dict[str, Any]],
-    building_blocks: Optional[Dict[str, ASTNode]] = None
+    building_blocks: Optional[Dict[str, ASTNode]] = None,
+    timestamps: Optional[EventTimestamps] = None
 ) -> Dict[str, Any]:
     """
     Convenience function to evaluate rule
@@ -382,8 +913,30 @@ def evaluate_rule(
         rule_ast: Rule AST root node
         events: List of event dictionaries
         building_blocks: Dict of Building Block ASTs
-        
+        timestamps: Timestamps parsed at ingest (parsed on demand if omitted)
+    
     Returns:
         Test result dictionary
     """
-    return rule_engine.evaluate_rule(rule_ast, events, building_blocks)
+    return rule_engine.evaluate_rule(rule_ast, events, building_blocks, timestamps)
+
+
+def evaluate_rules(
+    rules: Dict[str, ASTNode],
+    events: List[Dict[str, Any]],
+    building_blocks: Optional[Dict[str, ASTNode]] = None,
+    timestamps: Optional[EventTimestamps] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Convenience function to evaluate many rules against one event set
+    
+    Args:
+        rules: Dict of rule ASTs {rule_id: ast}
+        events: List of event dictionaries
+        building_blocks: Dict of Building Block ASTs
+        timestamps: Timestamps parsed at ingest (parsed on demand if omitted)
+    
+    Returns:
+        Test result dictionaries keyed by rule ID
+    """
+    return rule_engine.evaluate_rules(rules, events, building_blocks, timestamps)
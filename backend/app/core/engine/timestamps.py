@@ -0,0 +1,129 @@
+"""
+Event timestamp normalization
+"""
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+
+# Numbers at or above this are epoch milliseconds (1e11 s is year 5138)
+EPOCH_MILLIS_THRESHOLD = 1e11
+
+# Formats accepted before the ISO-8601 fast path existed
+LEGACY_FORMATS = [
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%d %H:%M:%S",
+]
+
+
+def parse_epoch(value: Any) -> Optional[float]:
+    """
+    Convert an event timestamp to epoch seconds
+    
+    Accepts ISO-8601 / RFC 3339 strings (with 'Z' or a numeric offset;
+    naive values are taken as UTC) and epoch seconds or milliseconds given
+    as numbers or digit strings.
+    
+    Args:
+        value: Raw timestamp value
+        
+    Returns:
+        Epoch seconds, or None if the value cannot be parsed
+    """
+    if isinstance(value, bool):
+        return None
+    
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        try:
+            return value / 1000.0 if abs(value) >= EPOCH_MILLIS_THRESHOLD else float(value)
+        except OverflowError:
+            # int too large for a float
+            return None
+    
+    if not isinstance(value, str) or not value:
+        return None
+    
+    # isdigit() alone also accepts non-ASCII digits such as '²'
+    if value.isascii() and value.isdigit():
+        try:
+            return parse_epoch(int(value))
+        except ValueError:
+            # More digits than int() converts
+            return None
+    
+    text = value[:-1] + '+00:00' if value[-1] in 'Zz' else value
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        parsed = None
+        for fmt in LEGACY_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        if parsed is None:
+            return None
+    
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class EventTimestamps:
+    """
+    Epoch timestamps for an event list, parsed once at ingest
+    
+    Values live in a compact ``array('d')`` aligned with the event list;
+    unparseable timestamps are stored as NaN and counted, and are shared
+    by the sorter and the time-window correlator.
+    """
+    
+    def __init__(self, events: List[Dict[str, Any]], field: str = 'timestamp'):
+        self.epochs = array('d')
+        self.invalid_count = 0
+        self._sorted_indices: Optional[List[int]] = None
+        
+        # Feeds repeat timestamps heavily (second resolution), memoize per batch
+        seen: Dict[Any, float] = {}
+        nan = math.nan
+        for event in events:
+            raw = event.get(field)
+            cacheable = type(raw) in (str, int, float)
+            epoch = seen.get(raw) if cacheable else None
+            if epoch is None:
+                epoch = parse_epoch(raw)
+                if epoch is None:
+                    epoch = nan
+                if cacheable:
+                    seen[raw] = epoch
+            if epoch != epoch:
+                self.invalid_count += 1
+            self.epochs.append(epoch)
+    
+    def __len__(self) -> int:
+        return len(self.epochs)
+    
+    def is_valid(self, index: int) -> bool:
+        """Whether the event at `index` has a parseable timestamp"""
+        epoch = self.epochs[index]
+        return epoch == epoch
+    
+    def sorted_indices(self) -> List[int]:
+        """
+        Event indices in timestamp order
+        
+        Unparseable timestamps sort first and ties keep input order.
+        """
+        if self._sorted_indices is None:
+            epochs = self.epochs
+            ninf = -math.inf
+            self._sorted_indices = sorted(
+                range(len(epochs)),
+                key=lambda i: epochs[i] if epochs[i] == epochs[i] else ninf
+            )
+        return self._sorted_indices
@@ -1,7 +1,7 @@
 """
 __init__ files for package imports
 """
-from app.core.parser.parser import parse_aql, parse_aql_to_dict
+from app.core.parser.parser import parse_aql, parse_aql_to_dict, warm_ast_cache
 from app.core.parser.lexer import tokenize
 
-__all__ = ['parse_aql', 'parse_aql_to_dict', 'tokenize']
+__all__ = ['parse_aql', 'parse_aql_to_dict', 'warm_ast_cache', 'tokenize']
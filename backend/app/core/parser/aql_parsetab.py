@@ -0,0 +1,68 @@
+
+# aql_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'leftORleftANDrightNOTAND AVG BY COMMA CONTAINS COUNT ENDSWITH EQ FIRST GE GROUP GT IDENTIFIER IN LAST LE LOWER LPAREN LT MATCHES MAX MIN NE NOT NUMBER OR RPAREN STARTSWITH STRING SUBSTRING SUM UPPER WHEN WITHINexpression : conditioncondition : condition AND conditioncondition : condition OR conditioncondition : NOT conditioncondition : LPAREN condition RPARENcondition : IDENTIFIER EQ value\n                    | IDENTIFIER NE value\n                    | IDENTIFIER LT value\n                    | IDENTIFIER LE value\n                    | IDENTIFIER GT value\n                    | IDENTIFIER GE valuecondition : IDENTIFIER CONTAINS STRING\n                    | IDENTIFIER STARTSWITH STRING\n                    | IDENTIFIER ENDSWITH STRINGcondition : IDENTIFIER MATCHES STRINGcondition : IDENTIFIER IN LPAREN value_list RPAREN\n                    | IDENTIFIER NOT IN LPAREN value_list RPARENcondition : WHEN IDENTIFIERcondition : agg_function LPAREN IDENTIFIER RPAREN comparison_op value\n                    | agg_function LPAREN IDENTIFIER RPAREN comparison_op value WITHIN time_window\n                    | agg_function LPAREN IDENTIFIER RPAREN comparison_op value WITHIN time_window GROUP BY IDENTIFIERagg_function : COUNT\n                       | SUM\n                       | AVG\n                       | MIN\n                       | MAXcomparison_op : EQ\n                        | NE\n                        | LT\n                        | LE\n                        | GT\n                        | GEtime_window : NUMBER IDENTIFIERvalue : STRING\n                | NUMBER\n                | IDENTIFIERvalue_list : value\n                     | value_list COMMA value'
+    
+_lr_action_items = {'NOT':([0,3,4,5,13,14,],[3,3,3,28,3,3,]),'LPAREN':([0,3,4,7,8,9,10,11,12,13,14,27,48,],[4,4,4,30,-22,-23,-24,-25,-26,4,4,47,52,]),'IDENTIFIER':([0,3,4,6,13,14,17,18,19,20,21,22,30,47,52,55,57,58,59,60,61,62,63,69,72,],[5,5,5,29,5,5,34,34,34,34,34,34,49,34,34,34,34,-27,-28,-29,-30,-31,-32,71,73,]),'WHEN':([0,3,4,13,14,],[6,6,6,6,6,]),'COUNT':([0,3,4,13,14,],[8,8,8,8,8,]),'SUM':([0,3,4,13,14,],[9,9,9,9,9,]),'AVG':([0,3,4,13,14,],[10,10,10,10,10,]),'MIN':([0,3,4,13,14,],[11,11,11,11,11,]),'MAX':([0,3,4,13,14,],[12,12,12,12,12,]),'$end':([1,2,15,29,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,54,65,66,68,71,73,],[0,-1,-4,-18,-2,-3,-5,-36,-6,-34,-35,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-19,-20,-33,-21,]),'AND':([2,15,16,29,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,54,65,66,68,71,73,],[13,-4,13,-18,-2,13,-5,-36,-6,-34,-35,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-19,-20,-33,-21,]),'OR':([2,15,16,29,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,54,65,66,68,71,73,],[14,-4,14,-18,-2,-3,-5,-36,-6,-34,-35,-7,-8,-9,-10,-11,-12,-13,-14,-15,-16,-17,-19,-20,-33,-21,]),'EQ':([5,53,],[17,58,]),'NE':([5,53,],[18,59,]),'LT':([5,53,],[19,60,]),'LE':([5,53,],[20,61,]),'GT':([5,53,],[21,62,]),'GE':([5,53,],[22,63,]),'CONTAINS':([5,],[23,]),'STARTSWITH':([5,],[24,]),'ENDSWITH':([5,],[25,]),'MATCHES':([5,],[26,]),'IN':([5,28,],[27,48,]),'RPAREN':([15,16,29,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,49,50,51,54,56,64,65,66,68,71,73,],[-4,33,-18,-2,-3,-5,-36,-6,-34,-35,-7,-8,-9,-10,-11,-12,-13,-14,-15,53,54,-37,-16,65,-38,-17,-19,-20,-33,-21,]),'STRING':([17,18,19,20,21,22,23,24,25,26,47,52,55,57,58,59,60,61,62,63,],[36,36,36,36,36,36,43,44,45,46,36,36,36,36,-27,-28,-29,-30,-31,-32,]),'NUMBER':([17,18,19,20,21,22,47,52,55,57,58,59,60,61,62,63,67,],[37,37,37,37,37,37,37,37,37,37,-27,-28,-29,-30,-31,-32,69,]),'COMMA':([34,36,37,50,51,56,64,],[-36,-34,-35,55,-37,55,-38,]),'WITHIN':([34,36,37,66,],[-36,-34,-35,67,]),'GROUP':([68,71,],[70,-33,]),'BY':([70,],[72,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'expression':([0,],[1,]),'condition':([0,3,4,13,14,],[2,15,16,31,32,]),'agg_function':([0,3,4,13,14,],[7,7,7,7,7,]),'value':([17,18,19,20,21,22,47,52,55,57,],[35,38,39,40,41,42,51,51,64,66,]),'value_list':([47,52,],[50,56,]),'comparison_op':([53,],[57,]),'time_window':([67,],[68,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> expression","S'",1,None,None,None),
+  ('expression -> condition','expression',1,'p_expression','parser.py',58),
+  ('condition -> condition AND condition','condition',3,'p_condition_logical_and','parser.py',62),
+  ('condition -> condition OR condition','condition',3,'p_condition_logical_or','parser.py',71),
+  ('condition -> NOT condition','condition',2,'p_condition_logical_not','parser.py',80),
+  ('condition -> LPAREN condition RPAREN','condition',3,'p_condition_paren','parser.py',84),
+  ('condition -> IDENTIFIER EQ value','condition',3,'p_condition_comparison','parser.py',88),
+  ('condition -> IDENTIFIER NE value','condition',3,'p_condition_comparison','parser.py',89),
+  ('condition -> IDENTIFIER LT value','condition',3,'p_condition_comparison','parser.py',90),
+  ('condition -> IDENTIFIER LE value','condition',3,'p_condition_comparison','parser.py',91),
+  ('condition -> IDENTIFIER GT value','condition',3,'p_condition_comparison','parser.py',92),
+  ('condition -> IDENTIFIER GE value','condition',3,'p_condition_comparison','parser.py',93),
+  ('condition -> IDENTIFIER CONTAINS STRING','condition',3,'p_condition_string_op','parser.py',97),
+  ('condition -> IDENTIFIER STARTSWITH STRING','condition',3,'p_condition_string_op','parser.py',98),
+  ('condition -> IDENTIFIER ENDSWITH STRING','condition',3,'p_condition_string_op','parser.py',99),
+  ('condition -> IDENTIFIER MATCHES STRING','condition',3,'p_condition_regex','parser.py',103),
+  ('condition -> IDENTIFIER IN LPAREN value_list RPAREN','condition',5,'p_condition_in','parser.py',114),
+  ('condition -> IDENTIFIER NOT IN LPAREN value_list RPAREN','condition',6,'p_condition_in','parser.py',115),
+  ('condition -> WHEN IDENTIFIER','condition',2,'p_condition_building_block','parser.py',124),
+  ('condition -> agg_function LPAREN IDENTIFIER RPAREN comparison_op value','condition',6,'p_condition_aggregation','parser.py',128),
+  ('condition -> agg_function LPAREN IDENTIFIER RPAREN comparison_op value WITHIN time_window','condition',8,'p_condition_aggregation','parser.py',129),
+  ('condition -> agg_function LPAREN IDENTIFIER RPAREN comparison_op value WITHIN time_window GROUP BY IDENTIFIER','condition',11,'p_condition_aggregation','parser.py',130),
+  ('agg_function -> COUNT','agg_function',1,'p_agg_function','parser.py',150),
+  ('agg_function -> SUM','agg_function',1,'p_agg_function','parser.py',151),
+  ('agg_function -> AVG','agg_function',1,'p_agg_function','parser.py',152),
+  ('agg_function -> MIN','agg_function',1,'p_agg_function','parser.py',153),
+  ('agg_function -> MAX','agg_function',1,'p_agg_function','parser.py',154),
+  ('comparison_op -> EQ','comparison_op',1,'p_comparison_op','parser.py',158),
+  ('comparison_op -> NE','comparison_op',1,'p_comparison_op','parser.py',159),
+  ('comparison_op -> LT','comparison_op',1,'p_comparison_op','parser.py',160),
+  ('comparison_op -> LE','comparison_op',1,'p_comparison_op','parser.py',161),
+  ('comparison_op -> GT','comparison_op',1,'p_comparison_op','parser.py',162),
+  ('comparison_op -> GE','comparison_op',1,'p_comparison_op','parser.py',163),
+  ('time_window -> NUMBER IDENTIFIER','time_window',2,'p_time_window','parser.py',167),
+  ('value -> STRING','value',1,'p_value','parser.py',172),
+  ('value -> NUMBER','value',1,'p_value','parser.py',173),
+  ('value -> IDENTIFIER','value',1,'p_value','parser.py',174),
+  ('value_list -> value','value_list',1,'p_value_list','parser.py',178),
+  ('value_list -> value_list COMMA value','value_list',3,'p_value_list','parser.py',179),
+]
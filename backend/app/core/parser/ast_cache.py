@@ -0,0 +1,117 @@
+"""
+Content-addressed LRU cache of parsed ASTs
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config import settings
+
+
+class ASTCache:
+    """
+    Parsed AST per AQL text, keyed by the SHA-256 of the text
+    
+    Rule and Building Block text rarely changes between test runs, so the
+    same strings are parsed over and over. Syntax errors are cached too,
+    so re-validating a broken rule is also a lookup. Texts longer than
+    `max_text_length` are parsed but not stored.
+    
+    Cached ASTs are shared between callers and must not be modified.
+    """
+    
+    def __init__(self, maxsize: int = 512, max_text_length: int = 64 * 1024):
+        self.maxsize = maxsize
+        self.max_text_length = max_text_length
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # digest -> (ast, syntax error message)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(text: str) -> str:
+        """Cache key of an AQL string"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def get_or_parse(self, text: str, parse: Callable[[str], Any]) -> Any:
+        """
+        Get the AST for `text`, parsing it on first use
+        
+        Args:
+            text: AQL query string
+            parse: Parser function, called on a miss
+        
+        Returns:
+            AST root node
+        
+        Raises:
+            SyntaxError: If parsing fails (now or when first cached)
+        """
+        key = self.key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        
+        if entry is None:
+            # Parse outside the lock
+            try:
+                entry = (parse(text), None)
+            except SyntaxError as e:
+                entry = (None, str(e))
+            if len(text) <= self.max_text_length:
+                self._store(key, entry)
+        
+        ast, error = entry
+        if error is not None:
+            raise SyntaxError(error)
+        return ast
+    
+    def warm(self, text: str, parse: Callable[[str], Any]) -> bool:
+        """
+        Parse `text` into the cache ahead of use
+        
+        Returns:
+            True if the text parses
+        """
+        try:
+            self.get_or_parse(text, parse)
+            return True
+        except SyntaxError:
+            return False
+    
+    def _store(self, key: str, entry: Tuple[Any, Optional[str]]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """Drop all cached ASTs and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Create global AST cache instance
+ast_cache = ASTCache(settings.AST_CACHE_SIZE, settings.AST_CACHE_MAX_TEXT_LENGTH)
@@ -1,10 +1,27 @@
 """
 AST Node definitions for AQL parser
 """
+import re
 from typing import Any, List, Optional, Dict
 from enum import Enum
 
 
+# Canonical decimal literals only, so '007' or '1e3' stay strings
+_NUMERIC_STRING = re.compile(r'-?(0|[1-9][0-9]*)(\.[0-9]+)?')
+
+
+def normalize_value(value: Any) -> Any:
+    """
+    Normalize a value for IN / NOT IN membership
+    
+    Numeric strings become numbers so that 22, 22.0 and '22' compare equal;
+    every other value is returned unchanged.
+    """
+    if isinstance(value, str) and _NUMERIC_STRING.fullmatch(value):
+        return float(value) if '.' in value else int(value)
+    return value
+
+
 class NodeType(str, Enum):
     """AST Node types"""
     COMPARISON = "comparison"
@@ -138,6 +155,11 @@ class InOpNode(ASTNode):
         self.field = field
         self.values = values
         self.negated = negated
+        # Hashed membership, built once at parse time
+        try:
+            self.members = frozenset(normalize_value(v) for v in values)
+        except TypeError:
+            self.members = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -93,15 +93,22 @@ class AQLLexer:
         """Error handling"""
         raise SyntaxError(f"Illegal character '{t.value[0]}' at position {t.lexpos}")
     
+    # PLY lexer built once per process; instances get clones
+    _master = None
+    
     def __init__(self):
-        self.lexer = lex.lex(module=self)
+        if AQLLexer._master is None:
+            AQLLexer._master = lex.lex(module=self)
+        self.lexer = AQLLexer._master.clone()
     
     def tokenize(self, data):
         """Tokenize input string"""
-        self.lexer.input(data)
+        # Clone so concurrent calls do not share the input position
+        lexer = self.lexer.clone()
+        lexer.input(data)
         tokens = []
         while True:
-            tok = self.lexer.token()
+            tok = lexer.token()
             if not tok:
                 break
             tokens.append(tok)
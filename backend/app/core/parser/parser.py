@@ -1,12 +1,27 @@
 """
 AQL Parser - Generates AST from tokens
 """
+import os
+import re
+import threading
 import ply.yacc as yacc
+from app.config import settings
 from app.core.parser.lexer import AQLLexer
+from app.core.parser.pratt_parser import pratt_parser
 from app.core.parser.ast_nodes import (
     ComparisonNode, LogicalNode, AggregationNode,
     BuildingBlockRefNode, RegexNode, StringOpNode, InOpNode
 )
+from app.core.regex_cache import regex_cache
+from app.core.parser.ast_cache import ast_cache
+
+
+# Generated LALR tables (app/core/parser/aql_parsetab.py). PLY stores the
+# grammar signature and its table version in the module and rebuilds the
+# tables in memory whenever either no longer matches; the file itself is
+# only written by scripts/generate_parse_tables.py.
+PARSE_TABLE_MODULE = 'aql_parsetab'
+PARSE_TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 class AQLParser:
@@ -21,9 +36,21 @@ class AQLParser:
         ('right', 'NOT'),
     )
     
-    def __init__(self):
+    def __init__(self, errorlog=None, write_tables: bool = False):
+        """
+        Args:
+            errorlog: PLY logger for grammar warnings (stderr if omitted)
+            write_tables: Rewrite aql_parsetab.py if it is stale (never at runtime)
+        """
         self.lexer = AQLLexer()
-        self.parser = yacc.yacc(module=self, debug=False, write_tables=False)
+        self.parser = yacc.yacc(
+            module=self,
+            debug=False,
+            write_tables=write_tables,
+            tabmodule=PARSE_TABLE_MODULE,
+            outputdir=PARSE_TABLE_DIR,
+            errorlog=errorlog
+        )
     
     # Grammar rules
     
@@ -74,6 +101,13 @@ class AQLParser:
     
     def p_condition_regex(self, p):
         """condition : IDENTIFIER MATCHES STRING"""
+        # Reject invalid patterns up front; this also warms the engine cache.
+        # (SyntaxError raised inside a PLY action triggers error recovery, so
+        # raise ValueError and let parse() wrap it.)
+        try:
+            regex_cache.get(p[3])
+        except re.error as e:
+            raise ValueError(f"Invalid regex pattern '{p[3]}': {e}")
         p[0] = RegexNode(p[1], p[3])
     
     def p_condition_in(self, p):
@@ -163,14 +197,73 @@ class AQLParser:
             raise SyntaxError(f"Parse error: {str(e)}")
 
 
-# Create global parser instance
-parser = AQLParser()
+class ThreadLocalParser:
+    """
+    One AQLParser per thread
+    
+    PLY keeps the parse stacks on the parser object and the input position
+    on the lexer, so an instance must never be used by two threads at
+    once. Each thread builds its own on first use; grammar warnings are
+    only reported for the first one.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.instances = 0
+    
+    def get(self) -> AQLParser:
+        """Parser owned by the calling thread"""
+        instance = getattr(self._local, "parser", None)
+        if instance is None:
+            # Built under the lock so stale tables are regenerated only once
+            with self._lock:
+                quiet = self.instances > 0
+                self.instances += 1
+                instance = AQLParser(errorlog=yacc.NullLogger() if quiet else None)
+            self._local.parser = instance
+        return instance
+    
+    def parse(self, text: str):
+        """Parse AQL text with the calling thread's parser"""
+        return self.get().parse(text)
+
+
+# Create global parser instance (one AQLParser per thread)
+parser = ThreadLocalParser()
+
+# Parser implementations selectable with settings.AQL_PARSER
+PARSERS = {
+    "ply": parser,
+    "pratt": pratt_parser,
+}
+
+
+def get_parser(name: str = None):
+    """
+    Get a parser implementation by name
+    
+    Args:
+        name: "ply" or "pratt" (settings.AQL_PARSER if omitted)
+        
+    Returns:
+        Parser object with a parse(text) method
+        
+    Raises:
+        ValueError: If the name is unknown
+    """
+    name = name or settings.AQL_PARSER
+    if name not in PARSERS:
+        raise ValueError(f"Unknown AQL parser '{name}' (expected one of: {', '.join(PARSERS)})")
+    return PARSERS[name]
 
 
 def parse_aql(text: str):
     """
     Parse AQL text and return AST
     
+    Parsed ASTs are cached by text and shared; callers must not modify them.
+    
     Args:
         text: AQL query string
         
@@ -180,7 +273,20 @@ def parse_aql(text: str):
     Raises:
         SyntaxError: If parsing fails
     """
-    return parser.parse(text)
+    return ast_cache.get_or_parse(text, get_parser().parse)
+
+
+def warm_ast_cache(text: str) -> bool:
+    """
+    Parse AQL text into the AST cache ahead of use
+    
+    Args:
+        text: AQL query string
+        
+    Returns:
+        True if the text parses
+    """
+    return ast_cache.warm(text, get_parser().parse)
 
 
 def parse_aql_to_dict(text: str):
@@ -0,0 +1,271 @@
+"""
+AQL Pratt Parser - Hand-written alternative to the PLY parser
+Recursive descent for conditions, precedence climbing for AND / OR / NOT
+"""
+import re
+from typing import Any, List, Optional, Tuple
+from app.core.parser.lexer import AQLLexer
+from app.core.parser.ast_nodes import (
+    ASTNode, ComparisonNode, LogicalNode, AggregationNode,
+    BuildingBlockRefNode, RegexNode, StringOpNode, InOpNode
+)
+from app.core.regex_cache import regex_cache
+
+
+# Token: (type, value, position); type None marks the end of input
+Token = Tuple[Optional[str], Any, int]
+
+
+def _master_pattern() -> "re.Pattern":
+    """
+    One regex for all AQLLexer token rules, in PLY's order
+    
+    Function rules come first in definition order, then string rules by
+    decreasing regex length, compiled with PLY's default re.VERBOSE flag.
+    Leading t_ignore characters are consumed by the same match.
+    """
+    functions = []
+    strings = []
+    for name, rule in vars(AQLLexer).items():
+        if not name.startswith('t_') or name in ('t_ignore', 't_error'):
+            continue
+        if callable(rule):
+            functions.append((rule.__code__.co_firstlineno, name[2:], rule.__doc__))
+        else:
+            strings.append((name[2:], rule))
+    functions.sort()
+    strings.sort(key=lambda rule: len(rule[1]), reverse=True)
+    
+    rules = [(name, regex) for _, name, regex in functions] + strings
+    alternatives = '|'.join(f'(?P<{name}>{regex})' for name, regex in rules)
+    return re.compile(f'{_IGNORE_PATTERN}(?:{alternatives})', re.VERBOSE)
+
+
+_IGNORE_PATTERN = f'[{re.escape(AQLLexer.t_ignore)}]*'
+_TOKEN_PATTERN = _master_pattern()
+_SKIP_IGNORED = re.compile(_IGNORE_PATTERN)
+_RESERVED = AQLLexer.reserved
+
+_COMPARISON_OPS = frozenset(['EQ', 'NE', 'LT', 'LE', 'GT', 'GE'])
+_STRING_OPS = frozenset(['CONTAINS', 'STARTSWITH', 'ENDSWITH'])
+_AGG_FUNCTIONS = frozenset(['COUNT', 'SUM', 'AVG', 'MIN', 'MAX'])
+_VALUE_TOKENS = frozenset(['STRING', 'NUMBER', 'IDENTIFIER'])
+
+# Tokens that may follow a complete condition
+_CONDITION_FOLLOW = frozenset(['AND', 'OR', 'RPAREN', None])
+
+# Binding power of the binary operators (NOT binds tighter than both)
+_BINARY_PRECEDENCE = {'OR': 1, 'AND': 2}
+
+
+class _LexError(Exception):
+    """Illegal character; raised when the parser reaches it"""
+    pass
+
+
+def tokenize(text: str) -> List[Token]:
+    """
+    Split AQL text into tokens with AQLLexer's rules and values
+    
+    An illegal character ends the list with an error token, so the error
+    surfaces only if the parser gets that far, as it would with PLY's
+    on-demand lexer.
+    """
+    tokens = []
+    match = _TOKEN_PATTERN.match
+    position = 0
+    length = len(text)
+    while True:
+        m = match(text, position)
+        if m is None:
+            position = _SKIP_IGNORED.match(text, position).end()
+            if position < length:
+                tokens.append(('ERROR', f"Illegal character '{text[position]}' at position {position}", position))
+                return tokens
+            break
+        
+        kind = m.lastgroup
+        value = m.group(kind)
+        start = m.start(kind)
+        # Same value conversions as AQLLexer's token functions
+        if kind == 'IDENTIFIER':
+            keyword = _RESERVED.get(value.upper())
+            if keyword is not None:
+                kind = keyword
+                value = value.upper()
+        elif kind == 'STRING':
+            value = value[1:-1].replace("\\'", "'").replace("\\\\", "\\")
+        elif kind == 'NUMBER':
+            value = float(value) if '.' in value else int(value)
+        tokens.append((kind, value, start))
+        position = m.end()
+    
+    tokens.append((None, None, length))
+    return tokens
+
+
+class _Parse:
+    """Cursor over the tokens of one input"""
+    
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.index = 0
+    
+    def peek(self) -> Optional[str]:
+        """Type of the next token"""
+        token = self.tokens[self.index]
+        if token[0] == 'ERROR':
+            raise _LexError(token[1])
+        return token[0]
+    
+    def advance(self) -> Any:
+        """Consume the next token and return its value"""
+        value = self.tokens[self.index][1]
+        self.index += 1
+        return value
+    
+    def expect(self, *kinds: str) -> Any:
+        """Consume a token of one of the given types"""
+        if self.peek() not in kinds:
+            self.error()
+        return self.advance()
+    
+    def error(self):
+        """Report the next token as unexpected, worded like AQLParser.p_error"""
+        kind, value, position = self.tokens[self.index]
+        if kind is None:
+            raise SyntaxError("Syntax error at EOF")
+        raise SyntaxError(f"Syntax error at token {kind} ('{value}') at position {position}")
+    
+    def expression(self) -> ASTNode:
+        """expression : condition (the whole input)"""
+        node = self.condition(0)
+        if self.peek() is not None:
+            self.error()
+        return node
+    
+    def condition(self, min_precedence: int) -> ASTNode:
+        """Conditions joined by operators binding at least min_precedence"""
+        left = self.unary()
+        while True:
+            operator = self.peek()
+            precedence = _BINARY_PRECEDENCE.get(operator)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
+            # Left associative: the right operand only takes tighter operators
+            right = self.condition(precedence + 1)
+            # Flatten like AQLParser: left operand only
+            if isinstance(left, LogicalNode) and left.operator == operator:
+                left = LogicalNode(operator, left.children + [right])
+            else:
+                left = LogicalNode(operator, [left, right])
+    
+    def unary(self) -> ASTNode:
+        """A NOT, parenthesised or simple condition"""
+        kind = self.peek()
+        if kind == 'NOT':
+            self.advance()
+            return LogicalNode('NOT', [self.unary()])
+        if kind == 'LPAREN':
+            self.advance()
+            node = self.condition(0)
+            self.expect('RPAREN')
+            return node
+        if kind == 'WHEN':
+            self.advance()
+            return BuildingBlockRefNode(self.expect('IDENTIFIER'))
+        if kind in _AGG_FUNCTIONS:
+            return self.aggregation()
+        if kind == 'IDENTIFIER':
+            return self.field_condition()
+        self.error()
+    
+    def field_condition(self) -> ASTNode:
+        """IDENTIFIER followed by a comparison, string op, MATCHES or IN"""
+        field = self.advance()
+        kind = self.peek()
+        if kind in _COMPARISON_OPS:
+            operator = self.advance()
+            return ComparisonNode(field, operator, self.value())
+        if kind in _STRING_OPS:
+            operator = self.advance()
+            return StringOpNode(field, operator, self.expect('STRING'))
+        if kind == 'MATCHES':
+            self.advance()
+            pattern = self.expect('STRING')
+            # PLY reduces (and validates) only once the lookahead is accepted
+            if self.peek() not in _CONDITION_FOLLOW:
+                self.error()
+            try:
+                regex_cache.get(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid regex pattern '{pattern}': {e}")
+            return RegexNode(field, pattern)
+        if kind == 'IN':
+            self.advance()
+            return InOpNode(field, self.value_list(), negated=False)
+        if kind == 'NOT':
+            self.advance()
+            self.expect('IN')
+            return InOpNode(field, self.value_list(), negated=True)
+        self.error()
+    
+    def aggregation(self) -> AggregationNode:
+        """agg_function ( IDENTIFIER ) comparison_op value [WITHIN n unit [GROUP BY IDENTIFIER]]"""
+        function = self.advance()
+        self.expect('LPAREN')
+        field = self.expect('IDENTIFIER')
+        self.expect('RPAREN')
+        operator = self.expect(*_COMPARISON_OPS)
+        value = self.value()
+        
+        time_window = None
+        group_by = None
+        if self.peek() == 'WITHIN':
+            self.advance()
+            amount = self.expect('NUMBER')
+            time_window = {"value": amount, "unit": self.expect('IDENTIFIER')}
+            if self.peek() == 'GROUP':
+                self.advance()
+                self.expect('BY')
+                group_by = self.expect('IDENTIFIER')
+        
+        return AggregationNode(function, field, operator, value, time_window, group_by)
+    
+    def value(self) -> Any:
+        """STRING, NUMBER or IDENTIFIER"""
+        return self.expect(*_VALUE_TOKENS)
+    
+    def value_list(self) -> List[Any]:
+        """( value, value, ... )"""
+        self.expect('LPAREN')
+        values = [self.value()]
+        while self.peek() == 'COMMA':
+            self.advance()
+            values.append(self.value())
+        self.expect('RPAREN')
+        return values
+
+
+class PrattParser:
+    """
+    Hand-written parser for the AQLParser grammar
+    
+    Produces the same AST nodes and error messages as AQLParser but
+    dispatches on token type directly instead of through LALR tables and
+    grammar actions, which makes bulk parsing about 2-3x faster (see
+    benchmarks/bench_parser.py). It keeps no state between calls, so one
+    instance serves all threads.
+    """
+    
+    def parse(self, text: str):
+        """Parse AQL text and return AST"""
+        try:
+            return _Parse(tokenize(text)).expression()
+        except Exception as e:
+            raise SyntaxError(f"Parse error: {str(e)}")
+
+
+# Create global Pratt parser instance
+pratt_parser = PrattParser()
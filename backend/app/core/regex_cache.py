@@ -0,0 +1,84 @@
+"""
+Bounded LRU cache for compiled regex patterns
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Pattern
+from app.config import settings
+
+
+class RegexCache:
+    """
+    Process-wide LRU of compiled MATCHES patterns
+    
+    Shared by the parsers, which validate patterns, and the engine, which
+    matches them, so each pattern is compiled once.
+    
+    Python's internal ``re`` cache is small and thrashes once a rule set
+    holds a few hundred distinct patterns; this cache is sized for the
+    whole rule library and reports its hit rate.
+    """
+    
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._patterns: "OrderedDict[str, Pattern]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, pattern: str) -> Pattern:
+        """
+        Get compiled pattern, compiling it on first use
+        
+        Args:
+            pattern: Regex pattern string
+            
+        Returns:
+            Compiled pattern
+            
+        Raises:
+            re.error: If the pattern is invalid
+        """
+        with self._lock:
+            compiled = self._patterns.get(pattern)
+            if compiled is not None:
+                self._patterns.move_to_end(pattern)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        
+        # Compile outside the lock; invalid patterns are never cached
+        compiled = re.compile(pattern)
+        
+        with self._lock:
+            self._patterns[pattern] = compiled
+            self._patterns.move_to_end(pattern)
+            while len(self._patterns) > self.maxsize:
+                self._patterns.popitem(last=False)
+                self.evictions += 1
+        return compiled
+    
+    def clear(self) -> None:
+        """Drop all cached patterns and reset counters"""
+        with self._lock:
+            self._patterns.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._patterns),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Create global regex cache instance
+regex_cache = RegexCache(settings.REGEX_CACHE_SIZE)
@@ -1,10 +1,13 @@
 """
 FastAPI main application
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
 from app.storage.db import init_db
+from app.core.engine.parallel import parallel_evaluator
+from app.core.engine.executor import evaluation_executor, ExecutorBusyError
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -31,6 +34,23 @@ async def startup_event():
     print(f"📚 API Documentation: http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop rule evaluation threads and worker processes"""
+    evaluation_executor.shutdown()
+    parallel_evaluator.shutdown()
+
+
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request: Request, exc: ExecutorBusyError):
+    """Shed load when the evaluation queue is full"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
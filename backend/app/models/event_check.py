@@ -0,0 +1,64 @@
+"""
+Lightweight validation of raw event dicts against the Event schema
+"""
+import typing
+from typing import Any, Dict, List, Tuple
+from app.models.schemas import Event
+
+
+def _field_specs() -> List[Tuple[str, type, bool]]:
+    """(name, base type, required) for every declared Event field"""
+    specs = []
+    for name, field in Event.model_fields.items():
+        base = field.annotation
+        if typing.get_origin(base) is typing.Union:
+            base = next(arg for arg in typing.get_args(base) if arg is not type(None))
+        specs.append((name, base, field.is_required()))
+    return specs
+
+
+EVENT_FIELDS = _field_specs()
+
+# Declared fields in model order, as Event(...).dict() emits them
+_EVENT_DEFAULTS = {name: None for name, _, _ in EVENT_FIELDS}
+
+
+def check_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate one event without building an Event model when possible
+    
+    Events whose declared fields already have their exact types are
+    returned as-is. Anything else (missing required fields, values Pydantic
+    would coerce such as "80" for an int field) goes through the Event
+    model, so accepted events and error messages match the full schema.
+    
+    Args:
+        event: Raw event dictionary
+    
+    Returns:
+        Event dictionary to evaluate
+    
+    Raises:
+        pydantic.ValidationError: If the event does not match the schema
+    """
+    for name, base, required in EVENT_FIELDS:
+        value = event.get(name)
+        if value is None:
+            if required:
+                break
+        elif type(value) is not base:
+            break
+    else:
+        return event
+    
+    return Event(**event).dict()
+
+
+def serialize_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shape an evaluated event like Event(...).dict()
+    
+    Declared fields come first, in model order, with None for missing
+    ones; extra fields follow.
+    """
+    return {**_EVENT_DEFAULTS, **event}
@@ -159,21 +159,48 @@ class EvaluationPhases(BaseModel):
     aql: str = "not_applicable"
 
 
+class MatchOutput(str, Enum):
+    EVENTS = "events"
+    IDS = "ids"
+    INDICES = "indices"
+
+
 class TestRequest(BaseModel):
     rule: RuleBase
-    events: List[Event]
+    # Raw dicts; each event is checked against Event by the route
+    events: List[Dict[str, Any]]
     building_blocks: Optional[List[BuildingBlockResponse]] = []
+    return_matches: MatchOutput = MatchOutput.EVENTS
 
 
 class TestResult(BaseModel):
     alert: bool
     rule_id: Optional[str] = None
     rule_name: str
-    matched_events: List[Event] = []
+    matched_events: List[Dict[str, Any]] = []
+    matched_event_ids: Optional[List[str]] = None
+    matched_indices: Optional[List[int]] = None
     trigger_details: Optional[str] = None
+    group_keys: Optional[List[Any]] = None
     trigger_timestamp: Optional[str] = None
     evaluation_phases: EvaluationPhases
     error: Optional[str] = None
+    timestamp_errors: Optional[int] = None
+    events_processed: Optional[int] = None
+
+
+class BatchTestRequest(BaseModel):
+    # Stored rules to test; every stored rule when omitted
+    rule_ids: Optional[List[str]] = None
+    events: List[Dict[str, Any]]
+    return_matches: MatchOutput = MatchOutput.EVENTS
+
+
+class BatchTestResult(BaseModel):
+    results: List[TestResult] = []
+    total_rules: int
+    alerts: int
+    missing_rules: List[str] = []
 
 
 class ValidateSyntaxRequest(BaseModel):
@@ -0,0 +1,54 @@
+"""
+Benchmark Building Block phase 1 with and without the inverted event index
+
+Usage (from backend/):
+    python benchmarks/bench_bb_index.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.parser import parse_aql
+from app.core.engine.rule_engine import RuleEngine
+
+
+EVENTS = 50000
+BUILDING_BLOCKS = 30
+
+
+def workload(matching: bool):
+    """Rule over BUILDING_BLOCKS equality / IN Building Blocks, matching early or never"""
+    events = [
+        {
+            "sourceIP": f"10.{i % 7}.{i % 251}.{i % 13}",
+            "username": f"u{i % 997}",
+            "port": i % 1024,
+        }
+        for i in range(EVENTS)
+    ]
+    building_blocks = {}
+    for k in range(BUILDING_BLOCKS):
+        ip = f"10.{k % 7}.{k}.{k % 13}" if matching else f"192.168.{k}.1"
+        building_blocks[f"BB_{k}"] = parse_aql(
+            f"sourceIP IN ('{ip}', '192.168.{k}.2') OR (username = 'svc{k}' AND port = {2000 + k})"
+        )
+    rule = parse_aql(" AND ".join(f"when BB_{k}" for k in range(BUILDING_BLOCKS)) + " AND port != 22")
+    return rule, events, building_blocks
+
+
+def bench(engine: RuleEngine, rule, events, building_blocks) -> float:
+    """Seconds for one evaluation"""
+    start = time.perf_counter()
+    engine.evaluate_rule(rule, events, building_blocks)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"{'workload':>10} {'scan (s)':>10} {'index (s)':>10}")
+    for matching in (False, True):
+        rule, events, building_blocks = workload(matching)
+        scanned = bench(RuleEngine(), rule, events, building_blocks)
+        indexed = bench(RuleEngine(index_after_events=1000), rule, events, building_blocks)
+        name = "matching" if matching else "failing"
+        print(f"{name:>10} {scanned:>10.3f} {indexed:>10.3f}")
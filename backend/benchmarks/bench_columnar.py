@@ -0,0 +1,57 @@
+"""
+Benchmark row-by-row against columnar (vectorized mask) rule evaluation
+
+Usage (from backend/):
+    python benchmarks/bench_columnar.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.parser import parse_aql
+from app.core.engine.rule_engine import RuleEngine
+
+
+EVENTS = 100000
+RULES = 20
+
+
+def workload():
+    """Firewall-like events; rules over ports, severity, addresses and users"""
+    events = [
+        {
+            "sourceIP": f"10.0.{i % 64}.{i % 251}",
+            "username": f"user{i % 500}",
+            "port": (i * 7) % 1024,
+            "severity": i % 10,
+            "bytes": (i * 7919) % 1000003,
+            "action": ("ALLOW", "DENY", "DROP")[i % 3],
+        }
+        for i in range(EVENTS)
+    ]
+    rules = {
+        f"rule_{k}": parse_aql(
+            f"(port = {22 + k} OR port IN (3389, {8000 + k})) AND severity >= {k % 10}"
+            f" AND action != 'ALLOW' AND username CONTAINS '{k}' AND bytes > {k * 1000}"
+        )
+        for k in range(RULES)
+    }
+    return rules, events
+
+
+def bench(engine: RuleEngine, rules, events) -> float:
+    """Seconds for one evaluate_rules call"""
+    start = time.perf_counter()
+    engine.evaluate_rules(rules, events)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rules, events = workload()
+    print(f"{'rules':>6} {'rows (s)':>10} {'columns (s)':>12}")
+    for count in (1, RULES):
+        subset = dict(list(rules.items())[:count])
+        rows = bench(RuleEngine(), subset, events)
+        columns = bench(RuleEngine(columnar_min_events=0), subset, events)
+        print(f"{count:>6} {rows:>10.3f} {columns:>12.3f}")
@@ -0,0 +1,72 @@
+"""
+Benchmark windowed GROUP BY: every window of every key vs partitioned sweeps
+
+Usage (from backend/):
+    python benchmarks/bench_group_by.py
+"""
+import sys
+import os
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.engine.correlator import Correlator
+from app.core.engine.timestamps import EventTimestamps
+
+
+EVENTS = 200000
+TIME_WINDOW = {"value": 1, "unit": "minutes"}
+
+
+def workload(keys: int):
+    """One event per 10 ms spread round-robin over `keys` source addresses"""
+    return [
+        {
+            "eventId": str(i),
+            "timestamp": 1770890400 + i / 100,
+            "sourceIP": f"10.{i % keys // 65536}.{i % keys // 256 % 256}.{i % keys % 256}",
+            "bytes": i % 1000,
+        }
+        for i in range(EVENTS)
+    ]
+
+
+def every_window(events, timestamps):
+    """Keys with a window of COUNT >= 10, from the full window list"""
+    keys = set()
+    for window in Correlator.group_events_by_time_window(events, TIME_WINDOW, "sourceIP", timestamps):
+        if len(window) >= 10:
+            keys.add(window[0]["sourceIP"])
+    return keys
+
+
+def partitioned(events, timestamps):
+    """Keys with a window of COUNT >= 10, one early-exit sweep per partition"""
+    groups = Correlator.find_group_windows(
+        events, TIME_WINDOW, "COUNT", "eventId", lambda value: value >= 10, "sourceIP", timestamps
+    )
+    return {group["key"] for group in groups}
+
+
+def measure(function, *args):
+    """(seconds, peak MB, result); memory is traced in a second, untimed run"""
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+if __name__ == "__main__":
+    print(f"{'keys':>8} {'windows (s)':>12} {'MB':>8} {'sweep (s)':>10} {'MB':>8}")
+    for keys in (10, 1000, 100000):
+        events = workload(keys)
+        timestamps = EventTimestamps(events)
+        timestamps.sorted_indices()
+        old_time, old_peak, old_keys = measure(every_window, events, timestamps)
+        new_time, new_peak, new_keys = measure(partitioned, events, timestamps)
+        assert old_keys == new_keys
+        print(f"{keys:>8} {old_time:>12.3f} {old_peak:>8.1f} {new_time:>10.3f} {new_peak:>8.1f}")
@@ -0,0 +1,37 @@
+"""
+Benchmark IN membership lookups as the value list grows
+
+Usage (from backend/):
+    python benchmarks/bench_in_op.py
+"""
+import sys
+import os
+import timeit
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.parser.ast_nodes import InOpNode
+from app.core.engine.compiler import compile_rule
+
+
+SIZES = [10, 1000, 10000, 100000]
+LOOKUPS = 20000
+
+
+def bench(size: int):
+    """Time hashed vs list membership for a watchlist of `size` IPs"""
+    values = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(size)]
+    predicate = compile_rule(InOpNode('sourceIP', values))
+    
+    # Worst case for a list scan: the value is absent
+    event = {"sourceIP": "192.168.1.1"}
+    hashed = timeit.timeit(lambda: predicate(event), number=LOOKUPS)
+    scanned = timeit.timeit(lambda: event["sourceIP"] in values, number=max(LOOKUPS // size, 10))
+    scanned = scanned / max(LOOKUPS // size, 10) * LOOKUPS
+    return hashed / LOOKUPS * 1e6, scanned / LOOKUPS * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'values':>8} {'frozenset (us)':>16} {'list scan (us)':>16}")
+    for size in SIZES:
+        hashed, scanned = bench(size)
+        print(f"{size:>8} {hashed:>16.3f} {scanned:>16.3f}")
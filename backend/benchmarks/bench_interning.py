@@ -0,0 +1,76 @@
+"""
+Benchmark memory and rule evaluation with interned event fields
+
+Usage (from backend/):
+    python benchmarks/bench_interning.py
+"""
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.parser import parse_aql
+from app.core.engine.rule_engine import RuleEngine
+from app.core.engine.interning import StringDictionary
+
+
+EVENTS = 200000
+RULES = 20
+FIELDS = ["eventName", "sourceIP", "destinationIP", "username"]
+
+
+def decoded_events():
+    """Events decoded from NDJSON, as an upload produces them (own string objects)"""
+    lines = [
+        json.dumps({
+            "eventName": ("Login Success", "Login Failure", "Logout")[i % 3],
+            "sourceIP": f"10.{i % 3}.{i % 97}.{i % 89}",
+            "destinationIP": f"192.168.{i % 5}.{i % 61}",
+            "username": f"user{i % 2000}",
+            "port": i % 1024,
+        })
+        for i in range(EVENTS)
+    ]
+    return [json.loads(line) for line in lines]
+
+
+def field_memory(events) -> int:
+    """Bytes held by distinct string objects of FIELDS"""
+    seen = {}
+    for event in events:
+        for field in FIELDS:
+            value = event[field]
+            seen[id(value)] = sys.getsizeof(value)
+    return sum(seen.values())
+
+
+def bench(engine: RuleEngine, rules, events) -> float:
+    """Seconds for one evaluate_rules call"""
+    start = time.perf_counter()
+    engine.evaluate_rules(rules, events)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    events = decoded_events()
+    strings = StringDictionary(FIELDS)
+    plain = field_memory(events)
+    for event in events:
+        strings.intern_event(event)
+    interned = field_memory(events)
+    print(f"{'strings (MB)':>14} {'plain':>8} {'interned':>9}")
+    print(f"{'':>14} {plain / 1e6:>8.1f} {interned / 1e6:>9.1f}")
+    print()
+    
+    rules = {
+        f"rule_{k}": parse_aql(
+            f"sourceIP = '10.{k % 3}.{k}.{k}' AND username IN ('user{k}', 'user{k + 1}') AND eventName != 'Logout'"
+        )
+        for k in range(RULES)
+    }
+    rows = bench(RuleEngine(), rules, events)
+    columns = bench(RuleEngine(columnar_min_events=0), rules, events)
+    codes = bench(RuleEngine(columnar_min_events=0, strings=strings), rules, events)
+    print(f"{'rules':>6} {'rows (s)':>10} {'columns (s)':>12} {'codes (s)':>10}")
+    print(f"{RULES:>6} {rows:>10.3f} {columns:>12.3f} {codes:>10.3f}")
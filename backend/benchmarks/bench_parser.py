@@ -0,0 +1,42 @@
+"""
+Benchmark bulk parsing with the PLY parser and the Pratt parser
+
+Usage (from backend/):
+    python benchmarks/bench_parser.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.parser.parser import get_parser
+
+
+RULES = 5000
+
+
+def rule_text(i: int) -> str:
+    """Distinct rule text mixing every construct"""
+    return (
+        f"(sourceIP = '10.0.{i % 256}.{i // 256}' OR username IN ('u{i}', 'v{i}', {i})) "
+        f"AND NOT eventName CONTAINS 'x{i}' AND port NOT IN ({i}, {i + 1}) "
+        f"AND COUNT(eventId) >= {i % 50} within {i % 59 + 1} minutes GROUP BY sourceIP"
+    )
+
+
+def bench(name: str, texts):
+    """Seconds to parse all texts once (uncached)"""
+    parse = get_parser(name).parse
+    parse(texts[0])  # build tables / lexer outside the timing
+    start = time.perf_counter()
+    for text in texts:
+        parse(text)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    texts = [rule_text(i) for i in range(RULES)]
+    print(f"{'parser':>8} {'total (s)':>10} {'per rule (us)':>14}")
+    for name in ("ply", "pratt"):
+        elapsed = bench(name, texts)
+        print(f"{name:>8} {elapsed:>10.3f} {elapsed / RULES * 1e6:>14.1f}")
@@ -0,0 +1,58 @@
+"""
+Benchmark windowed aggregation: sliding accumulators vs re-aggregating each window
+
+Usage (from backend/):
+    python benchmarks/bench_windows.py
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.engine.correlator import Correlator
+from app.core.engine.aggregator import Aggregator
+from app.core.engine.timestamps import EventTimestamps
+
+
+EVENTS = 20000
+TIME_WINDOW = {"value": 5, "unit": "minutes"}
+
+
+def workload():
+    """One event per second with a varying byte count"""
+    return [
+        {
+            "eventId": str(i),
+            "timestamp": 1770890400 + i,
+            "bytes": (i * 7919) % 100000,
+        }
+        for i in range(EVENTS)
+    ]
+
+
+def reaggregate(events, function, timestamps) -> float:
+    """Seconds to aggregate every window from scratch"""
+    start = time.perf_counter()
+    for window in Correlator.group_events_by_time_window(events, TIME_WINDOW, None, timestamps):
+        if Aggregator.aggregate(function, window, "bytes") > 1e12:
+            break
+    return time.perf_counter() - start
+
+
+def sliding(events, function, timestamps) -> float:
+    """Seconds for one sweep with an accumulator"""
+    start = time.perf_counter()
+    Correlator.find_aggregate_window(
+        events, TIME_WINDOW, function, "bytes", lambda value: value > 1e12, None, timestamps
+    )
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    events = workload()
+    timestamps = EventTimestamps(events)
+    timestamps.sorted_indices()
+    print(f"{'function':>10} {'per window (s)':>15} {'sliding (s)':>12}")
+    for function in ("SUM", "AVG", "MIN", "MAX"):
+        print(f"{function:>10} {reaggregate(events, function, timestamps):>15.3f} "
+              f"{sliding(events, function, timestamps):>12.3f}")
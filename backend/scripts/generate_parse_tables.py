@@ -0,0 +1,26 @@
+"""
+Regenerate the committed LALR tables (app/core/parser/aql_parsetab.py)
+
+Run after changing the AQL grammar and commit the result; the parser
+only reads the tables. They are always rebuilt: PLY itself only rewrites
+them when the grammar signature changes, leaving the source line numbers
+recorded for each production stale when grammar methods merely move.
+
+Usage (from backend/):
+    python scripts/generate_parse_tables.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ply.yacc as yacc
+from app.core.parser.parser import AQLParser, PARSE_TABLE_DIR, PARSE_TABLE_MODULE
+
+
+if __name__ == "__main__":
+    table_path = os.path.join(PARSE_TABLE_DIR, PARSE_TABLE_MODULE) + ".py"
+    # With no tables to read, yacc builds and writes them from scratch
+    if os.path.exists(table_path):
+        os.remove(table_path)
+    AQLParser(write_tables=True)
+    print(f"Wrote {table_path} (table version {yacc.__tabversion__})")
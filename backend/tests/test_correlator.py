@@ -0,0 +1,268 @@
+"""
+Test time-window correlation
+"""
+import sys
+import os
+import random
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.engine.correlator import Correlator
+from app.core.engine.aggregator import Aggregator
+from app.core.engine.grouping import GroupPartitions
+from app.core.engine.timestamps import EventTimestamps, parse_epoch
+from app.core.engine.rule_engine import evaluate_rule
+from app.core.parser import parse_aql
+
+
+def reference_find_matching_window(events, time_window, min_count, group_by=None):
+    """Quadratic window search (previous implementation) used as an oracle"""
+    sorted_events = Correlator.sort_events_by_timestamp(events)
+    window_delta = Correlator.parse_time_window(time_window)
+    
+    grouped = {}
+    for event in sorted_events:
+        key = event.get(group_by, '__none__') if group_by else None
+        grouped.setdefault(key, []).append(event)
+    
+    for group in grouped.values():
+        for i, event in enumerate(group):
+            try:
+                event_time = Correlator.parse_timestamp(event.get('timestamp', ''))
+            except ValueError:
+                continue
+            window = [event]
+            for later in group[i + 1:]:
+                try:
+                    later_time = Correlator.parse_timestamp(later.get('timestamp', ''))
+                except ValueError:
+                    continue
+                if later_time > event_time + window_delta:
+                    break
+                window.append(later)
+            if len(window) >= min_count:
+                return True, window
+    return False, []
+
+
+def make_events(count, seed):
+    """Random events over one hour, a few with broken timestamps"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        if rng.random() < 0.05:
+            timestamp = "not a timestamp"
+        else:
+            minute, second = rng.randint(0, 59), rng.randint(0, 59)
+            timestamp = f"2026-02-12T10:{minute:02d}:{second:02d}Z"
+        events.append({
+            "eventId": str(i),
+            "timestamp": timestamp,
+            "sourceIP": rng.choice(["10.0.0.1", "10.0.0.2", "10.0.0.3"]),
+        })
+    return events
+
+
+def test_sliding_window_matches_reference():
+    """Test two-pointer window search returns the same window as the quadratic scan"""
+    for seed in range(20):
+        events = make_events(60, seed)
+        for min_count in (1, 3, 8, 15):
+            for group_by in (None, "sourceIP"):
+                time_window = {"value": 2, "unit": "minutes"}
+                expected = reference_find_matching_window(events, time_window, min_count, group_by)
+                actual = Correlator.find_matching_window(events, time_window, min_count, group_by)
+                assert actual == expected, (seed, min_count, group_by)
+    print("✓ Sliding window test passed")
+
+
+def test_sliding_window_large_group():
+    """Test a single large GROUP BY bucket is handled in linear time"""
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T{10 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+         "sourceIP": "10.0.0.1"}
+        for i in range(10000)
+    ]
+    found, window = Correlator.find_matching_window(events, {"value": 5, "unit": "minutes"}, 400, "sourceIP")
+    assert not found and window == []
+    
+    found, window = Correlator.find_matching_window(events, {"value": 5, "unit": "minutes"}, 301, "sourceIP")
+    assert found and len(window) == 301
+    print("✓ Large group sliding window test passed")
+
+
+def test_aggregate_window_matches_reference():
+    """Test windowed SUM / AVG / MIN / MAX / COUNT against aggregating every window"""
+    time_window = {"value": 2, "unit": "minutes"}
+    for seed in range(10):
+        events = make_events(60, seed)
+        rng = random.Random(seed)
+        for event in events:
+            if rng.random() < 0.9:
+                event["bytes"] = rng.choice([rng.randint(0, 5000), rng.uniform(0, 5000), 0.1])
+        for function, threshold in (("SUM", 15000), ("AVG", 3500), ("MIN", 4000), ("MAX", 4990), ("COUNT", 6)):
+            condition = lambda value: value >= threshold
+            for group_by in (None, "sourceIP"):
+                expected = (False, [], None)
+                for window in Correlator.group_events_by_time_window(events, time_window, group_by):
+                    value = Aggregator.aggregate(function, window, "bytes")
+                    if value is not None and condition(value):
+                        expected = (True, window, value)
+                        break
+                actual = Correlator.find_aggregate_window(
+                    events, time_window, function, "bytes",
+                    lambda value: value is not None and condition(value), group_by
+                )
+                assert actual == expected, (seed, function, group_by)
+    print("✓ Windowed aggregation test passed")
+
+
+def test_windowed_sum_rule():
+    """Test a SUM threshold is found in a later window, not only the first one"""
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T10:{i:02d}:00Z", "bytes": 10 if i < 30 else 4 * 10 ** 8}
+        for i in range(40)
+    ]
+    result = evaluate_rule(parse_aql("SUM(bytes) > 1000000000 within 5 minutes"), events)
+    assert result['alert'] == True
+    assert [e['eventId'] for e in result['matched_events']] == ["27", "28", "29", "30", "31", "32"]
+    assert "SUM(bytes) = 1200000030" in result['trigger_details']
+    
+    result = evaluate_rule(parse_aql("MAX(bytes) < 5 within 5 minutes"), events)
+    assert result['alert'] == False
+    print("✓ Windowed SUM rule test passed")
+
+
+def test_windowed_min_max_mixed_types():
+    """Test windowed MIN / MAX convert numeric strings and skip other values"""
+    time_window = {"value": 2, "unit": "minutes"}
+    values = [50, "20", "n/a", 35.5, None, "7", {"bytes": 1}, 90, "100.5", 60]
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T10:{i:02d}:00Z", "bytes": value}
+        for i, value in enumerate(values)
+    ]
+    
+    found, matched, value = Correlator.find_aggregate_window(
+        events, time_window, "MIN", "bytes", lambda value: value is not None and value < 10
+    )
+    assert found and value == 7.0
+    assert [e["eventId"] for e in matched] == ["3", "4", "5"]
+    
+    found, matched, value = Correlator.find_aggregate_window(
+        events, time_window, "MAX", "bytes", lambda value: value is not None and value > 95
+    )
+    assert found and value == 100.5
+    assert [e["eventId"] for e in matched] == ["6", "7", "8"]
+    
+    # One-shot aggregation converts and skips alike
+    assert Aggregator.min(events, "bytes") == 7.0
+    assert Aggregator.max(events, "bytes") == 100.5
+    assert Aggregator.min([{"bytes": "n/a"}], "bytes") is None
+    print("✓ Windowed MIN / MAX mixed types test passed")
+
+
+def test_group_windows_report_every_key():
+    """Test GROUP BY windows report every matching key"""
+    time_window = {"value": 2, "unit": "minutes"}
+    for seed in range(10):
+        events = make_events(80, seed)
+        rng = random.Random(seed)
+        for event in events:
+            event["bytes"] = rng.randint(0, 1000)
+            if rng.random() < 0.1:
+                del event["sourceIP"]
+        for function, threshold in (("COUNT", 4), ("SUM", 2500), ("MAX", 990)):
+            condition = lambda value: value is not None and value >= threshold
+            expected = []
+            for key in ("10.0.0.1", "10.0.0.2", "10.0.0.3", "__none__"):
+                members = [e for e in events if e.get("sourceIP", "__none__") == key]
+                found, window, value = Correlator.find_aggregate_window(
+                    members, time_window, function, "bytes", condition
+                )
+                if found:
+                    expected.append((key, window, value))
+            groups = Correlator.find_group_windows(events, time_window, function, "bytes", condition, "sourceIP")
+            actual = [(g["key"], g["matched_events"], g["value"]) for g in groups]
+            assert sorted(actual, key=str) == sorted(expected, key=str), (seed, function)
+    
+    timestamps = EventTimestamps(events)
+    partitions = GroupPartitions(events, timestamps, "sourceIP")
+    for key in partitions.keys():
+        indices = list(partitions.indices(key))
+        assert indices == [i for i in timestamps.sorted_indices()
+                           if events[i].get("sourceIP", "__none__") == key
+                           and timestamps.epochs[i] == timestamps.epochs[i]]
+    
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T10:{i % 60:02d}:00Z", "sourceIP": f"10.0.0.{i % 4}"}
+        for i in range(120)
+    ]
+    result = evaluate_rule(parse_aql("COUNT(eventId) >= 2 within 5 minutes GROUP BY sourceIP"), events)
+    assert result['alert'] == True
+    assert sorted(result['group_keys']) == ["10.0.0.0", "10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    assert "for 4 sourceIP group(s)" in result['trigger_details']
+    print("✓ GROUP BY windows test passed")
+
+
+def test_parse_epoch_formats():
+    """Test ISO-8601 / RFC 3339 and epoch timestamps normalize to the same instant"""
+    expected = 1770890400.0  # 2026-02-12T10:00:00Z
+    for value in [
+        "2026-02-12T10:00:00Z",
+        "2026-02-12T10:00:00.000Z",
+        "2026-02-12T12:00:00+02:00",
+        "2026-02-12 10:00:00",
+        1770890400,
+        1770890400000,
+        "1770890400000",
+    ]:
+        assert parse_epoch(value) == expected, value
+    
+    assert parse_epoch("2026-02-12T10:00:00.250Z") == expected + 0.25
+    for value in [None, "", "yesterday", True, float("nan"), "\u00b2", "9" * 400, 10 ** 400, "9" * 5000]:
+        assert parse_epoch(value) is None, value
+    # Counted as timestamp errors rather than failing the evaluation
+    assert EventTimestamps([{"timestamp": "\u00b2"}, {"timestamp": 10 ** 400}]).invalid_count == 2
+    print("✓ Timestamp parsing test passed")
+
+
+def test_unparseable_timestamps_reported():
+    """Test unparseable timestamps are counted and reported by the engine"""
+    events = [
+        {"eventId": "1", "timestamp": "2026-02-12T10:00:00Z"},
+        {"eventId": "2", "timestamp": "2026-02-12T10:01:00+00:00"},
+        {"eventId": "3", "timestamp": "garbage"},
+        {"eventId": "4"},
+    ]
+    timestamps = EventTimestamps(events)
+    assert timestamps.invalid_count == 2
+    assert timestamps.sorted_indices() == [2, 3, 0, 1]
+    
+    result = evaluate_rule(parse_aql("COUNT(eventId) >= 2 within 5 minutes"), events)
+    assert result['alert'] == True
+    assert result['timestamp_errors'] == 2
+    assert [e['eventId'] for e in result['matched_events']] == ["1", "2"]
+    print("✓ Unparseable timestamp reporting test passed")
+
+
+if __name__ == "__main__":
+    print("Running Correlator Tests...")
+    print()
+    
+    try:
+        test_sliding_window_matches_reference()
+        test_sliding_window_large_group()
+        test_aggregate_window_matches_reference()
+        test_windowed_sum_rule()
+        test_windowed_min_max_mixed_types()
+        test_group_windows_report_every_key()
+        test_parse_epoch_formats()
+        test_unparseable_timestamps_reported()
+        
+        print()
+        print("=" * 50)
+        print("All tests passed! ✓")
+        print("=" * 50)
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
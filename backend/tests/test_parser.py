@@ -5,7 +5,15 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.core.parser import parse_aql_to_dict
+from app.core.parser import parse_aql, parse_aql_to_dict
+from app.core.parser.ast_cache import ASTCache
+from app.core.parser.parser import AQLParser, parser, get_parser
+from app.core.parser.pratt_parser import pratt_parser
+from app.config import settings
+from app.core.parser import aql_parsetab
+from concurrent.futures import ThreadPoolExecutor
+import random
+import ply.yacc as yacc
 
 
 def test_simple_comparison():
@@ -89,6 +97,208 @@ def test_complex_query():
     print("✓ Complex query test passed")
 
 
+def test_invalid_regex_rejected():
+    """Test invalid MATCHES patterns are rejected at parse time"""
+    aql = "message MATCHES 'fail(ed'"
+    try:
+        parse_aql(aql)
+    except SyntaxError as e:
+        assert 'Invalid regex pattern' in str(e)
+    else:
+        raise AssertionError("Invalid regex was accepted")
+    print("✓ Invalid regex test passed")
+
+
+def test_ast_cache():
+    """Test parsed ASTs are cached by text with LRU eviction"""
+    cache = ASTCache(maxsize=2, max_text_length=100)
+    
+    first = cache.get_or_parse("severity > 5", parser.parse)
+    assert cache.get_or_parse("severity > 5", parser.parse) is first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    
+    # Syntax errors are cached with their message
+    for _ in range(2):
+        try:
+            cache.get_or_parse("severity >", parser.parse)
+            raise AssertionError("Invalid AQL was accepted")
+        except SyntaxError as e:
+            assert "Syntax error" in str(e)
+    assert cache.stats()["hits"] == 2
+    
+    # Least recently used entry is evicted
+    cache.get_or_parse("severity > 5", parser.parse)
+    cache.get_or_parse("port = 22", parser.parse)
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_parse("severity > 5", parser.parse) is first
+    
+    # Oversized texts are parsed but not stored
+    long_aql = " OR ".join(f"port = {i}" for i in range(20))
+    cache.get_or_parse(long_aql, parser.parse)
+    assert cache.get_or_parse(long_aql, parser.parse) is not cache.get_or_parse(long_aql, parser.parse)
+    assert cache.stats()["size"] == 2
+    print("✓ AST cache test passed")
+
+
+def _stress_rule(i):
+    """Distinct AQL text covering every grammar construct"""
+    kinds = [
+        f"sourceIP = '10.0.{i % 256}.{i // 256}' AND port > {i}",
+        f"username IN ('u{i}', 'v{i}', {i}) OR NOT eventName CONTAINS 'x{i}'",
+        f"(severity >= {i % 10} OR message MATCHES '^m{i}[0-9]+$') AND protocol != 'p{i}'",
+        f"when BB_{i}",
+        f"COUNT(eventId) >= {i} within {i % 59 + 1} minutes GROUP BY sourceIP",
+        f"message STARTSWITH 's{i}' AND message ENDSWITH 'e{i}' AND port NOT IN ({i}, {i + 1})",
+    ]
+    return kinds[i % len(kinds)]
+
+
+def test_concurrent_parsing():
+    """Test thousands of distinct rules parse correctly from many threads at once"""
+    texts = [_stress_rule(i) for i in range(3000)]
+    reference = AQLParser(errorlog=yacc.NullLogger())
+    expected = [reference.parse(text).to_dict() for text in texts]
+    
+    def parse(text):
+        try:
+            return parser.parse(text).to_dict()
+        except SyntaxError as e:
+            return str(e)
+    
+    # Switch threads very often so unsafe sharing would show up
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(parse, texts))
+    finally:
+        sys.setswitchinterval(interval)
+    
+    mismatches = [i for i, (got, want) in enumerate(zip(results, expected)) if got != want]
+    assert not mismatches, f"{len(mismatches)} ASTs differ, first: {texts[mismatches[0]]}"
+    print("✓ Concurrent parsing test passed")
+
+
+def test_parse_tables_current():
+    """Test the committed LALR tables were generated from the current grammar"""
+    # Bound grammar methods without running yacc, so nothing is built or written
+    instance = AQLParser.__new__(AQLParser)
+    grammar = yacc.ParserReflect({name: getattr(instance, name) for name in dir(instance)}, log=yacc.NullLogger())
+    grammar.get_all()
+    
+    # Stale tables are rebuilt in memory on every start; run scripts/generate_parse_tables.py
+    assert aql_parsetab._lr_signature == grammar.signature(), "aql_parsetab.py is stale"
+    assert aql_parsetab._tabversion == yacc.__tabversion__
+    
+    # PLY keeps tables whose signature matches, so moved grammar methods are
+    # checked here: each production records the line of its docstring rule
+    recorded = [(text, func, file, line) for text, _, _, func, file, line in aql_parsetab._lr_productions[1:]]
+    current = [
+        (f"{name} -> {' '.join(syms)}".rstrip(), func, "parser.py", doc_line)
+        for line, _, func, doc in grammar.pfuncs
+        for _, doc_line, name, syms in yacc.parse_grammar(doc, "parser.py", line)
+    ]
+    assert recorded == current, "aql_parsetab.py line numbers are stale"
+    print("✓ Parse tables test passed")
+
+
+# Fragments spliced into fuzzed rules: keywords in any case, unused reserved
+# words, broken strings, invalid regexes and illegal characters
+_FUZZ_FRAGMENTS = [
+    "port", "=", "<=", "!=", "AND", "or", "not", "IN", "(", ")", ",", "'s'",
+    "'a\\\\'b'", "'(x'", "5", "2.5", "when", "count", "WITHIN", "minutes",
+    "GROUP", "BY", "contains", "MATCHES", "FIRST", "$", "'open",
+]
+
+
+def _fuzz_condition(rng, depth=0):
+    """Random condition covering every grammar construct"""
+    field = rng.choice(["sourceIP", "port", "user_name"])
+    value = rng.choice(["'x'", "22", "2.5", "other_field", "'it\\\\'s'"])
+    kind = rng.randrange(9 if depth < 3 else 6)
+    if kind == 0:
+        return f"{field} {rng.choice(['=', '!=', '<', '<=', '>', '>='])} {value}"
+    if kind == 1:
+        return f"{field} {rng.choice(['CONTAINS', 'startswith', 'EndsWith'])} {value}"
+    if kind == 2:
+        pattern = rng.choice(["'^a.*$'", "'(x'"])
+        return f"{field} MATCHES {pattern}"
+    if kind == 3:
+        values = ", ".join(rng.choice(["1", "'s'", "ident"]) for _ in range(rng.randint(1, 3)))
+        return f"{field} {rng.choice(['IN', 'NOT IN', 'not in'])} ({values})"
+    if kind == 4:
+        return f"when BB_{rng.randint(1, 3)}"
+    if kind == 5:
+        window = rng.choice(["", " WITHIN 5 minutes", " within 1.5 hour GROUP BY sourceIP"])
+        return f"{rng.choice(['COUNT', 'sum', 'Avg', 'MIN', 'max'])}({field}) {rng.choice(['>', '='])} {value}{window}"
+    if kind == 6:
+        return f"NOT {_fuzz_condition(rng, depth + 1)}"
+    if kind == 7:
+        return f"({_fuzz_condition(rng, depth + 1)} {rng.choice(['AND', 'OR'])} {_fuzz_condition(rng, depth + 1)})"
+    return f"{_fuzz_condition(rng, depth + 1)} {rng.choice(['AND', 'or'])} {_fuzz_condition(rng, depth + 1)}"
+
+
+def _fuzz_rule(rng):
+    """Random rule text, mutated half of the time"""
+    text = f" {rng.choice(['AND', 'OR'])} ".join(_fuzz_condition(rng) for _ in range(rng.randint(1, 4)))
+    if rng.random() < 0.5:
+        words = text.split(" ")
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randrange(len(words) + 1)
+            if rng.random() < 0.5 and len(words) > 1:
+                del words[min(position, len(words) - 1)]
+            else:
+                words.insert(position, rng.choice(_FUZZ_FRAGMENTS))
+        text = rng.choice([" ", "\t", "\n "]).join(words)
+    return text
+
+
+def test_pratt_parser_matches_ply():
+    """Test the Pratt parser gives the PLY parser's AST or error on a fuzzed corpus"""
+    rng = random.Random(16)
+    reference = AQLParser(errorlog=yacc.NullLogger())
+    
+    def parse(instance, text):
+        try:
+            return instance.parse(text).to_dict()
+        except SyntaxError as e:
+            return str(e)
+    
+    texts = [_fuzz_rule(rng) for _ in range(5000)]
+    texts += ["", "  ", "a", "NOT", "a = first", "a IN (1,)", "a MATCHES '[' $"]
+    errors = 0
+    for text in texts:
+        expected = parse(reference, text)
+        assert parse(pratt_parser, text) == expected, f"Parsers disagree on: {text!r}"
+        errors += isinstance(expected, str)
+    
+    # The corpus exercises both accepted and rejected rules
+    assert 0 < errors < len(texts)
+    print("✓ Pratt parser test passed")
+
+
+def test_parser_selection():
+    """Test settings.AQL_PARSER picks the parser used by parse_aql"""
+    assert get_parser("ply") is parser
+    assert get_parser("pratt") is pratt_parser
+    
+    selected = settings.AQL_PARSER
+    settings.AQL_PARSER = "pratt"
+    try:
+        assert get_parser() is pratt_parser
+        aql = "severity > 5 AND sourceIP != 'selection-test'"
+        assert parse_aql_to_dict(aql) == parser.parse(aql).to_dict()
+    finally:
+        settings.AQL_PARSER = selected
+    
+    try:
+        get_parser("lalr")
+        raise AssertionError("Unknown parser name was accepted")
+    except ValueError:
+        pass
+    print("✓ Parser selection test passed")
+
+
 if __name__ == "__main__":
     print("Running AQL Parser Tests...")
     print()
@@ -102,6 +312,12 @@ if __name__ == "__main__":
         test_aggregation()
         test_aggregation_with_time_window()
         test_complex_query()
+        test_invalid_regex_rejected()
+        test_ast_cache()
+        test_concurrent_parsing()
+        test_parse_tables_current()
+        test_pratt_parser_matches_ply()
+        test_parser_selection()
         
         print()
         print("=" * 50)
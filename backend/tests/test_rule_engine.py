@@ -3,10 +3,33 @@ Test Rule Engine with Priority Validation
 """
 import sys
 import os
+import json
+import asyncio
+import threading
+import math
+import statistics
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.core.parser import parse_aql
-from app.core.engine.rule_engine import evaluate_rule
+from app.core.engine.rule_engine import evaluate_rule, evaluate_rules, RuleEngine
+from app.core.engine.compiler import compile_rule
+from app.core.regex_cache import RegexCache
+from app.core.engine.multi_pattern import MultiPatternMatcher, StringMatchIndex
+from app.core.engine.compiler import RuleCompiler
+from app.core.engine.event_stream import EventStreamDecoder
+from app.core.engine.parallel import ParallelRuleEvaluator
+from app.core.engine.executor import BoundedExecutor, ExecutorBusyError
+from app.core.engine.optimizer import RuleOptimizer, SelectivityStats
+from app.core.engine.normalizer import SubexpressionMemo, EventResultTable, normalize, node_key, memoize_last_event
+from app.core.engine.building_blocks import BuildingBlockGraph, BuildingBlockCycleError
+from app.core.engine.event_index import EventIndex
+from app.core.engine.columnar import EventBatch, HAS_NUMPY
+from app.core.engine.interning import StringDictionary
+from app.core.engine.accumulators import FieldAccumulators, create_accumulator
+from app.core.engine.aggregator import Aggregator
+from app.models.schemas import Event
+from app.models.event_check import check_event, serialize_event
+from pydantic import ValidationError
 
 
 def test_simple_rule():
@@ -136,6 +159,781 @@ def test_priority_order_enforcement():
     print("  ✓ Priority order enforcement test passed (BB failed, AQL not evaluated)\n")
 
 
+def test_compiled_predicate():
+    """Test compiled rule predicates match per-event semantics"""
+    print("Test 6: Compiled predicate")
+    
+    aql = ("(port > 1000 OR message CONTAINS 'denied') AND username MATCHES '^adm' "
+           "AND NOT sourceIP IN ('10.0.0.1', '10.0.0.2')")
+    predicate = compile_rule(parse_aql(aql))
+    
+    assert predicate({"port": "8080", "username": "admin", "sourceIP": "10.0.0.9"})
+    assert predicate({"port": 22, "message": "access denied", "username": "adm1"})
+    assert not predicate({"port": 8080, "username": "root"})
+    assert not predicate({"port": 8080, "username": "admin", "sourceIP": "10.0.0.2"})
+    assert not predicate({"username": "admin"})
+    
+    # Building Block references resolve to the compiled BB predicate
+    bb_predicate = compile_rule(parse_aql("when BB_Admin"), {"BB_Admin": parse_aql("username = 'admin'")})
+    assert bb_predicate({"username": "admin"})
+    assert not compile_rule(parse_aql("when BB_Missing"))({"username": "admin"})
+    print("  ✓ Compiled predicate test passed\n")
+
+
+def test_single_pass_matches_phased():
+    """Test single-pass evaluation reports exactly what the phased scans report"""
+    print("Test 7: Single-pass vs phased evaluation")
+    
+    building_blocks = {
+        "BB_Auth": parse_aql("eventCategory = 'Authentication'"),
+        "BB_Admin": parse_aql("username STARTSWITH 'adm'"),
+    }
+    rules = [
+        "sourceIP = '192.168.1.1'",
+        "when BB_Auth AND sourceIP = '192.168.1.1'",
+        "when BB_Auth OR when BB_Admin",
+        "when BB_Missing AND port = 22",
+        "message MATCHES 'fail(ed)?' AND port >= 1000",
+        "port > 'abc'",
+        "when BB_Auth AND COUNT(eventId) >= 2 within 5 minutes",
+        "NOT port IN (22, 23)",
+    ]
+    events = [
+        {"eventId": "1", "timestamp": "2026-02-12T10:00:00Z", "eventCategory": "Authentication",
+         "sourceIP": "192.168.1.1", "username": "admin", "port": 22, "message": "login failed"},
+        {"eventId": "2", "timestamp": "2026-02-12T10:01:00Z", "eventCategory": "Access",
+         "sourceIP": "10.0.0.1", "username": "bob", "port": 8080, "message": "failed"},
+        {"eventId": "3", "timestamp": "2026-02-12T10:02:00Z", "eventCategory": "Authentication",
+         "sourceIP": "10.0.0.2", "port": "443"},
+    ]
+    
+    phased = RuleEngine(single_pass=False)
+    single = RuleEngine(single_pass=True)
+    for aql in rules:
+        rule_ast = parse_aql(aql)
+        for sample in (events, events[1:], []):
+            expected = phased.evaluate_rule(rule_ast, sample, building_blocks)
+            assert single.evaluate_rule(rule_ast, sample, building_blocks) == expected, aql
+    print("  ✓ Single-pass evaluation test passed\n")
+
+
+def test_regex_cache_lru():
+    """Test regex cache hit/miss counters and LRU eviction"""
+    print("Test 8: Regex cache LRU")
+    
+    cache = RegexCache(maxsize=2)
+    first = cache.get('fail(ed)?')
+    assert cache.get('fail(ed)?') is first
+    cache.get('denied')
+    cache.get('fail(ed)?')  # refresh, 'denied' is now least recently used
+    cache.get('root')
+    
+    stats = cache.stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 2
+    assert stats['misses'] == 3
+    assert stats['evictions'] == 1
+    assert cache.get('fail(ed)?') is first
+    print("  ✓ Regex cache test passed\n")
+
+
+def test_in_operator_normalization():
+    """Test IN / NOT IN treat numeric strings and numbers alike"""
+    print("Test 9: IN operator normalization")
+    
+    in_predicate = compile_rule(parse_aql("port IN (22, '23')"))
+    not_in_predicate = compile_rule(parse_aql("port NOT IN (22, '23')"))
+    
+    for port in (22, '22', 22.0, 23, '23'):
+        assert in_predicate({"port": port}), port
+        assert not not_in_predicate({"port": port}), port
+    for port in (80, '080', 'ssh'):
+        assert not in_predicate({"port": port}), port
+        assert not_in_predicate({"port": port}), port
+    
+    # Missing fields never match either form
+    assert not in_predicate({}) and not not_in_predicate({})
+    print("  ✓ IN operator normalization test passed\n")
+
+
+def test_multi_pattern_matcher():
+    """Test shared string matcher agrees with per-node string operations"""
+    print("Test 10: Multi-pattern string matcher")
+    
+    entries = [
+        ("CONTAINS", "fail"), ("CONTAINS", "ail"), ("CONTAINS", ""),
+        ("STARTSWITH", "login"), ("STARTSWITH", "log"), ("ENDSWITH", "ed"),
+        ("ENDSWITH", "failed"), ("CONTAINS", "denied"),
+    ]
+    texts = ["login failed", "logout", "access denied", "", "failed", "ailed login"]
+    checks = {
+        "CONTAINS": lambda text, pattern: pattern in text,
+        "STARTSWITH": lambda text, pattern: text.startswith(pattern),
+        "ENDSWITH": lambda text, pattern: text.endswith(pattern),
+    }
+    
+    # Aho-Corasick (threshold 0) and per-pattern checks must agree
+    for threshold in (0, 1000):
+        matcher = MultiPatternMatcher(entries, ac_threshold=threshold)
+        assert (matcher.automaton is not None) == (threshold == 0)
+        for text in texts:
+            mask = matcher.match(text)
+            for operator, pattern in entries:
+                expected = checks[operator](text, pattern)
+                assert bool(mask & matcher.bits[(operator, pattern)]) == expected, (operator, pattern, text)
+    
+    # Rules compiled against a shared index give the same answers
+    rules = [parse_aql(f"message {operator} '{pattern}'") for operator, pattern in entries]
+    compiler = RuleCompiler(StringMatchIndex.from_asts(rules, ac_threshold=0))
+    for rule_ast in rules:
+        indexed = compiler.compile(rule_ast)
+        direct = compile_rule(rule_ast)
+        for text in texts + [None, 42]:
+            event = {"message": text}
+            assert indexed(event) == direct(event)
+    print("  ✓ Multi-pattern matcher test passed\n")
+
+
+def test_event_stream_decoder():
+    """Test NDJSON / JSON-array decoding across arbitrary chunk boundaries"""
+    print("Test 11: Streaming event decoder")
+    
+    events = [{"eventId": str(i), "message": "h\u00e9llo %d" % i, "tags": [i, {"x": "]"}]} for i in range(20)]
+    ndjson = ("\n".join(json.dumps(e, ensure_ascii=False) for e in events) + "\n").encode("utf-8")
+    array = (" [\n" + ",\n".join(json.dumps(e, ensure_ascii=False) for e in events) + "\n]\n").encode("utf-8")
+    
+    for payload, expected_format in ((ndjson, "ndjson"), (array, "array")):
+        for chunk_size in (1, 3, 7, 64, len(payload)):
+            decoder = EventStreamDecoder()
+            decoded = []
+            for start in range(0, len(payload), chunk_size):
+                decoded.extend(decoder.feed(payload[start:start + chunk_size]))
+            decoded.extend(decoder.close())
+            assert decoder.format == expected_format
+            assert decoded == events, (expected_format, chunk_size)
+    
+    # Malformed input is reported, not silently dropped
+    for payload in (b'[{"eventId": "1"}', b'{"eventId": "1"}\n{"eventId"', b'[1, 2]', b'[{}] {}'):
+        decoder = EventStreamDecoder()
+        try:
+            decoder.feed(payload)
+            decoder.close()
+            assert False, payload
+        except ValueError:
+            pass
+    
+    decoder = EventStreamDecoder(max_event_size=10)
+    try:
+        decoder.feed(b'{"message": "' + b'x' * 100)
+        assert False, "oversized event accepted"
+    except ValueError:
+        pass
+    print("  ✓ Streaming decoder test passed\n")
+
+
+def test_rule_stream_matches_evaluate_rule():
+    """Test batched RuleStream gives the same result as evaluate_rule"""
+    print("Test 12: Streaming rule evaluation")
+    
+    engine = RuleEngine()
+    bb = {"BB_LOGIN": parse_aql("eventName = 'Login'")}
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T10:00:{i % 60:02d}Z",
+         "eventName": "Login" if i % 3 else "Logout", "sourceIP": f"10.0.0.{i % 4}"}
+        for i in range(200)
+    ]
+    rules = [
+        "when BB_LOGIN AND sourceIP = '10.0.0.1'",
+        "sourceIP = '10.0.0.9'",
+        "COUNT(eventId) >= 10 within 1 minutes GROUP BY sourceIP",
+        "eventName = 'Login' AND COUNT(eventId) >= 500 within 1 minutes",
+    ]
+    for aql in rules:
+        rule_ast = parse_aql(aql)
+        expected = engine.evaluate_rule(rule_ast, events, bb)
+        stream = engine.start_stream(rule_ast, bb)
+        for start in range(0, len(events), 17):
+            stream.feed(events[start:start + 17])
+        result = stream.finish()
+        assert result["events_processed"] == len(events)
+        for key in ("alert", "evaluation_phases", "error", "matched_events", "trigger_details"):
+            assert result.get(key) == expected.get(key), (aql, key)
+    
+    # Matched events are capped, but the count still covers every match
+    stream = engine.start_stream(parse_aql("eventName = 'Login'"), max_matched_events=5)
+    stream.feed(events)
+    result = stream.finish()
+    assert result["alert"] is True
+    assert len(result["matched_events"]) == 5
+    
+    # Aggregation rules refuse to buffer beyond the limit
+    stream = engine.start_stream(parse_aql(rules[2]), max_buffered_events=50)
+    stream.feed(events)
+    result = stream.finish()
+    assert result["alert"] is False
+    assert "at most 50 events" in result["error"]
+    print("  ✓ Streaming rule evaluation test passed\n")
+
+
+def test_event_check_matches_model():
+    """Test the lightweight event check accepts and shapes events like Event"""
+    print("Test 13: Lightweight event validation")
+    
+    base = {"eventId": "1", "timestamp": "2026-02-12T10:00:00Z", "eventName": "Login"}
+    variants = [
+        {},
+        {"port": 22, "severity": 5, "sourceIP": "10.0.0.1", "custom": {"a": [1, 2]}},
+        {"port": "443"},
+        {"port": True},
+        {"severity": 3.0},
+        {"username": None, "extra": None},
+        {"port": 2.5},
+        {"eventId": 7},
+        {"eventName": None},
+    ]
+    for variant in variants:
+        event = {**base, **variant}
+        try:
+            expected = Event(**event).dict()
+        except ValidationError:
+            expected = None
+        
+        try:
+            checked = check_event(event)
+        except ValidationError:
+            checked = None
+        
+        if expected is None:
+            assert checked is None, variant
+        else:
+            assert serialize_event(checked) == expected, variant
+            assert list(serialize_event(checked)) == list(expected), variant
+    
+    # Canonical events are not copied
+    event = {**base, "port": 22}
+    assert check_event(event) is event
+    print("  ✓ Lightweight event validation test passed\n")
+
+
+def test_batch_matches_single_rule():
+    """Test evaluate_rules gives each rule the same result as evaluate_rule"""
+    print("Test 14: Batch rule evaluation")
+    
+    building_blocks = {
+        "BB_LOGIN": parse_aql("eventName = 'Login'"),
+        "BB_ADMIN": parse_aql("username STARTSWITH 'adm'"),
+        "BB_NONE": parse_aql("eventName = 'Reboot'"),
+    }
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T10:{i // 60:02d}:{i % 60:02d}Z",
+         "eventName": ["Login", "Logout", "Failed"][i % 3], "username": ["admin", "bob", "adm2"][i % 3],
+         "sourceIP": f"10.0.0.{i % 4}", "port": i % 100}
+        for i in range(300)
+    ]
+    rules = {
+        "bb_only": parse_aql("when BB_LOGIN"),
+        "bb_missing": parse_aql("when BB_UNKNOWN"),
+        "bb_failing": parse_aql("when BB_NONE"),
+        "logic": parse_aql("sourceIP = '10.0.0.2' AND username CONTAINS 'adm'"),
+        "regex": parse_aql("username MATCHES '^adm[0-9]$'"),
+        "in_op": parse_aql("port IN (1, 2, 3)"),
+        "window": parse_aql("COUNT(eventId) >= 10 within 1 minutes GROUP BY sourceIP"),
+        "window_failing": parse_aql("COUNT(eventId) >= 2000 within 1 minutes"),
+    }
+    
+    batch = evaluate_rules(rules, events, building_blocks)
+    assert list(batch) == list(rules)
+    for rule_id, rule_ast in rules.items():
+        expected = evaluate_rule(rule_ast, events, building_blocks)
+        for key in ("alert", "evaluation_phases", "error", "matched_events", "trigger_details"):
+            assert batch[rule_id].get(key) == expected.get(key), (rule_id, key)
+    print("  ✓ Batch rule evaluation test passed\n")
+
+
+def test_parallel_matches_serial():
+    """Test process-pool evaluation, whole rules and event shards, matches serial results"""
+    print("Test 15: Parallel rule evaluation")
+    
+    building_blocks = {
+        "BB_LOGIN": parse_aql("eventName = 'Login'"),
+        "BB_PORT": parse_aql("port > 90"),
+    }
+    events = [
+        {"eventId": str(i), "timestamp": f"2026-02-12T10:{i // 60:02d}:{i % 60:02d}Z",
+         "eventName": ["Login", "Logout", "Failed"][i % 3], "sourceIP": f"10.0.0.{i % 4}",
+         "port": i % 100}
+        for i in range(400)
+    ]
+    # Non-numeric ports make numeric comparisons raise mid-scan
+    events[250]["port"] = "ssh"
+    events[390]["port"] = "ssh"
+    rules = {
+        "bb": parse_aql("when BB_LOGIN"),
+        "bb_error_after_match": parse_aql("when BB_PORT"),
+        "logic": parse_aql("sourceIP = '10.0.0.2' AND eventName = 'Failed'"),
+        "logic_error": parse_aql("port >= 99"),
+        "logic_error_first": parse_aql("port < 0"),
+        "window": parse_aql("COUNT(eventId) >= 10 within 1 minutes GROUP BY sourceIP"),
+    }
+    
+    expected = evaluate_rules(rules, events, building_blocks)
+    assert any(result["error"] and "Evaluation error" in result["error"] for result in expected.values())
+    
+    evaluator = ParallelRuleEvaluator(workers=2, shard_min_events=0)
+    try:
+        # Many rules: whole rules per worker
+        assert evaluator.evaluate_rules(rules, events, building_blocks) == expected
+        
+        # Single rules: stateless ones are split into event shards
+        for rule_id, rule_ast in rules.items():
+            assert evaluator.evaluate_rule(rule_ast, events, building_blocks) == expected[rule_id], rule_id
+    finally:
+        evaluator.shutdown()
+    print("  ✓ Parallel rule evaluation test passed\n")
+
+
+def test_bounded_executor():
+    """Test the evaluation executor bounds running + queued work and reports it"""
+    print("Test 16: Bounded evaluation executor")
+    
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(sum, [1, 2, 3]))
+        await asyncio.sleep(0.05)
+        stats = executor.stats()
+        assert (stats["running"], stats["queued"]) == (1, 1), stats
+        
+        # Third call exceeds 1 running + 1 queued
+        try:
+            await executor.run(sum, [1])
+            assert False, "queue limit not enforced"
+        except ExecutorBusyError:
+            pass
+        
+        release.set()
+        assert await running is True
+        assert await queued == 6
+        
+        # Exceptions from the call propagate to the caller
+        try:
+            await executor.run(int, "not a number")
+            assert False, "exception swallowed"
+        except ValueError:
+            pass
+    
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    
+    # Submitting after shutdown is an executor failure and frees its slot
+    try:
+        asyncio.run(executor.run(sum, [1]))
+        assert False, "submitted after shutdown"
+    except RuntimeError:
+        pass
+    
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 3
+    assert stats["failed"] == 1
+    assert (stats["running"], stats["queued"]) == (0, 0)
+    print("  ✓ Bounded executor test passed\n")
+
+
+def test_optimizer_orders_cheap_conditions_first():
+    """Test AND / OR children are planned by cost and learned pass rates"""
+    print("Test 17: Cost-based condition ordering")
+    
+    optimizer = RuleOptimizer(SelectivityStats(min_samples=10))
+    rule = parse_aql("message MATCHES 'fail.*' AND message CONTAINS 'denied' AND eventName = 'Login'")
+    order, guards = optimizer.plan(rule)
+    assert order == [2, 1, 0] and guards == {}
+    
+    # An ordered comparison may raise: it can move ahead of the regex, but
+    # the later equality may not pass it
+    rule = parse_aql("message MATCHES 'fail.*' AND severity > 7 AND eventName = 'Login'")
+    order, guards = optimizer.plan(rule)
+    assert order == [1, 2, 0] and guards == {1: [0]}
+    
+    # Learned pass rates override the defaults: an equality that nearly
+    # always passes is no longer worth trying first
+    rule = parse_aql("sourceIP = '10.0.0.1' AND message CONTAINS 'denied'")
+    events = [{"sourceIP": "10.0.0.1", "message": "ok"} for _ in range(20)]
+    optimizer.stats.observe(rule, events, compile_rule)
+    order, _ = optimizer.plan(rule)
+    assert order == [1, 0]
+    print("  ✓ Condition ordering test passed\n")
+
+
+def test_optimizer_preserves_results():
+    """Test optimized predicates agree with source order, errors included"""
+    print("Test 18: Optimized predicates match source order")
+    
+    building_blocks = {"BB_HIGH": parse_aql("severity > 5 OR eventName = 'Alert'")}
+    rules = [
+        "message MATCHES '^fail' AND severity > 7 AND eventName = 'Login'",
+        "message CONTAINS 'x' AND (port >= 22 OR sourceIP IN ('10.0.0.1', 1)) AND NOT severity < 2",
+        "eventName != 'Login' OR message MATCHES 'denied' OR port > 1000 OR user = 'root'",
+        "when BB_HIGH AND message STARTSWITH 'fail' AND port != 22",
+        "(severity > 3 AND message ENDSWITH 'x') OR (port < 10 AND eventName = 'Alert')",
+    ]
+    values = [None, 1, 8, 22, 2000, "3", "abc", "fail x", "denied", "Login", "Alert", "10.0.0.1", [1]]
+    events = [
+        {field: values[(i * 7 + j * 3 + i // 13) % len(values)]
+         for j, field in enumerate(["message", "severity", "eventName", "port", "sourceIP", "user"])
+         if (i + j) % 5}
+        for i in range(400)
+    ]
+    
+    def outcome(predicate, event):
+        try:
+            return bool(predicate(event))
+        except Exception as e:
+            return repr(e)
+    
+    optimizer = RuleOptimizer(SelectivityStats(min_samples=1))
+    plain = RuleCompiler()
+    optimized = RuleCompiler(optimizer=optimizer)
+    errors = 0
+    for text in rules:
+        ast = parse_aql(text)
+        optimizer.stats.observe(ast, events, plain.compile)
+        for bbs in ({}, building_blocks):
+            expected = plain.compile(ast, bbs)
+            actual = optimized.compile(ast, bbs)
+            for event in events:
+                want = outcome(expected, event)
+                assert outcome(actual, event) == want, (text, event)
+                errors += isinstance(want, str)
+    # The corpus includes events where evaluation raises
+    assert errors > 0
+    
+    # Whole reports (phases, first error, matched events) are unchanged
+    engine = RuleEngine(optimizer=optimizer)
+    for text in rules:
+        ast = parse_aql(text)
+        assert engine.evaluate_rule(ast, events, building_blocks) == RuleEngine().evaluate_rule(ast, events, building_blocks)
+    print("  ✓ Optimized predicates test passed\n")
+
+
+def test_normalize_rule_tree():
+    """Test normalization flattens, dedupes and leaves the input intact"""
+    print("Test 19: Rule tree normalization")
+    
+    ast = parse_aql("(a = 1 AND (b = 2 AND a = 1)) AND NOT NOT c CONTAINS 'x'")
+    before = ast.to_dict()
+    normalized = normalize(ast)
+    assert normalized.operator == "AND"
+    assert [child.to_dict() for child in normalized.children] == [
+        parse_aql("a = 1").to_dict(), parse_aql("b = 2").to_dict(), parse_aql("c CONTAINS 'x'").to_dict()
+    ]
+    assert ast.to_dict() == before
+    
+    # Already canonical trees come back as is
+    canonical = parse_aql("a = 1 OR b IN (1, 2)")
+    assert normalize(canonical) is canonical
+    assert normalize(parse_aql("(a = 1 OR a = 1)")).to_dict() == parse_aql("a = 1").to_dict()
+    
+    # Equal keys for the same condition through a Building Block reference
+    building_blocks = {"BB_X": parse_aql("b = 2 AND (a = 1)")}
+    assert node_key(parse_aql("when BB_X"), building_blocks) == node_key(parse_aql("b = 2 AND a = 1"))
+    assert node_key(parse_aql("a = 1 AND b = 2")) != node_key(parse_aql("b = 2 AND a = 1"))
+    print("  ✓ Normalization test passed\n")
+
+
+def test_subexpression_memo_preserves_results():
+    """Test shared conditions evaluated once per event give the same reports"""
+    print("Test 20: Shared condition memoization")
+    
+    shared = "(eventName CONTAINS 'Auth' OR severity > 5)"
+    building_blocks = {
+        "BB_A": parse_aql(f"{shared} AND port != 22"),
+        "BB_B": parse_aql(f"port != 22 AND {shared} AND user = 'root'"),
+    }
+    rules = {
+        "r1": parse_aql(f"{shared} AND (when BB_A OR when BB_B)"),
+        "r2": parse_aql(f"(port != 22 AND {shared}) AND NOT (user = 'root' OR severity > 5)"),
+        "r3": parse_aql(f"when BB_A AND {shared} AND COUNT(eventId) >= 2"),
+    }
+    memo = SubexpressionMemo.from_asts(rules.values(), building_blocks)
+    assert node_key(normalize(parse_aql(shared))) in memo.shared
+    
+    values = [None, 1, 8, 22, "abc", "AuthFail", "root"]
+    events = [
+        {field: values[(i * 5 + j * 3 + i // 7) % len(values)]
+         for j, field in enumerate(["eventName", "severity", "port", "user", "eventId"])}
+        for i in range(300)
+    ]
+    plain = RuleEngine()
+    memoized = RuleEngine(memoize=True)
+    for rule_ast in rules.values():
+        assert memoized.evaluate_rule(rule_ast, events, building_blocks) == plain.evaluate_rule(rule_ast, events, building_blocks)
+    assert memoized.evaluate_rules(rules, events, building_blocks) == plain.evaluate_rules(rules, events, building_blocks)
+    
+    # A shared condition evaluates once per event however often it occurs
+    calls = []
+    predicate = memoize_last_event(lambda event: calls.append(event) or True)
+    event = {"a": 1}
+    assert predicate(event) and predicate(event)
+    assert len(calls) == 1
+    print("  ✓ Memoization test passed\n")
+
+
+def test_nested_building_blocks():
+    """Test Building Blocks referencing Building Blocks, and reference loops"""
+    print("Test 21: Nested Building Blocks")
+    
+    building_blocks = {
+        "BB_LOGIN": parse_aql("eventName = 'Login'"),
+        "BB_ADMIN_LOGIN": parse_aql("when BB_LOGIN AND username STARTSWITH 'adm'"),
+        "BB_REMOTE_ADMIN": parse_aql("when BB_ADMIN_LOGIN AND port = 22"),
+    }
+    events = [
+        {"eventName": "Login", "username": "admin", "port": 22},
+        {"eventName": "Login", "username": "bob", "port": 22},
+        {"eventName": "Logout", "username": "admin", "port": 22},
+    ]
+    predicate = compile_rule(parse_aql("when BB_REMOTE_ADMIN"), building_blocks)
+    assert [predicate(event) for event in events] == [True, False, False]
+    
+    result = evaluate_rule(parse_aql("when BB_REMOTE_ADMIN"), events, building_blocks)
+    assert result["alert"] and result["matched_events"] == events[:1]
+    
+    graph = BuildingBlockGraph(building_blocks)
+    assert graph.order(["BB_REMOTE_ADMIN"]) == ["BB_LOGIN", "BB_ADMIN_LOGIN", "BB_REMOTE_ADMIN"]
+    assert graph.find_cycle() is None
+    
+    # Loops are found and reported instead of evaluating to False
+    looping = {
+        **building_blocks,
+        "BB_A": parse_aql("when BB_B OR port = 22"),
+        "BB_B": parse_aql("when BB_LOGIN AND when BB_A"),
+    }
+    assert BuildingBlockGraph(looping).find_cycle(["BB_A"]) == ["BB_A", "BB_B", "BB_A"]
+    try:
+        BuildingBlockGraph(looping).order()
+        assert False, "Expected BuildingBlockCycleError"
+    except BuildingBlockCycleError as e:
+        assert e.cycle == ["BB_A", "BB_B", "BB_A"]
+    
+    rules = {"loop": parse_aql("when BB_A"), "fine": parse_aql("when BB_REMOTE_ADMIN")}
+    results = evaluate_rules(rules, events, looping)
+    assert not results["loop"]["alert"]
+    assert results["loop"]["error"] == "Evaluation error: Building Block cycle: BB_A -> BB_B -> BB_A"
+    assert results["fine"] == evaluate_rule(rules["fine"], events, looping)
+    
+    # Results over a fixed event list are kept for every event
+    calls = []
+    table = EventResultTable(events)
+    memoized = table.wrap(lambda event: calls.append(event) or event["port"] == 22)
+    for _ in range(3):
+        assert [memoized(event) for event in events] == [True, True, True]
+    assert len(calls) == len(events)
+    print("  ✓ Nested Building Blocks test passed\n")
+
+
+def test_event_index_building_blocks():
+    """Test Building Blocks answered from the inverted event index"""
+    print("Test 22: Indexed Building Block lookup")
+    
+    values = [None, 22, 22.0, "22", "022", True, 1, "1", "x", [22], "Login"]
+    events = [
+        {"port": values[i % len(values)], "eventName": values[(i * 3) % len(values)]}
+        for i in range(60)
+    ]
+    building_blocks = {
+        "BB_SSH": parse_aql("port = 22 OR port IN ('1', 'x')"),
+        "BB_NOT_SSH": parse_aql("port != 22 AND NOT eventName IN ('Login', 1)"),
+        "BB_NESTED": parse_aql("when BB_SSH AND eventName = 'Login'"),
+        "BB_NONE": parse_aql("port = 8080 OR eventName = 'Logout'"),
+        "BB_TEXT": parse_aql("eventName CONTAINS 'Log'"),
+    }
+    index = EventIndex(events)
+    compiler = RuleCompiler()
+    for bb_id, bb_ast in building_blocks.items():
+        mask = index.matches(bb_ast, building_blocks)
+        if bb_id == "BB_TEXT":
+            # Only equality and IN conditions are indexed
+            assert mask is None
+            continue
+        predicate = compiler.compile_building_block(bb_id, building_blocks)
+        assert mask == sum(1 << i for i, event in enumerate(events) if predicate(event)), bb_id
+    
+    # Same reports whether Building Blocks are scanned or looked up
+    scanning = RuleEngine()
+    indexed = RuleEngine(index_after_events=5)
+    rules = {
+        "ssh": parse_aql("when BB_SSH AND when BB_NESTED AND port != 1"),
+        "none": parse_aql("when BB_NOT_SSH AND when BB_NONE AND when BB_TEXT"),
+        "text": parse_aql("when BB_TEXT AND when BB_NOT_SSH"),
+    }
+    for rule_ast in rules.values():
+        assert indexed.evaluate_rule(rule_ast, events, building_blocks) == scanning.evaluate_rule(rule_ast, events, building_blocks)
+    assert indexed.evaluate_rules(rules, events, building_blocks) == scanning.evaluate_rules(rules, events, building_blocks)
+    assert indexed.evaluate_rule(rules["none"], events, building_blocks)["error"] == \
+        "Building Block failed: Building Block 'BB_NONE' condition not met"
+    print("  ✓ Indexed Building Block test passed\n")
+
+
+def test_columnar_matches_row_evaluation():
+    """Test vectorized masks over an EventBatch against row-wise predicates"""
+    print("Test 23: Columnar evaluation")
+    
+    if not HAS_NUMPY:
+        print("  - NumPy not installed, skipped\n")
+        return
+    
+    values = [None, 22, 22.0, "22", -0.0, 0, True, "x", "Login", [22], 2 ** 60, float("nan")]
+    events = [
+        {
+            "port": values[i % len(values)],
+            "severity": i % 7,
+            "eventName": values[(i * 5) % len(values)],
+        }
+        for i in range(120)
+    ]
+    building_blocks = {
+        "BB_SSH": parse_aql("port = 22 OR port IN ('x', 0)"),
+        "BB_HIGH": parse_aql("severity >= 5 AND NOT severity IN (6)"),
+        "BB_LOGIN": parse_aql("when BB_HIGH AND eventName STARTSWITH 'Log'"),
+    }
+    conditions = [
+        "when BB_SSH OR when BB_LOGIN",
+        "severity > 2 AND port != 22",
+        "eventName MATCHES '^-?0' OR eventName CONTAINS '2'",
+        # Raises on strings, unless an earlier condition decides first
+        "severity = 6 OR port < 30",
+        "NOT (port > 0 AND severity IN (1, 2))",
+    ]
+    batch = EventBatch(events)
+    compiler = RuleCompiler()
+    for aql in conditions:
+        rule_ast = parse_aql(aql)
+        matches, raises = batch.evaluate(rule_ast, building_blocks)
+        predicate = compiler.compile(rule_ast, building_blocks)
+        for i, event in enumerate(events):
+            try:
+                expected = (bool(predicate(event)), False)
+            except Exception:
+                expected = (False, True)
+            assert (bool(matches[i]), bool(raises[i])) == expected, (aql, event)
+    
+    # Same reports, errors included, whether rules walk rows or share columns
+    rules = {f"rule_{i}": parse_aql(aql) for i, aql in enumerate(conditions)}
+    rows = RuleEngine().evaluate_rules(rules, events, building_blocks)
+    columns = RuleEngine(columnar_min_events=0).evaluate_rules(rules, events, building_blocks)
+    assert columns == rows
+    assert "not supported" in rows["rule_3"]["error"]
+    print("  ✓ Columnar evaluation test passed\n")
+
+
+def test_string_dictionary_interning():
+    """Test interned event fields and code-based string comparisons"""
+    print("Test 24: String interning")
+    
+    strings = StringDictionary(["sourceIP", "username"], max_strings=6)
+    events = [
+        {"sourceIP": "".join(["10.0.0.", str(i % 3)]), "username": f"u{i % 5}", "port": i}
+        for i in range(30)
+    ]
+    for event in events:
+        strings.intern_event(event)
+    # Equal values share one object; a full dictionary starts a new generation
+    assert events[0]["sourceIP"] is events[3]["sourceIP"]
+    assert strings.generation > 0 and len(strings) <= 6
+    assert events[3]["username"] == "u3" and strings.intern("10.0.0.2") == events[2]["sourceIP"]
+    
+    # The byte cap starts a new generation too
+    capped = StringDictionary(max_bytes=3 * sys.getsizeof("u0"))
+    for value in ["u0", "u1", "u2", "u3"]:
+        capped.code(value)
+    assert capped.generation == 1 and capped.lookup("u0") is None and capped.lookup("u3") == 0
+    assert capped.size_bytes == sys.getsizeof("u3")
+    
+    if not HAS_NUMPY:
+        print("  - NumPy not installed, columnar part skipped\n")
+        return
+    
+    events.append({"port": 99})
+    rules = {
+        "ip": parse_aql("sourceIP = '10.0.0.1' AND port > 3"),
+        "not_ip": parse_aql("sourceIP != '10.0.0.1' OR sourceIP IN ('192.0.2.1')"),
+        "user": parse_aql("username NOT IN ('u1', 'u4') AND sourceIP NOT IN ('10.0.0.2')"),
+    }
+    size = len(strings)
+    batch = EventBatch(events, strings)
+    compiler = RuleCompiler()
+    for rule_ast in rules.values():
+        matches, raises = batch.evaluate(rule_ast)
+        predicate = compiler.compile(rule_ast)
+        assert [bool(m) for m in matches] == [bool(predicate(event)) for event in events]
+        assert not raises.any()
+    # Strings the dictionary does not hold get codes of the batch; it is not added to
+    assert batch._string_codes["sourceIP"] is not None
+    assert (batch._string_codes["username"] < -1).any() and len(strings) == size
+    
+    rows = RuleEngine().evaluate_rules(rules, events)
+    columns = RuleEngine(columnar_min_events=0, strings=strings).evaluate_rules(rules, events)
+    assert columns == rows
+    print("  ✓ String interning test passed\n")
+
+
+def test_accumulators():
+    """Test sliding-window accumulators against one-shot aggregation"""
+    print("Test 25: Incremental aggregation")
+    
+    values = [3, None, "7", 0.1, "x", 1e20, 0.2, -1e20, 5, 0.3, 2, None, 8, 0.1]
+    events = [{"bytes": value} for value in values]
+    window = 4
+    accumulators = FieldAccumulators("bytes", ["count", "SUM", "AVG"])
+    for i, event in enumerate(events):
+        accumulators.add(event)
+        if i >= window:
+            accumulators.remove(events[i - window])
+        current = events[max(0, i - window + 1):i + 1]
+        result = accumulators.values()
+        assert result["COUNT"] == Aggregator.count(current, "bytes")
+        assert math.isclose(result["SUM"], Aggregator.sum(current, "bytes"), abs_tol=1e-9)
+        assert math.isclose(result["AVG"], Aggregator.avg(current, "bytes"), abs_tol=1e-9)
+    # No rounding error left behind once 1e20 and -1e20 have left the window
+    assert accumulators.values()["SUM"] == 10.1
+    
+    # MIN / MAX slide over numeric values
+    minimum, maximum = create_accumulator("MIN"), create_accumulator("MAX")
+    series = [5, 3, 3, 9, None, 1, 7, 7, 2]
+    for i, value in enumerate(series):
+        minimum.add(value)
+        maximum.add(value)
+        if i >= 3:
+            minimum.remove(series[i - 3])
+            maximum.remove(series[i - 3])
+        current = [v for v in series[max(0, i - 2):i + 1] if v is not None]
+        assert minimum.value() == min(current) and maximum.value() == max(current)
+    
+    totals = Aggregator.aggregate_many(["SUM", "max", "MIN", "sum"], [{"port": v} for v in series], "port")
+    assert totals == {"SUM": 37, "MAX": 9, "MIN": 1}
+    
+    # VARIANCE (not in AQL) slides with Welford's update
+    variance = create_accumulator("variance")
+    for i, value in enumerate(series):
+        variance.add(value)
+        if i >= 3:
+            variance.remove(series[i - 3])
+        current = [v for v in series[max(0, i - 2):i + 1] if v is not None]
+        assert math.isclose(variance.value(), statistics.pvariance(current), abs_tol=1e-12)
+    try:
+        create_accumulator("MEDIAN")
+        assert False, "Unknown function should raise"
+    except ValueError:
+        pass
+    print("  ✓ Incremental aggregation test passed\n")
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("Running Rule Engine Tests with Priority Validation")
@@ -148,6 +946,26 @@ if __name__ == "__main__":
         test_aggregation_with_time_window()
         test_complex_rule_all_phases()
         test_priority_order_enforcement()
+        test_compiled_predicate()
+        test_single_pass_matches_phased()
+        test_regex_cache_lru()
+        test_in_operator_normalization()
+        test_multi_pattern_matcher()
+        test_event_stream_decoder()
+        test_rule_stream_matches_evaluate_rule()
+        test_event_check_matches_model()
+        test_batch_matches_single_rule()
+        test_parallel_matches_serial()
+        test_bounded_executor()
+        test_optimizer_orders_cheap_conditions_first()
+        test_optimizer_preserves_results()
+        test_normalize_rule_tree()
+        test_subexpression_memo_preserves_results()
+        test_nested_building_blocks()
+        test_event_index_building_blocks()
+        test_columnar_matches_row_evaluation()
+        test_string_dictionary_interning()
+        test_accumulators()
         
         print("=" * 60)
         print("All Rule Engine tests passed! ✓")